@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiIssuetrackingsystemConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'API_IssueTrackingSystem'
+
+    def ready(self):
+        # Enregistrer les récepteurs de signaux
+        from API_IssueTrackingSystem import signals  # noqa: F401
@@ -0,0 +1,125 @@
+"""
+Lectures asynchrones des projets, tâches et commentaires (liste et détail) sous /async/ : servies par
+l'application ASGI (config/asgi.py), elles n'occupent pas de fil d'exécution pendant l'attente de la base.
+DRF ne gérant pas les vues asynchrones, ce sont des vues Django qui réutilisent ses sérialiseurs, ses filtres,
+sa pagination par décalage et la validation des jetons JWT, et qui renvoient les mêmes données que les viewsets.
+"""
+from abc import ABCMeta, abstractmethod
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from API_IssueTrackingSystem.filters import FieldFilter
+from API_IssueTrackingSystem.membership import aget_memberships
+from API_IssueTrackingSystem.models import Project, Issue, Comment
+from API_IssueTrackingSystem.permissions import AsyncIsContributor
+from API_IssueTrackingSystem.serializers import ProjectSerializer, IssueSerializer, CommentSerializer
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """Le jeton est validé sans requête ; seul le chargement de l'utilisateur interroge la base."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        token = self.get_validated_token(raw_token)
+        try:
+            user_id = token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise exceptions.AuthenticationFailed("Le jeton ne contient pas d'identifiant d'utilisateur.")
+        user = await get_user_model().objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed("Utilisateur introuvable ou inactif.")
+        return user
+
+
+class AsyncReadView(View, metaclass=ABCMeta):
+    """Liste paginée (?limit=&offset=, filtres `filter_fields`) et détail des objets des projets de l'utilisateur."""
+    http_method_names = ['get', 'head', 'options']
+    serializer_class = None
+    filter_fields = ()
+    authentication = AsyncJWTAuthentication()
+    permission = AsyncIsContributor()
+
+    @abstractmethod
+    def get_queryset(self, project_ids):
+        """Retourne le queryset des objets des projets `project_ids`."""
+
+    async def get(self, request, pk=None):
+        # Requête DRF construite à la main : même accès aux paramètres et au contexte des sérialiseurs
+        request = Request(request)
+        try:
+            user = await self.authentication.aauthenticate(request)
+            if user is None:
+                raise exceptions.NotAuthenticated()
+            request.user = user
+            queryset = self.get_queryset(list(await aget_memberships(request)))
+            if pk is None:
+                data = await self.list(request, queryset)
+            else:
+                data = await self.retrieve(request, queryset, pk)
+        except exceptions.APIException as exc:
+            # Même corps d'erreur que le gestionnaire d'exceptions de DRF
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = self.render(data, exc.status_code)
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+            return response
+        return self.render(data)
+
+    async def list(self, request, queryset):
+        queryset = FieldFilter().filter_queryset(request, queryset, self).order_by('pk')
+        paginator = LimitOffsetPagination()
+        paginator.request = request
+        paginator.limit = paginator.get_limit(request)
+        paginator.offset = paginator.get_offset(request)
+        paginator.count = await queryset.acount()
+        page = [obj async for obj in queryset[paginator.offset:paginator.offset + paginator.limit].aiterator()]
+        data = self.serializer_class(page, many=True, context={'request': request, 'view': self}).data
+        return paginator.get_paginated_response(data).data
+
+    async def retrieve(self, request, queryset, pk):
+        instance = await queryset.filter(pk=pk).afirst()
+        if instance is None:
+            # Même message que get_object_or_404() dans les viewsets
+            raise exceptions.NotFound(f"No {queryset.model._meta.object_name} matches the given query.")
+        if not await self.permission.ahas_object_permission(request, self, instance):
+            raise exceptions.PermissionDenied(self.permission.message)
+        return self.serializer_class(instance, context={'request': request, 'view': self}).data
+
+    @staticmethod
+    def render(data, status_code=status.HTTP_200_OK):
+        return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+class AsyncProjectView(AsyncReadView):
+    serializer_class = ProjectSerializer
+
+    def get_queryset(self, project_ids):
+        return Project.objects.filter(id__in=project_ids)
+
+
+class AsyncIssueView(AsyncReadView):
+    serializer_class = IssueSerializer
+    filter_fields = ('project', 'status', 'priority', 'tag', 'assigned_to')
+
+    def get_queryset(self, project_ids):
+        return Issue.objects.filter(project_id__in=project_ids)
+
+
+class AsyncCommentView(AsyncReadView):
+    serializer_class = CommentSerializer
+    filter_fields = ('project', 'issue', 'author')
+
+    def get_queryset(self, project_ids):
+        return Comment.objects.filter(project_id__in=project_ids)
@@ -0,0 +1,33 @@
+"""
+Moteur SQLite de production, activé par SOFTDESK_SQLITE_TUNING (voir config/settings.py) : journal WAL et
+réglages appliqués à chaque connexion, transactions ouvertes par BEGIN IMMEDIATE.
+Une transaction prend ainsi le verrou d'écriture dès son début, en l'attendant au plus `busy_timeout` ;
+avec un simple BEGIN, une transaction qui lit puis écrit échoue aussitôt (« database is locked »)
+si un autre processus a écrit entre-temps, sans que `busy_timeout` s'applique.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+SQLITE_PRAGMAS = getattr(settings, 'SQLITE_PRAGMAS', {
+    # Les lecteurs ne bloquent plus l'écrivain, et inversement
+    'journal_mode': 'WAL',
+    # Suffisant en WAL : seule la dernière transaction peut être perdue en cas de coupure de courant
+    'synchronous': 'NORMAL',
+    # Attente maximale du verrou d'écriture, en millisecondes
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Taille négative : en kibioctets plutôt qu'en pages
+    'cache_size': -64000,
+})
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in SQLITE_PRAGMAS.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
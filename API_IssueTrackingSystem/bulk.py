@@ -0,0 +1,342 @@
+"""
+Opérations en masse sur les tâches et les commentaires.
+Chaque lot est validé par des requêtes ensemblistes (appartenances, titres existants, assignations),
+puis écrit en une seule transaction avec bulk_create / bulk_update. Si un élément est invalide,
+rien n'est écrit et les erreurs sont renvoyées avec l'indice de l'élément concerné.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import exceptions
+from API_IssueTrackingSystem.models import Contributor, Issue, Comment
+from API_IssueTrackingSystem.membership import get_memberships, get_project_ids
+from API_IssueTrackingSystem.serializers import (IssueBulkSerializer, CommentBulkSerializer, TITLE_TAKEN,
+                                                 ASSIGNEE_INVALID)
+from API_IssueTrackingSystem import counters, events, response_cache, sync
+
+# Nombre maximal d'éléments acceptés dans un lot
+BULK_MAX_ITEMS = getattr(settings, 'BULK_MAX_ITEMS', 50_000)
+
+# Taille des paquets pour les clauses IN et les écritures
+BATCH_SIZE = 500
+
+NOT_FOUND = "Cet élément n'existe pas ou vous n'y avez pas accès."
+FORBIDDEN = "Vous n'avez pas la permission de modifier cet élément."
+PROJECT_FORBIDDEN = "Vous n'avez pas accès à ce projet ou il n'existe pas."
+ISSUE_FORBIDDEN = "Vous n'avez pas accès à cette tâche ou elle n'existe pas."
+CONFLICT = "Une écriture concurrente est entrée en conflit avec ce lot ; aucun élément n'a été écrit."
+ALREADY_IN_PROJECT = "La tâche appartient déjà à ce projet."
+
+
+def _chunks(values, size=BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _error(index, message, field='non_field_errors'):
+    return {'index': index, 'errors': {field: [message]}}
+
+
+@contextmanager
+def _conflicts():
+    """Un titre du lot a été pris par une écriture concurrente après sa vérification : la contrainte le refuse."""
+    try:
+        yield
+    except IntegrityError:
+        raise exceptions.ValidationError(CONFLICT)
+
+
+def check_items(items):
+    if not isinstance(items, list):
+        raise exceptions.ValidationError("Le corps de la requête doit être une liste JSON ou du NDJSON.")
+    if len(items) > BULK_MAX_ITEMS:
+        raise exceptions.ValidationError(f"Un lot ne peut pas dépasser {BULK_MAX_ITEMS} éléments.")
+    return items
+
+
+def _validate_items(serializer_class, items, partial=False):
+    """Valide chaque élément sans requête et retourne ([(indice, données)], erreurs)."""
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item, partial=partial)
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+        elif partial and 'id' not in serializer.validated_data:
+            errors.append(_error(index, "Ce champ est obligatoire.", field='id'))
+        else:
+            valid.append((index, dict(serializer.validated_data)))
+    return valid, errors
+
+
+def _item_ids(items):
+    """Extrait les identifiants d'un lot de suppression (entiers ou objets {"id": ...})."""
+    ids, errors = [], []
+    for index, item in enumerate(items):
+        value = item.get('id') if isinstance(item, dict) else item
+        try:
+            ids.append((index, int(value)))
+        except (TypeError, ValueError):
+            errors.append(_error(index, "Un identifiant entier est requis.", field='id'))
+    return ids, errors
+
+
+def _load(queryset, ids):
+    """Charge les objets du queryset par paquets d'identifiants."""
+    objects = {}
+    for chunk in _chunks(set(ids)):
+        objects.update((obj.pk, obj) for obj in queryset.filter(pk__in=chunk))
+    return objects
+
+
+def _existing_titles(pairs):
+    """Retourne {(project_id, title): issue_id} pour les couples déjà présents en base."""
+    titles_by_project = defaultdict(set)
+    for project_id, title in pairs:
+        titles_by_project[project_id].add(title)
+    existing = {}
+    for project_id, titles in titles_by_project.items():
+        for chunk in _chunks(titles):
+            rows = Issue.objects.filter(project_id=project_id, title__in=chunk).values_list('title', 'id')
+            existing.update(((project_id, title), issue_id) for title, issue_id in rows)
+    return existing
+
+
+def _contributor_pairs(pairs):
+    """Retourne l'ensemble des couples (project_id, user_id) correspondant à un contributeur."""
+    project_ids = {project_id for project_id, _ in pairs}
+    user_ids = {user_id for _, user_id in pairs}
+    found = set()
+    for chunk in _chunks(user_ids):
+        found.update(Contributor.objects.filter(project_id__in=project_ids, user_id__in=chunk)
+                     .values_list('project_id', 'user_id'))
+    return found
+
+
+def _check_issues(request, entries):
+    """Vérifie projet, titre et assignation de chaque tâche (état final) et retourne les erreurs."""
+    memberships = get_memberships(request)
+    existing = _existing_titles({(issue.project_id, issue.title) for _, issue in entries})
+    contributors = _contributor_pairs({
+        (issue.project_id, issue.assigned_to_id) for _, issue in entries if issue.assigned_to_id is not None
+    })
+    errors, seen = [], set()
+    for index, issue in entries:
+        key = (issue.project_id, issue.title)
+        if issue.project_id not in memberships:
+            errors.append(_error(index, PROJECT_FORBIDDEN, field='project'))
+        elif existing.get(key, issue.pk) != issue.pk or key in seen:
+            errors.append(_error(index, TITLE_TAKEN))
+        elif issue.assigned_to_id is not None and (issue.project_id, issue.assigned_to_id) not in contributors:
+            errors.append(_error(index, ASSIGNEE_INVALID, field='assigned_to'))
+        seen.add(key)
+    return errors
+
+
+def create_issues(request, items):
+    valid, errors = _validate_items(IssueBulkSerializer, items)
+    entries = [(index, Issue(**{k: v for k, v in data.items() if k != 'id'})) for index, data in valid]
+    errors += _check_issues(request, entries)
+    if errors:
+        return [], errors
+    issues = [issue for _, issue in entries]
+    # bulk_create et bulk_update n'émettent pas de signaux : les compteurs et les événements sont mis à jour ici
+    with _conflicts(), transaction.atomic(), counters.batch(), events.batch(), response_cache.batch():
+        Issue.objects.bulk_create(issues, batch_size=BATCH_SIZE)
+        for issue in issues:
+            counters.issue_added(issue)
+            events.issue_event(issue, events.CREATED)
+            response_cache.invalidate(issue.project_id)
+    return issues, []
+
+
+def update_issues(request, items):
+    valid, errors = _validate_items(IssueBulkSerializer, items, partial=True)
+    queryset = Issue.objects.filter(project_id__in=get_project_ids(request))
+    issues = _load(queryset, [data['id'] for _, data in valid])
+    entries, fields = [], {'updated_time'}
+    for index, data in valid:
+        issue = issues.get(data.pop('id'))
+        if issue is None:
+            errors.append(_error(index, NOT_FOUND, field='id'))
+        elif issue.assigned_to_id != request.user.pk:
+            errors.append(_error(index, FORBIDDEN, field='id'))
+        else:
+            for field, value in data.items():
+                setattr(issue, field, value)
+            fields.update(data)
+            entries.append((index, issue))
+    errors += _check_issues(request, entries)
+    if errors:
+        return [], errors
+
+    now = timezone.now()
+    moved, left = defaultdict(list), defaultdict(list)
+    for _, issue in entries:
+        issue.updated_time = now
+        if issue._loaded_project_id != issue.project_id:
+            moved[issue.project_id].append(issue.pk)
+            left[issue._loaded_project_id].append(issue.pk)
+    updated = [issue for _, issue in entries]
+    with _conflicts(), transaction.atomic(), counters.batch(), events.batch(), response_cache.batch():
+        Issue.objects.bulk_update(updated, sorted(fields), batch_size=BATCH_SIZE)
+        for issue in updated:
+            counters.issue_changed(issue)
+            events.issue_event(issue, events.UPDATED, previous_project_id=issue._loaded_project_id)
+            response_cache.invalidate(issue.project_id, issue._loaded_project_id)
+        # Traces pour les membres des anciens projets, commentaires compris (encore rattachés à ces projets), et
+        # événements des commentaires déplacés
+        targets = {issue.pk: issue.project_id for issue in updated}
+        for project_id, issue_ids in left.items():
+            for chunk in _chunks(issue_ids):
+                comments = list(Comment.objects.filter(issue_id__in=chunk))
+                sync.record_moves(project_id, chunk, [comment.pk for comment in comments])
+                for comment in comments:
+                    comment.project_id, comment.updated_time = targets[comment.issue_id], now
+                    events.comment_event(comment, events.UPDATED, previous_project_id=project_id)
+        # Reporter le déplacement des tâches sur le projet dénormalisé de leurs commentaires
+        for project_id, issue_ids in moved.items():
+            for chunk in _chunks(issue_ids):
+                Comment.objects.filter(issue_id__in=chunk).update(project_id=project_id, updated_time=now)
+    for issue in updated:
+        issue._loaded_project_id = issue.project_id
+    return updated, []
+
+
+def _destroy(request, model, items, owner_field):
+    """Supprime les objets dont l'utilisateur est responsable (champ `owner_field`)."""
+    ids, errors = _item_ids(items)
+    objects = _load(model.objects.filter(project_id__in=get_project_ids(request)).only('id', owner_field),
+                    [object_id for _, object_id in ids])
+    for index, object_id in ids:
+        obj = objects.get(object_id)
+        if obj is None:
+            errors.append(_error(index, NOT_FOUND, field='id'))
+        elif getattr(obj, owner_field) != request.user.pk:
+            errors.append(_error(index, FORBIDDEN, field='id'))
+    if errors:
+        return 0, errors
+    with transaction.atomic(), counters.batch(), events.batch(), response_cache.batch():
+        for chunk in _chunks(objects):
+            model.objects.filter(pk__in=chunk).delete()
+    return len(objects), []
+
+
+def destroy_issues(request, items):
+    return _destroy(request, Issue, items, 'assigned_to_id')
+
+
+def _issue_projects(request, issue_ids):
+    """Retourne {issue_id: project_id} pour les tâches accessibles à l'utilisateur."""
+    queryset = Issue.objects.filter(project_id__in=get_project_ids(request))
+    found = {}
+    for chunk in _chunks(set(issue_ids)):
+        found.update(queryset.filter(pk__in=chunk).values_list('id', 'project_id'))
+    return found
+
+
+def create_comments(request, items):
+    valid, errors = _validate_items(CommentBulkSerializer, items)
+    issue_projects = _issue_projects(request, [data['issue_id'] for _, data in valid])
+    comments = []
+    for index, data in valid:
+        project_id = issue_projects.get(data['issue_id'])
+        if project_id is None:
+            errors.append(_error(index, ISSUE_FORBIDDEN, field='issue'))
+            continue
+        comments.append(Comment(description=data['description'], issue_id=data['issue_id'],
+                                project_id=project_id, author=request.user))
+    if errors:
+        return [], errors
+    with transaction.atomic(), counters.batch(), events.batch(), response_cache.batch():
+        Comment.objects.bulk_create(comments, batch_size=BATCH_SIZE)
+        for comment in comments:
+            counters.comment_added(comment)
+            events.comment_event(comment, events.CREATED)
+            response_cache.invalidate(comment.project_id)
+    return comments, []
+
+
+def update_comments(request, items):
+    valid, errors = _validate_items(CommentBulkSerializer, items, partial=True)
+    comments = _load(Comment.objects.filter(project_id__in=get_project_ids(request)),
+                     [data['id'] for _, data in valid])
+    issue_projects = _issue_projects(request, [data['issue_id'] for _, data in valid if 'issue_id' in data])
+    updated, fields = [], {'updated_time'}
+    for index, data in valid:
+        comment = comments.get(data.pop('id'))
+        if comment is None:
+            errors.append(_error(index, NOT_FOUND, field='id'))
+        elif comment.author_id != request.user.pk:
+            errors.append(_error(index, FORBIDDEN, field='id'))
+        elif 'issue_id' in data and data['issue_id'] not in issue_projects:
+            errors.append(_error(index, ISSUE_FORBIDDEN, field='issue'))
+        else:
+            if 'issue_id' in data:
+                data['project_id'] = issue_projects[data['issue_id']]
+            for field, value in data.items():
+                setattr(comment, field, value)
+            fields.update(data)
+            updated.append(comment)
+    if errors:
+        return [], errors
+    now = timezone.now()
+    for comment in updated:
+        comment.updated_time = now
+    with transaction.atomic(), counters.batch(), events.batch(), response_cache.batch():
+        Comment.objects.bulk_update(updated, sorted(fields), batch_size=BATCH_SIZE)
+        left = defaultdict(list)
+        for comment in updated:
+            if comment._loaded_issue[1] != comment.project_id:
+                left[comment._loaded_issue[1]].append(comment.pk)
+        for project_id, comment_ids in left.items():
+            sync.record_moves(project_id, comment_ids=comment_ids)
+        for comment in updated:
+            events.comment_event(comment, events.UPDATED, previous_project_id=comment._loaded_issue[1])
+            response_cache.invalidate(comment.project_id, comment._loaded_issue[1])
+            counters.comment_changed(comment)
+    return updated, []
+
+
+def destroy_comments(request, items):
+    return _destroy(request, Comment, items, 'author_id')
+
+
+def move_issue(request, issue, project_id, assigned_to_id):
+    """
+    Déplace la tâche et ses commentaires vers le projet `project_id` en une transaction, avec deux UPDATE
+    quel que soit le nombre de commentaires. Le projet cible, le titre et l'assigné sont vérifiés comme pour
+    un lot. Retourne (tâche déplacée, erreurs) ; `issue` n'est pas modifiée.
+    """
+    old_project_id = issue.project_id
+    if project_id == old_project_id:
+        return None, [_error(0, ALREADY_IN_PROJECT, field='project')]
+    with _conflicts(), transaction.atomic(), counters.batch(), events.batch(), response_cache.batch():
+        # Relue dans la transaction : un nouvel essai (retry_on_lock) repart de l'état enregistré
+        moved = Issue.objects.filter(pk=issue.pk, project_id=old_project_id).first()
+        if moved is None:
+            raise exceptions.ValidationError(CONFLICT)
+        moved.project_id, moved.assigned_to_id = project_id, assigned_to_id
+        errors = _check_issues(request, [(0, moved)])
+        if errors:
+            return None, errors
+        moved.updated_time = now = timezone.now()
+        if not Issue.objects.filter(pk=moved.pk, project_id=old_project_id).update(
+                project_id=project_id, assigned_to_id=assigned_to_id, updated_time=now):
+            raise exceptions.ValidationError(CONFLICT)
+        comments = list(Comment.objects.filter(issue_id=moved.pk))
+        Comment.objects.filter(issue_id=moved.pk).update(project_id=project_id, updated_time=now)
+        sync.record_moves(old_project_id, [moved.pk], [comment.pk for comment in comments])
+        # Les compteurs de la tâche et de ses commentaires passent d'un projet à l'autre
+        counters.issue_changed(moved)
+        events.issue_event(moved, events.UPDATED, previous_project_id=old_project_id)
+        for comment in comments:
+            comment.project_id, comment.updated_time = project_id, now
+            comment._loaded_issue = (comment.issue_id, project_id)
+            events.comment_event(comment, events.UPDATED, previous_project_id=old_project_id)
+        response_cache.invalidate(project_id, old_project_id)
+    moved._loaded_project_id = project_id
+    return moved, []
@@ -0,0 +1,18 @@
+"""
+Caches partagés entre les processus. Une donnée dont l'invalidation doit atteindre tous les workers
+(appartenances, utilisateurs authentifiés...) n'est gardée d'une requête à l'autre que dans un cache partagé :
+LocMemCache est propre au processus qui l'invalide, DummyCache ne garde rien.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def shared_cache(alias):
+    """Retourne le cache `alias` s'il est partagé entre les processus, sinon None."""
+    if not alias:
+        return None
+    cache = caches[alias]
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        return None
+    return cache
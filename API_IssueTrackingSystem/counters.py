@@ -0,0 +1,179 @@
+"""
+Compteurs matérialisés des tableaux de bord : tâches d'un projet par statut, priorité et étiquette,
+commentaires par projet et par tâche. Ils sont tenus à jour à chaque écriture (signaux et opérations
+en masse) pour que /projects/{id}/stats/ se lise sans parcourir les tâches ; la commande
+`rebuild_counters` les recalcule en cas de dérive.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from API_IssueTrackingSystem.models import Project, Issue, Comment, ProjectCounter, IssueCommentCounter
+
+# Nombre de tâches les plus commentées renvoyées par les statistiques d'un projet
+STATS_TOP_ISSUES = getattr(settings, 'STATS_TOP_ISSUES', 20)
+
+# Nombre de projets recalculés par transaction
+REBUILD_BATCH_SIZE = 500
+
+COMMENTS = 'comments'
+
+_pending = ContextVar('counter_deltas', default=None)
+
+
+class Deltas:
+    """Variations accumulées, appliquées en une requête UPDATE par compteur touché."""
+
+    def __init__(self):
+        self.projects = Counter()
+        self.issues = Counter()
+
+    def apply(self):
+        for (project_id, dimension, value), delta in self.projects.items():
+            if delta:
+                _bump(ProjectCounter.objects.filter(project_id=project_id, dimension=dimension, value=value), delta,
+                      ProjectCounter(project_id=project_id, dimension=dimension, value=value))
+        for (issue_id, project_id), delta in self.issues.items():
+            if delta:
+                _bump(IssueCommentCounter.objects.filter(issue_id=issue_id), delta,
+                      IssueCommentCounter(issue_id=issue_id, project_id=project_id))
+
+
+def _bump(queryset, delta, row):
+    if queryset.update(count=F('count') + delta) or delta < 0:
+        return
+    # Premier élément compté : créer la ligne (sans écraser celle d'une transaction concurrente), puis incrémenter
+    type(row).objects.bulk_create([row], ignore_conflicts=True)
+    queryset.update(count=F('count') + delta)
+
+
+@contextmanager
+def _deltas():
+    deltas = _pending.get()
+    if deltas is not None:
+        yield deltas
+        return
+    deltas = Deltas()
+    yield deltas
+    deltas.apply()
+
+
+@contextmanager
+def batch():
+    """Regroupe les variations des compteurs du bloc et les applique à sa sortie (opérations en masse)."""
+    if _pending.get() is not None:
+        yield
+        return
+    deltas = Deltas()
+    token = _pending.set(deltas)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    deltas.apply()
+
+
+def issue_added(issue, sign=1):
+    with _deltas() as deltas:
+        for field in Issue.COUNTED_FIELDS:
+            deltas.projects[issue.project_id, field, getattr(issue, field)] += sign
+    issue._loaded_counted = {name: issue.__dict__.get(name) for name in ('project_id', *Issue.COUNTED_FIELDS)}
+
+
+def issue_changed(issue):
+    """Reporte sur les compteurs les changements de projet, statut, priorité ou étiquette d'une tâche."""
+    loaded = getattr(issue, '_loaded_counted', None)
+    if loaded is None:
+        return
+    with _deltas() as deltas:
+        for field in Issue.COUNTED_FIELDS:
+            # Un champ différé n'a pas été chargé, donc pas modifié
+            if loaded[field] is not None:
+                deltas.projects[loaded['project_id'], field, loaded[field]] -= 1
+                deltas.projects[issue.project_id, field, issue.__dict__.get(field, loaded[field])] += 1
+    if loaded['project_id'] != issue.project_id:
+        _issue_moved(issue.pk, loaded['project_id'], issue.project_id)
+    issue._loaded_counted = {name: issue.__dict__.get(name, loaded[name]) for name in loaded}
+
+
+def _issue_moved(issue_id, old_project_id, new_project_id):
+    """Les commentaires suivent la tâche : déplacer leur nombre vers le nouveau projet."""
+    comments = IssueCommentCounter.objects.filter(issue_id=issue_id).values_list('count', flat=True).first()
+    if not comments:
+        return
+    IssueCommentCounter.objects.filter(issue_id=issue_id).update(project_id=new_project_id)
+    with _deltas() as deltas:
+        deltas.projects[old_project_id, COMMENTS, ''] -= comments
+        deltas.projects[new_project_id, COMMENTS, ''] += comments
+
+
+def comment_added(comment, sign=1):
+    with _deltas() as deltas:
+        deltas.projects[comment.project_id, COMMENTS, ''] += sign
+        deltas.issues[comment.issue_id, comment.project_id] += sign
+    comment._loaded_issue = (comment.issue_id, comment.project_id)
+
+
+def comment_changed(comment):
+    loaded = getattr(comment, '_loaded_issue', None)
+    if loaded is None or loaded[0] is None or loaded[0] == comment.issue_id:
+        return
+    issue_id, project_id = loaded
+    with _deltas() as deltas:
+        deltas.projects[project_id, COMMENTS, ''] -= 1
+        deltas.issues[issue_id, project_id] -= 1
+        deltas.projects[comment.project_id, COMMENTS, ''] += 1
+        deltas.issues[comment.issue_id, comment.project_id] += 1
+    comment._loaded_issue = (comment.issue_id, comment.project_id)
+
+
+def rebuild(project_ids=None):
+    """Recalcule entièrement les compteurs des projets donnés (de tous les projets par défaut)."""
+    if project_ids is None:
+        project_ids = Project.objects.values_list('id', flat=True).order_by('id')
+    project_ids = list(project_ids)
+    for start in range(0, len(project_ids), REBUILD_BATCH_SIZE):
+        chunk = project_ids[start:start + REBUILD_BATCH_SIZE]
+        issues = Issue.objects.filter(project_id__in=chunk).order_by()
+        project_rows = [
+            ProjectCounter(project_id=project_id, dimension=field, value=value, count=count)
+            for field in Issue.COUNTED_FIELDS
+            for project_id, value, count in issues.values_list('project_id', field).annotate(count=Count('id'))
+        ]
+        issue_rows, comments = [], Counter()
+        for issue_id, project_id, count in (Comment.objects.filter(project_id__in=chunk).order_by()
+                                            .values_list('issue_id', 'project_id').annotate(count=Count('id'))):
+            issue_rows.append(IssueCommentCounter(issue_id=issue_id, project_id=project_id, count=count))
+            comments[project_id] += count
+        project_rows += [ProjectCounter(project_id=project_id, dimension=COMMENTS, value='', count=count)
+                         for project_id, count in comments.items()]
+        with transaction.atomic():
+            ProjectCounter.objects.filter(project_id__in=chunk).delete()
+            IssueCommentCounter.objects.filter(Q(project_id__in=chunk) | Q(issue__project_id__in=chunk)).delete()
+            ProjectCounter.objects.bulk_create(project_rows, batch_size=REBUILD_BATCH_SIZE)
+            IssueCommentCounter.objects.bulk_create(issue_rows, batch_size=REBUILD_BATCH_SIZE)
+
+
+def project_stats(project_id):
+    """Statistiques d'un projet, lues dans les compteurs en deux requêtes."""
+    issues = {field: {value: 0 for value, _ in Issue._meta.get_field(field).choices}
+              for field in Issue.COUNTED_FIELDS}
+    comments = 0
+    for dimension, value, count in (ProjectCounter.objects.filter(project_id=project_id)
+                                    .values_list('dimension', 'value', 'count')):
+        if dimension == COMMENTS:
+            comments = count
+        elif dimension in issues:
+            issues[dimension][value] = count
+    top_issues = (IssueCommentCounter.objects.filter(project_id=project_id, count__gt=0)
+                  .order_by('-count', 'issue_id').values_list('issue_id', 'count')[:STATS_TOP_ISSUES])
+    return {
+        'issues': {'total': sum(issues['status'].values()), **issues},
+        'comments': {
+            'total': comments,
+            'top_issues': [{'issue': issue_id, 'count': count} for issue_id, count in top_issues],
+        },
+    }
@@ -0,0 +1,337 @@
+"""
+Flux des créations, modifications et suppressions de tâches, commentaires et contributeurs, poussé aux membres
+de chaque projet (Server-Sent Events, voir sse.py). Les événements sont publiés après la validation de leur
+transaction dans un courtier interchangeable (`EVENT_BROKER`). LocalBroker, le courtier par défaut, les
+diffuse dans le processus courant : il suppose que les écritures et les flux sont servis par le même
+processus ASGI ; un courtier partagé (Redis, PostgreSQL LISTEN/NOTIFY...) implémente la même interface.
+Les données d'un événement ne sont sérialisées que si un abonné les attend : sans abonné (toujours le cas sous
+WSGI), publier ne coûte presque rien.
+"""
+import asyncio
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+from API_IssueTrackingSystem.serializers import IssueSerializer, CommentSerializer, ContributorSerializer
+
+# Chemin d'import de la classe du courtier
+EVENT_BROKER = getattr(settings, 'EVENT_BROKER', 'API_IssueTrackingSystem.events.LocalBroker')
+
+# Événements en attente d'envoi par abonné ; au-delà, le client est trop lent et doit se resynchroniser
+EVENT_QUEUE_SIZE = getattr(settings, 'EVENT_QUEUE_SIZE', 1000)
+
+# Derniers événements conservés pour reprendre un flux interrompu (en-tête Last-Event-ID)
+EVENT_REPLAY_SIZE = getattr(settings, 'EVENT_REPLAY_SIZE', 10_000)
+
+CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+
+# Événement qui arrête le flux : le client doit se resynchroniser
+RESET = 'reset'
+
+RESET_DETAIL = "Des événements ont été perdus : resynchronisez-vous avec /sync/ avant de rouvrir le flux."
+
+_pending = ContextVar('pending_events', default=None)
+
+
+class Message:
+    """Événement à publier : `name` (ex. « issue.created »), fonction sans argument qui construit ses données,
+    projets concernés et, pour un contributeur, l'utilisateur dont l'appartenance change (il le reçoit même s'il
+    n'est pas, ou plus, membre du projet)."""
+    __slots__ = ('name', 'build', 'project_ids', 'user_id')
+
+    def __init__(self, name, build, project_ids, user_id=None):
+        self.name = name
+        self.build = build
+        self.project_ids = tuple(project_ids)
+        self.user_id = user_id
+
+
+class Event:
+    """
+    Événement publié, numéroté par le courtier. Sa trame SSE est encodée au premier besoin (remise ou reprise),
+    une seule fois pour tous les abonnés.
+    """
+    __slots__ = ('id', 'name', 'project_ids', 'user_id', '_build', '_frame')
+
+    def __init__(self, event_id, message):
+        self.id = event_id
+        self.name = message.name
+        self.project_ids = message.project_ids
+        self.user_id = message.user_id
+        self._build = message.build
+        self._frame = None
+
+    def render(self):
+        if self._frame is None:
+            data = json.dumps(self._build(), cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+            self._frame = f'id: {self.id}\nevent: {self.name}\ndata: {data}\n\n'.encode()
+            # L'instance sérialisée n'est plus retenue par l'historique
+            self._build = None
+        return self._frame
+
+
+def reset_frame():
+    data = json.dumps({'detail': RESET_DETAIL}, ensure_ascii=False)
+    return f'event: {RESET}\ndata: {data}\n\n'.encode()
+
+
+class Subscription:
+    """
+    Abonnement d'un flux ouvert, consommé dans la boucle d'événements qui l'a créé. Le courtier lui remet les
+    trames depuis n'importe quel fil ; la boucle n'est réveillée qu'une fois par lot.
+    """
+
+    def __init__(self, broker, user_id, project_ids, loop):
+        self.broker = broker
+        self.user_id = user_id
+        self.project_ids = set(project_ids)
+        self.loop = loop
+        self.frames = deque()
+        self.closed = False
+        # Des événements ont été perdus (client trop lent ou reprise trop ancienne)
+        self.lagging = False
+        self._ready = asyncio.Event()
+
+    def deliver(self, events):
+        """Appelée dans la boucle de l'abonnement."""
+        if self.closed or self.lagging:
+            return
+        for event in events:
+            if event.name == RESET:
+                self.lag()
+                return
+            self.frames.append(event.render())
+            if event.user_id == self.user_id and event.name.startswith('contributor.'):
+                # L'utilisateur rejoint ou quitte un projet : suivre ses événements, ou cesser de les recevoir
+                project_id = event.project_ids[0]
+                if event.name.endswith(DELETED):
+                    self.broker.unfollow(self, project_id)
+                elif project_id not in self.project_ids:
+                    self.broker.follow(self, project_id)
+        if len(self.frames) > EVENT_QUEUE_SIZE:
+            self.lag()
+        self._ready.set()
+
+    def lag(self):
+        """Des événements ont été perdus : le flux s'arrête et le client devra se resynchroniser."""
+        self.frames.clear()
+        self.lagging = True
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def wait(self, timeout):
+        """Attend des trames, la fermeture de l'abonnement ou l'expiration du délai."""
+        if not self.frames and not self.closed and not self.lagging:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._ready.clear()
+        frames = list(self.frames)
+        self.frames.clear()
+        return frames
+
+
+class BaseBroker(ABC):
+
+    @abstractmethod
+    def publish(self, messages):
+        """Publie des Message, depuis n'importe quel fil ; appelée après la validation de leur transaction."""
+
+    @abstractmethod
+    def subscribe(self, user_id, project_ids, last_event_id=None):
+        """Retourne une Subscription pour la boucle courante, en rejouant les événements suivant `last_event_id`."""
+
+    @abstractmethod
+    def unsubscribe(self, subscription):
+        """Ferme l'abonnement et cesse de lui remettre des événements."""
+
+    @abstractmethod
+    def follow(self, subscription, project_id):
+        """Remet désormais à l'abonnement les événements du projet."""
+
+    @abstractmethod
+    def unfollow(self, subscription, project_id):
+        """Cesse de remettre à l'abonnement les événements du projet."""
+
+
+class LocalBroker(BaseBroker):
+    """
+    Courtier en mémoire du processus courant. Les abonnés sont indexés par projet et par utilisateur : publier
+    ne coûte que les abonnés concernés, et les connexions inactives ne coûtent rien.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_project = defaultdict(set)
+        self._by_user = defaultdict(set)
+        self._history = deque(maxlen=EVENT_REPLAY_SIZE)
+        self._last_id = 0
+
+    def publish(self, messages):
+        deliveries = defaultdict(lambda: defaultdict(list))
+        delivered = []
+        with self._lock:
+            if not self._by_user:
+                # Aucun abonné : ni données, ni historique. Les Last-Event-ID antérieurs à ce trou ne peuvent plus
+                # être repris, leurs clients recevront `reset`
+                self._last_id += len(messages)
+                self._history.clear()
+                return
+            for message in messages:
+                self._last_id += 1
+                event = Event(self._last_id, message)
+                self._history.append(event)
+                targets = self._targets(event)
+                if targets:
+                    delivered.append(event)
+                for subscription in targets:
+                    deliveries[subscription.loop][subscription].append(event)
+        # Trames encodées dans le fil de l'écriture, hors du verrou et des boucles d'événements ; celles des
+        # événements sans destinataire ne le seront qu'en cas de reprise
+        for event in delivered:
+            event.render()
+        # Un seul réveil par boucle d'événements, quel que soit le nombre d'abonnés et d'événements
+        for loop, batch in deliveries.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, batch)
+            except RuntimeError:
+                # Boucle fermée : ses abonnements disparaissent avec elle
+                pass
+
+    def _targets(self, event):
+        targets = set(self._by_user.get(event.user_id, ())) if event.user_id is not None else set()
+        for project_id in event.project_ids:
+            targets.update(self._by_project.get(project_id, ()))
+        return targets
+
+    def subscribe(self, user_id, project_ids, last_event_id=None):
+        subscription = Subscription(self, user_id, project_ids, asyncio.get_running_loop())
+        with self._lock:
+            self._by_user[user_id].add(subscription)
+            for project_id in subscription.project_ids:
+                self._by_project[project_id].add(subscription)
+            if last_event_id is not None:
+                replay = self._replay(subscription, last_event_id)
+        if last_event_id is not None:
+            if replay is None:
+                subscription.lag()
+            elif replay:
+                subscription.deliver(replay)
+        return subscription
+
+    def _replay(self, subscription, last_event_id):
+        """Événements de l'abonné postérieurs à `last_event_id`, ou None s'ils ne sont plus tous conservés."""
+        oldest = self._history[0].id if self._history else self._last_id + 1
+        if last_event_id > self._last_id or last_event_id < oldest - 1:
+            return None
+        return [event for event in self._history if event.id > last_event_id and (
+            event.user_id == subscription.user_id or subscription.project_ids.intersection(event.project_ids))]
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self._lock:
+            _discard(self._by_user, subscription.user_id, subscription)
+            for project_id in subscription.project_ids:
+                _discard(self._by_project, project_id, subscription)
+
+    def follow(self, subscription, project_id):
+        with self._lock:
+            subscription.project_ids.add(project_id)
+            self._by_project[project_id].add(subscription)
+
+    def unfollow(self, subscription, project_id):
+        with self._lock:
+            subscription.project_ids.discard(project_id)
+            _discard(self._by_project, project_id, subscription)
+
+
+def _discard(index, key, subscription):
+    subscribers = index.get(key)
+    if subscribers is not None:
+        subscribers.discard(subscription)
+        if not subscribers:
+            del index[key]
+
+
+def _deliver(batch):
+    for subscription, events in batch.items():
+        subscription.deliver(events)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(EVENT_BROKER)()
+
+
+def _publish(messages):
+    get_broker().publish(messages)
+
+
+@contextmanager
+def batch():
+    """Regroupe les événements du bloc en une seule publication, après la validation (opérations en masse)."""
+    if _pending.get() is not None:
+        yield
+        return
+    messages = []
+    token = _pending.set(messages)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    if messages:
+        transaction.on_commit(lambda: _publish(messages))
+
+
+def emit(name, build, project_ids, user_id=None):
+    message = Message(name, build, project_ids, user_id)
+    messages = _pending.get()
+    if messages is not None:
+        messages.append(message)
+    else:
+        transaction.on_commit(lambda: _publish([message]))
+
+
+def _serialize(serializer_class, instance):
+    return serializer_class(instance).data
+
+
+# Les données sont lues sur l'instance au moment de la publication, après la validation de la transaction
+
+def issue_event(issue, action, previous_project_id=None):
+    """Une tâche déplacée est aussi annoncée aux membres de son ancien projet."""
+    build = (partial(dict, id=issue.pk, project=issue.project_id) if action == DELETED
+             else partial(_serialize, IssueSerializer, issue))
+    project_ids = {issue.project_id, previous_project_id or issue.project_id}
+    emit(f'issue.{action}', build, project_ids)
+
+
+def comment_event(comment, action, previous_project_id=None):
+    build = (partial(dict, id=comment.pk, project=comment.project_id, issue=comment.issue_id) if action == DELETED
+             else partial(_serialize, CommentSerializer, comment))
+    project_ids = {comment.project_id, previous_project_id or comment.project_id}
+    emit(f'comment.{action}', build, project_ids)
+
+
+def contributor_event(contributor, action):
+    build = (partial(dict, id=contributor.pk, project=contributor.project_id, user=contributor.user_id)
+             if action == DELETED else partial(_serialize, ContributorSerializer, contributor))
+    emit(f'contributor.{action}', build, [contributor.project_id], user_id=contributor.user_id)
+
+
+def reset_event(project_ids):
+    """Des lignes de ces projets ont changé sans événement (suppressions directes) : leurs flux s'arrêtent sur
+    un événement `reset`, et leurs clients se resynchronisent avec /sync/."""
+    emit(RESET, partial(dict, detail=RESET_DETAIL), project_ids)
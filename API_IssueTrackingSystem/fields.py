@@ -0,0 +1,104 @@
+"""
+Champs de relation validés à partir des appartenances de la requête (chargées une fois, voir membership.py).
+Leur queryset n'est construit que si l'API navigable affiche la liste des choix : une requête JSON
+ne le construit ni ne l'évalue jamais.
+"""
+from abc import ABCMeta, abstractmethod
+
+from django.contrib.auth import get_user_model
+from rest_framework import serializers
+from API_IssueTrackingSystem.models import Project, Contributor, Issue
+from API_IssueTrackingSystem.membership import get_project_ids, is_member
+
+
+class MembershipRelatedField(serializers.PrimaryKeyRelatedField, metaclass=ABCMeta):
+    """Relation par clé primaire dont la validation passe par `lookup()` plutôt que par le queryset."""
+
+    def get_queryset(self):
+        return self.choices(self.context['request'])
+
+    @abstractmethod
+    def choices(self, request):
+        """Retourne le queryset des objets proposés par l'API navigable."""
+
+    @abstractmethod
+    def lookup(self, request, pk):
+        """Retourne l'objet si l'utilisateur peut y faire référence, sinon None."""
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = self.lookup(self.context['request'], pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class MemberProjectField(MembershipRelatedField):
+    """Projet dont l'utilisateur est contributeur ; validé sans requête."""
+
+    def choices(self, request):
+        return Project.objects.filter(id__in=get_project_ids(request))
+
+    def lookup(self, request, pk):
+        if not is_member(request, pk):
+            return None
+        # Instance dont seuls les identifiants sont chargés : les autres champs le seront à la première lecture
+        return Project.from_db(Project.objects.db, ['id'], [pk])
+
+
+class MemberIssueField(MembershipRelatedField):
+    """Tâche d'un projet de l'utilisateur ; une seule lecture par clé primaire."""
+
+    def choices(self, request):
+        return Issue.objects.filter(project_id__in=get_project_ids(request))
+
+    def lookup(self, request, pk):
+        issue = Issue.objects.filter(pk=pk).only('id', 'project_id').first()
+        if issue is None or not is_member(request, issue.project_id):
+            return None
+        return issue
+
+
+class NewContributorField(MembershipRelatedField):
+    """Utilisateur qui ne participe encore à aucun des projets de l'utilisateur courant."""
+
+    def choices(self, request):
+        return get_user_model().objects.exclude(contributor__project__contributor__user=request.user)
+
+    def lookup(self, request, pk):
+        if Contributor.objects.filter(user_id=pk, project_id__in=get_project_ids(request)).exists():
+            return None
+        return get_user_model().objects.filter(pk=pk).only('id').first()
+
+
+class AssigneeField(MembershipRelatedField):
+    """
+    Utilisateur assigné à une tâche, accepté sans requête : son appartenance au projet (qui implique son
+    existence) est vérifiée par IssueSerializer.validate, dans la même requête que l'unicité du titre.
+    """
+
+    def choices(self, request):
+        return get_user_model().objects.filter(contributor__project_id__in=get_project_ids(request)).distinct()
+
+    def lookup(self, request, pk):
+        model = get_user_model()
+        return model.from_db(model.objects.db, ['id'], [pk])
+
+
+class MembershipRelatedFieldsMixin:
+    """Remplace les champs de relation listés dans `membership_related_fields` par leur version ci-dessus."""
+    membership_related_fields = {}
+
+    def build_relational_field(self, field_name, relation_info):
+        field_class, field_kwargs = super().build_relational_field(field_name, relation_info)
+        if field_name in self.membership_related_fields:
+            field_class = self.membership_related_fields[field_name]
+            field_kwargs.pop('queryset', None)
+        return field_class, field_kwargs
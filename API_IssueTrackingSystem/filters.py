@@ -0,0 +1,63 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import exceptions
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+class FieldFilter(BaseFilterBackend):
+    """
+    Filtre par égalité sur les champs listés dans `view.filter_fields` : ?status=en cours&priority=élevée.
+    Plusieurs valeurs séparées par des virgules donnent un filtre `__in`. Les valeurs sont validées
+    (choix du modèle, identifiants entiers) et les relations sont filtrées sur leur colonne, sans jointure.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for name in getattr(view, 'filter_fields', ()):
+            value = request.query_params.get(name)
+            if not value:
+                continue
+            field = queryset.model._meta.get_field(name)
+            values = [self._clean(field, name, item.strip()) for item in value.split(',')]
+            if len(values) == 1:
+                queryset = queryset.filter(**{field.attname: values[0]})
+            else:
+                queryset = queryset.filter(**{f'{field.attname}__in': values})
+        return queryset
+
+    @staticmethod
+    def _clean(field, name, value):
+        try:
+            value = field.to_python(value)
+        except DjangoValidationError:
+            raise exceptions.ValidationError({name: f"Valeur invalide : {value}."})
+        if field.choices and value not in dict(field.choices):
+            raise exceptions.ValidationError({name: f"Valeur invalide : {value}."})
+        return value
+
+
+class StableOrderingFilter(OrderingFilter):
+    """
+    Tri ?ordering=-priority,created_time sur `view.ordering_fields`, complété par l'identifiant
+    pour que la pagination par décalage reste déterministe. Un champ inconnu est refusé (400) plutôt qu'ignoré.
+    Incompatible avec la pagination par curseur, qui impose son propre ordre (created_time, id).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if request.query_params.get(self.ordering_param):
+            is_cursor_request = getattr(view.paginator, 'is_cursor_request', None)
+            if is_cursor_request is not None and is_cursor_request(request):
+                raise exceptions.ValidationError(
+                    {self.ordering_param: "Le tri n'est pas disponible avec la pagination par curseur."})
+        return super().filter_queryset(request, queryset, view)
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid = super().remove_invalid_fields(queryset, fields, view, request)
+        invalid = [term for term in fields if term not in valid]
+        if invalid:
+            raise exceptions.ValidationError({self.ordering_param: f"Tri inconnu : {', '.join(invalid)}."})
+        return valid
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering = [*ordering, 'id']
+        return ordering
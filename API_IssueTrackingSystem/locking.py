@@ -0,0 +1,36 @@
+"""
+Nouvelles tentatives des écritures refusées parce que la base est verrouillée (SQLite sous des écritures
+concurrentes, une fois `busy_timeout` écoulé). Une tentative rejoue toujours une transaction complète :
+on ne réessaie jamais à l'intérieur d'une transaction englobante, déjà perdue.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+# Nombre total de tentatives d'une écriture refusée par le verrou de la base
+LOCK_RETRY_ATTEMPTS = getattr(settings, 'LOCK_RETRY_ATTEMPTS', 5)
+
+# Attente (en secondes) avant la deuxième tentative, doublée à chaque nouvel échec
+LOCK_RETRY_BASE_DELAY = getattr(settings, 'LOCK_RETRY_BASE_DELAY', 0.05)
+
+
+def is_lock_error(error):
+    # « database is locked » (SQLITE_BUSY) ou « database table is locked » (SQLITE_LOCKED)
+    return isinstance(error, OperationalError) and 'is locked' in str(error)
+
+
+def retry_on_lock(func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Appelle func(*args, **kwargs), qui doit écrire dans sa propre transaction, et la rejoue avec une attente
+    exponentielle (et aléatoire, pour désynchroniser les écrivains) tant que la base est verrouillée.
+    """
+    for attempt in range(LOCK_RETRY_ATTEMPTS):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as error:
+            if (not is_lock_error(error) or attempt == LOCK_RETRY_ATTEMPTS - 1
+                    or connections[using].in_atomic_block):
+                raise
+        time.sleep(LOCK_RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
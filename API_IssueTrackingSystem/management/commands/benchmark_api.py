@@ -0,0 +1,197 @@
+import io
+import json
+import random
+import sys
+from collections import defaultdict
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+from API_IssueTrackingSystem.models import Contributor, Issue, Comment
+
+# Répartition par défaut des requêtes rejouées (poids relatifs)
+DEFAULT_MIX = {
+    'project-list': 10,
+    'project-detail': 10,
+    'issue-list': 20,
+    'issue-detail': 15,
+    'comment-list': 20,
+    'comment-detail': 10,
+    'contributor-list': 5,
+    'contributor-detail': 5,
+    'sync': 3,
+    'user_data': 2,
+}
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def quantile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = ("Rejoue un mélange de requêtes sur l'application WSGI (config.wsgi) dans le processus courant et "
+            "mesure par route latences moyenne et p50/p95/p99, requêtes SQL par appel et débit (requêtes de la "
+            "route rapportées à la durée totale de la mesure).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help="Nombre de requêtes mesurées.")
+        parser.add_argument('--warmup', type=int, default=50, help="Requêtes de chauffe non mesurées.")
+        parser.add_argument('--users', type=int, default=20, help="Nombre d'utilisateurs simulés.")
+        parser.add_argument('--mix', default='',
+                            help="Répartition des routes, par ex. 'issue-list=5,comment-list=3'. "
+                                 f"Routes disponibles : {', '.join(DEFAULT_MIX)}, export_data.")
+        parser.add_argument('--host', default='localhost',
+                            help="En-tête Host envoyé (doit figurer dans ALLOWED_HOSTS).")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help="Sortie JSON.")
+
+    def handle(self, *args, **options):
+        from config.wsgi import application
+
+        self.application = application
+        self.host = options['host']
+        self.random = random.Random(options['seed'])
+        mix = self._parse_mix(options['mix']) if options['mix'] else DEFAULT_MIX
+        actors = self._prepare_actors(options['users'])
+        routes, weights = list(mix), list(mix.values())
+
+        for _ in range(options['warmup']):
+            self._call(*self._pick(actors, routes, weights)[1:])
+
+        samples = defaultdict(list)
+        start = perf_counter()
+        for _ in range(options['requests']):
+            route, path, token = self._pick(actors, routes, weights)
+            duration, queries, status = self._call(path, token)
+            samples[route].append((duration, queries, status))
+        wall_time = perf_counter() - start
+
+        report = self._report(samples, wall_time, options['requests'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print(report)
+
+    def _parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            route, _, weight = part.partition('=')
+            if route.strip() not in DEFAULT_MIX and route.strip() != 'export_data':
+                raise CommandError(f"Route inconnue : {route}")
+            mix[route.strip()] = float(weight or 1)
+        return mix
+
+    def _prepare_actors(self, count):
+        """Choisit des utilisateurs ayant des projets et précharge quelques identifiants accessibles."""
+        user_ids = list(Contributor.objects.values_list('user_id', flat=True).distinct()[:count * 10])
+        if not user_ids:
+            raise CommandError("Aucun contributeur en base : lancez d'abord `manage.py generate_dataset`.")
+        users = get_user_model().objects.in_bulk(self.random.sample(user_ids, min(count, len(user_ids))))
+        actors = []
+        for user in users.values():
+            project_ids = list(Contributor.objects.filter(user=user).values_list('project_id', flat=True)[:50])
+            actors.append({
+                'token': str(AccessToken.for_user(user)),
+                'project': project_ids,
+                'issue': list(Issue.objects.filter(project_id__in=project_ids).values_list('id', flat=True)[:50]),
+                'comment': list(Comment.objects.filter(project_id__in=project_ids).values_list('id', flat=True)[:50]),
+                'contributor': list(Contributor.objects.filter(project_id__in=project_ids)
+                                    .values_list('id', flat=True)[:50]),
+            })
+        return actors
+
+    def _pick(self, actors, routes, weights):
+        actor = self.random.choice(actors)
+        route = self.random.choices(routes, weights=weights)[0]
+        basename, _, kind = route.partition('-')
+        if kind == 'detail' and actor[basename]:
+            path = reverse(route, args=[self.random.choice(actor[basename])])
+        elif kind == 'detail':
+            path = reverse(f'{basename}-list')
+        elif route == 'sync':
+            path = reverse('sync-list')
+        else:
+            path = reverse(route)
+        return route, path, actor['token']
+
+    def _call(self, path, token):
+        path, _, query_string = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query_string,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host,
+            'HTTP_ACCEPT': 'application/json',
+            'HTTP_AUTHORIZATION': f'Bearer {token}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(b''),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status_holder = []
+
+        def start_response(status, headers, exc_info=None):
+            status_holder.append(int(status.split(' ', 1)[0]))
+
+        counter = QueryCounter()
+        start = perf_counter()
+        with connections['default'].execute_wrapper(counter):
+            body = self.application(environ, start_response)
+            try:
+                for _ in body:
+                    pass
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+        return perf_counter() - start, counter.count, status_holder[0]
+
+    def _report(self, samples, wall_time, total):
+        routes = {}
+        for route, values in sorted(samples.items()):
+            durations = sorted(duration * 1000 for duration, _, _ in values)
+            routes[route] = {
+                'requests': len(values),
+                'errors': sum(1 for _, _, status in values if status >= 400),
+                'mean_ms': sum(durations) / len(durations),
+                'p50_ms': quantile(durations, 0.50),
+                'p95_ms': quantile(durations, 0.95),
+                'p99_ms': quantile(durations, 0.99),
+                'queries_per_request': sum(queries for _, queries, _ in values) / len(values),
+                # Part du débit total : les routes se partagent la même durée de mesure
+                'throughput_rps': len(values) / wall_time,
+            }
+        return {'requests': total, 'wall_time_s': wall_time, 'throughput_rps': total / wall_time, 'routes': routes}
+
+    def _print(self, report):
+        self.stdout.write(f"{'route':<22} {'n':>6} {'err':>5} {'moy. ms':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                          f"{'p99 ms':>8} {'req SQL':>8} {'req/s':>8}")
+        for route, stats in report['routes'].items():
+            self.stdout.write(
+                f"{route:<22} {stats['requests']:>6} {stats['errors']:>5} {stats['mean_ms']:>8.2f} "
+                f"{stats['p50_ms']:>8.2f} "
+                f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['queries_per_request']:>8.1f} "
+                f"{stats['throughput_rps']:>8.1f}"
+            )
+        self.stdout.write(f"Total : {report['requests']} requêtes en {report['wall_time_s']:.2f} s "
+                          f"({report['throughput_rps']:.1f} req/s)")
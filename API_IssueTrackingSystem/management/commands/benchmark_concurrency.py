@@ -0,0 +1,168 @@
+import asyncio
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.core.management.base import CommandError
+from django.db import connections
+from django.urls import reverse
+from API_IssueTrackingSystem.management.commands import benchmark_api
+from API_IssueTrackingSystem.management.commands.benchmark_api import quantile
+
+# Routes de lecture disponibles en synchrone (viewsets) et en asynchrone (préfixe async-)
+ROUTES = ('project-list', 'project-detail', 'issue-list', 'issue-detail', 'comment-list', 'comment-detail')
+
+
+class Command(benchmark_api.Command):
+    help = ("Compare, à nombre de clients simultanés croissant, le déploiement WSGI (viewsets servis par un nombre "
+            "fixe de fils, comme gunicorn --threads) et le déploiement ASGI (vues de async_views.py servies par la "
+            "boucle d'événements), dans le processus courant.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', default='1,8,32,128',
+                            help="Nombres de clients simultanés à tester, séparés par des virgules.")
+        parser.add_argument('--requests', type=int, default=500, help="Requêtes mesurées par palier et par mode.")
+        parser.add_argument('--threads', type=int, default=8, help="Fils du déploiement WSGI.")
+        parser.add_argument('--users', type=int, default=20, help="Nombre d'utilisateurs simulés.")
+        parser.add_argument('--host', default='localhost',
+                            help="En-tête Host envoyé (doit figurer dans ALLOWED_HOSTS).")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help="Sortie JSON.")
+
+    def handle(self, *args, **options):
+        from config.asgi import application as asgi_application
+        from config.wsgi import application
+
+        self.application = application
+        self.asgi_application = asgi_application
+        self.host = options['host']
+        self.random = random.Random(options['seed'])
+        try:
+            levels = [int(value) for value in options['clients'].split(',')]
+        except ValueError:
+            raise CommandError("--clients attend des entiers séparés par des virgules.")
+        actors = self._prepare_actors(options['users'])
+        # Les mêmes requêtes pour les deux modes : seules les routes changent
+        plan = [self._pick_read(actors) for _ in range(options['requests'])]
+
+        report = {'threads': options['threads'], 'levels': []}
+        for clients in levels:
+            report['levels'].append({
+                'clients': clients,
+                'wsgi': self._summary(self._run_wsgi(plan, clients, options['threads'])),
+                'asgi': self._summary(asyncio.run(self._run_asgi(plan, clients))),
+            })
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print_levels(report)
+
+    def _pick_read(self, actors):
+        actor = self.random.choice(actors)
+        route = self.random.choice(ROUTES)
+        basename, _, kind = route.partition('-')
+        if kind == 'detail' and actor[basename]:
+            pk = self.random.choice(actor[basename])
+            return reverse(route, args=[pk]), reverse(f'async-{route}', args=[pk]), actor['token']
+        return reverse(f'{basename}-list'), reverse(f'async-{basename}-list'), actor['token']
+
+    def _run_wsgi(self, plan, clients, threads):
+        """
+        `clients` clients envoient leurs requêtes en parallèle à un serveur de `threads` fils : une requête
+        attend qu'un fil se libère. La latence mesurée inclut cette attente, comme pour un vrai client.
+        """
+        samples = []
+        workers = ThreadPoolExecutor(max_workers=threads)
+
+        def serve(path, token, queued_at):
+            try:
+                _, _, status = self._call(path, token)
+                return perf_counter() - queued_at, status
+            finally:
+                connections.close_all()
+
+        def client(requests):
+            for path, _, token in requests:
+                samples.append(workers.submit(serve, path, token, perf_counter()).result())
+
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(client, [plan[index::clients] for index in range(clients)]))
+        wall_time = perf_counter() - start
+        workers.shutdown()
+        return samples, wall_time
+
+    async def _run_asgi(self, plan, clients):
+        samples = []
+
+        async def client(requests):
+            for _, path, token in requests:
+                start = perf_counter()
+                status = await self._acall(path, token)
+                samples.append((perf_counter() - start, status))
+
+        start = perf_counter()
+        await asyncio.gather(*(client(plan[index::clients]) for index in range(clients)))
+        return samples, perf_counter() - start
+
+    async def _acall(self, path, token):
+        path, _, query_string = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query_string.encode(),
+            'root_path': '',
+            'headers': [
+                (b'host', self.host.encode()),
+                (b'accept', b'application/json'),
+                (b'authorization', f'Bearer {token}'.encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': (self.host, 80),
+        }
+        status_holder = []
+        done = asyncio.Event()
+
+        async def receive():
+            if not status_holder:
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status_holder.append(message['status'])
+            elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                done.set()
+
+        await self.asgi_application(scope, receive, send)
+        return status_holder[0]
+
+    @staticmethod
+    def _summary(result):
+        samples, wall_time = result
+        durations = sorted(duration * 1000 for duration, _ in samples)
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, status in samples if status >= 400),
+            'p50_ms': quantile(durations, 0.50),
+            'p99_ms': quantile(durations, 0.99),
+            'throughput_rps': len(samples) / wall_time if wall_time else 0.0,
+        }
+
+    def _print_levels(self, report):
+        self.stdout.write(f"WSGI : {report['threads']} fils ; ASGI : boucle d'événements")
+        self.stdout.write(f"{'clients':>8} {'mode':>5} {'n':>6} {'err':>5} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for level in report['levels']:
+            for mode in ('wsgi', 'asgi'):
+                stats = level[mode]
+                self.stdout.write(
+                    f"{level['clients']:>8} {mode:>5} {stats['requests']:>6} {stats['errors']:>5} "
+                    f"{stats['p50_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['throughput_rps']:>8.1f}"
+                )
@@ -0,0 +1,88 @@
+import json
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from API_IssueTrackingSystem import renderers, rows
+from API_IssueTrackingSystem.models import Issue, Comment
+from API_IssueTrackingSystem.serializers import IssueSerializer, CommentSerializer
+
+# Querysets des listes mesurées, tels que les lisent les viewsets
+TARGETS = {
+    'issues': (IssueSerializer, lambda: Issue.objects.select_related('project', 'assigned_to')),
+    'comments': (CommentSerializer, lambda: Comment.objects.all()),
+}
+
+
+class Command(BaseCommand):
+    help = ("Mesure le débit (lignes par seconde) des pages de liste de tâches et de commentaires : lecture, "
+            "représentation et rendu JSON, par le sérialiseur et JSONRenderer puis par les lignes de "
+            "`.values_list()` (rows.py) et FastJSONRenderer. Les deux rendus doivent être identiques.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help="Lignes par page.")
+        parser.add_argument('--rounds', type=int, default=50, help="Pages mesurées par chemin.")
+        parser.add_argument('--json', action='store_true', help="Sortie JSON.")
+
+    def handle(self, *args, **options):
+        report = {'orjson': renderers.orjson is not None, 'targets': {}}
+        for name, (serializer_class, get_queryset) in TARGETS.items():
+            queryset = get_queryset().order_by('created_time', 'id')[:options['rows']]
+            if not queryset.exists():
+                raise CommandError("Aucune donnée en base : lancez d'abord `manage.py generate_dataset`.")
+            plan = rows.compile_plan(serializer_class())
+            if plan is None:
+                raise CommandError(f"{serializer_class.__name__} n'a pas de plan de représentation.")
+
+            def serializer_path():
+                instances = list(queryset.all())
+                return instances, lambda: serializer_class(instances, many=True).data, JSONRenderer()
+
+            def rows_path():
+                values = list(queryset.all().values_list(*plan.columns, named=True))
+                return values, lambda: rows.Rows(plan, values).data, renderers.FastJSONRenderer()
+
+            before, before_body = self._measure(serializer_path, options['rounds'])
+            after, after_body = self._measure(rows_path, options['rounds'])
+            if before_body != after_body:
+                raise CommandError(f"{name} : les deux rendus diffèrent.")
+            report['targets'][name] = {'before': before, 'after': after,
+                                       'speedup': after['rows_per_s'] / before['rows_per_s']}
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print(report)
+
+    def _measure(self, path, rounds):
+        timings = {'fetch': 0.0, 'represent': 0.0, 'render': 0.0}
+        count, body = 0, None
+        for _ in range(rounds):
+            start = perf_counter()
+            page, represent, renderer = path()
+            fetched = perf_counter()
+            data = represent()
+            represented = perf_counter()
+            body = renderer.render(data)
+            rendered = perf_counter()
+            timings['fetch'] += fetched - start
+            timings['represent'] += represented - fetched
+            timings['render'] += rendered - represented
+            count += len(page)
+        total = sum(timings.values())
+        result = {f'{stage}_ms': value * 1000 / rounds for stage, value in timings.items()}
+        result['rows_per_s'] = count / total if total else 0.0
+        return result, body
+
+    def _print(self, report):
+        self.stdout.write(f"orjson : {'oui' if report['orjson'] else 'non (json de la bibliothèque standard)'}")
+        self.stdout.write(f"{'liste':<10} {'chemin':<12} {'lecture ms':>10} {'repr. ms':>10} {'rendu ms':>10} "
+                          f"{'lignes/s':>10}")
+        for name, stats in report['targets'].items():
+            for label, key in (('sérialiseur', 'before'), ('lignes', 'after')):
+                values = stats[key]
+                self.stdout.write(
+                    f"{name:<10} {label:<12} {values['fetch_ms']:>10.2f} {values['represent_ms']:>10.2f} "
+                    f"{values['render_ms']:>10.2f} {values['rows_per_s']:>10.0f}"
+                )
+            self.stdout.write(f"{name:<10} gain : x{stats['speedup']:.2f}")
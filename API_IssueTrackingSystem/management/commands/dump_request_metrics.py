@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand
+from API_IssueTrackingSystem import metrics
+
+
+class Command(BaseCommand):
+    help = "Affiche les mesures agrégées par route (latence, requêtes SQL, temps base, sérialisation, permissions)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help="Sortie JSON brute (histogrammes compris).")
+        parser.add_argument('--reset', action='store_true', help="Effacer les mesures après affichage.")
+
+    def handle(self, *args, **options):
+        routes = metrics.collect()
+        if options['json']:
+            self.stdout.write(json.dumps(routes, indent=2, ensure_ascii=False))
+        elif not routes:
+            self.stdout.write("Aucune mesure enregistrée.")
+        else:
+            header = (f"{'route':<40} {'n':>7} {'p50':>6} {'p95':>6} {'p99':>6} {'req/moy':>8} {'req/max':>8} "
+                      f"{'db ms':>8} {'sér. ms':>8} {'perm ms':>8}")
+            self.stdout.write(header)
+            for route, stats in sorted(routes.items(), key=lambda item: -item[1]['total_ms']):
+                count = stats['count'] or 1
+                self.stdout.write(
+                    f"{route:<40} {stats['count']:>7} "
+                    f"{metrics.percentile(stats['buckets'], 0.50):>6} "
+                    f"{metrics.percentile(stats['buckets'], 0.95):>6} "
+                    f"{metrics.percentile(stats['buckets'], 0.99):>6} "
+                    f"{stats['queries'] / count:>8.1f} {stats['max_queries']:>8} "
+                    f"{stats['db_ms'] / count:>8.2f} {stats['serializer_ms'] / count:>8.2f} "
+                    f"{stats['permissions_ms'] / count:>8.2f}"
+                )
+        if options['reset']:
+            metrics.clear()
@@ -0,0 +1,142 @@
+import random
+from array import array
+from itertools import accumulate
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from API_IssueTrackingSystem import counters
+from API_IssueTrackingSystem.models import (CONTRIBUTOR_ROLE_CHOICES, ISSUE_STATUS_CHOICES, ISSUE_TAG_CHOICES,
+                                            PRIORITY_CHOICES, PROJECT_TYPE_CHOICES, Project, Contributor, Issue,
+                                            Comment)
+
+# Texte de remplissage des descriptions
+LOREM = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore "
+         "et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris.")
+
+
+def zipf_weights(size, exponent):
+    """Poids cumulés d'une loi de Zipf : quelques éléments concentrent l'essentiel de l'activité."""
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, size + 1)))
+
+
+class Command(BaseCommand):
+    help = ("Génère un jeu de données synthétique réaliste (répartition asymétrique des contributeurs, "
+            "tâches et commentaires) pour les mesures de performance.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=5000)
+        parser.add_argument('--issues', type=int, default=200_000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--max-contributors', type=int, default=20,
+                            help="Nombre maximal de collaborateurs par projet, en plus de l'auteur.")
+        parser.add_argument('--skew', type=float, default=1.1, help="Exposant de la loi de Zipf.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='bench', help="Préfixe des noms d'utilisateur générés.")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.skew = options['skew']
+        self._weights = {}
+        start = perf_counter()
+
+        user_ids = self._create_users(options['users'], options['prefix'])
+        project_ids, members = self._create_projects(options['projects'], user_ids, options['max_contributors'],
+                                                     options['prefix'])
+        issue_ids, issue_projects = self._create_issues(options['issues'], project_ids, members)
+        self._create_comments(options['comments'], issue_ids, issue_projects, members)
+        # bulk_create n'émet pas de signaux : les compteurs sont calculés une fois à la fin
+        counters.rebuild(project_ids)
+
+        self.stdout.write(self.style.SUCCESS(f"Jeu de données généré en {perf_counter() - start:.1f} s."))
+
+    def _progress(self, label, done, total):
+        self.stdout.write(f"\r{label} : {done}/{total}", ending='')
+        if done >= total:
+            self.stdout.write('')
+
+    def _skewed(self, population, k):
+        """Tire k éléments de la population selon une loi de Zipf (les premiers sont les plus fréquents)."""
+        size = len(population)
+        if size not in self._weights:
+            self._weights[size] = zipf_weights(size, self.skew)
+        return self.random.choices(population, cum_weights=self._weights[size], k=k)
+
+    def _insert(self, model, objects):
+        with transaction.atomic():
+            return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def _create_users(self, count, prefix):
+        User = get_user_model()
+        # Un seul hachage pour tous les comptes : le mot de passe est « password »
+        password = make_password('password')
+        users = self._insert(User, [
+            User(username=f'{prefix}_user_{index}', email=f'{prefix}_user_{index}@example.com', password=password)
+            for index in range(count)
+        ])
+        self._progress("Utilisateurs", count, count)
+        return [user.pk for user in users]
+
+    def _create_projects(self, count, user_ids, max_contributors, prefix):
+        authors = self._skewed(user_ids, count)
+        projects = self._insert(Project, [
+            Project(title=f'{prefix} projet {index}', description=LOREM, author_id=author_id,
+                    type=self.random.choice(PROJECT_TYPE_CHOICES)[0])
+            for index, author_id in enumerate(authors)
+        ])
+        self._progress("Projets", count, count)
+
+        # Nombre de collaborateurs asymétrique : la plupart des projets sont petits, quelques-uns très grands
+        sizes = self._skewed(list(range(max_contributors + 1)), count)
+        author_role, collaborator_role = CONTRIBUTOR_ROLE_CHOICES[0][0], CONTRIBUTOR_ROLE_CHOICES[1][0]
+        members, contributors = {}, []
+        for project, size in zip(projects, sizes):
+            collaborators = set(self._skewed(user_ids, size)) - {project.author_id}
+            members[project.pk] = [project.author_id, *collaborators]
+            contributors.append(Contributor(project_id=project.pk, user_id=project.author_id, role=author_role))
+            contributors.extend(Contributor(project_id=project.pk, user_id=user_id, role=collaborator_role)
+                                for user_id in collaborators)
+            if len(contributors) >= self.batch_size:
+                self._insert(Contributor, contributors)
+                contributors = []
+        self._insert(Contributor, contributors)
+        self.stdout.write(f"Contributeurs : {sum(len(users) for users in members.values())}")
+        return [project.pk for project in projects], members
+
+    def _create_issues(self, count, project_ids, members):
+        issue_ids, issue_projects = array('q'), array('q')
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            issues = []
+            for index, project_id in enumerate(self._skewed(project_ids, size), start=offset):
+                issues.append(Issue(
+                    title=f'Tâche {index}', description=LOREM, project_id=project_id,
+                    tag=self.random.choice(ISSUE_TAG_CHOICES)[0],
+                    priority=self.random.choice(PRIORITY_CHOICES)[0],
+                    status=self.random.choice(ISSUE_STATUS_CHOICES)[0],
+                    assigned_to_id=self.random.choice(members[project_id]),
+                ))
+            for issue in self._insert(Issue, issues):
+                issue_ids.append(issue.pk)
+                issue_projects.append(issue.project_id)
+            self._progress("Tâches", offset + size, count)
+        return issue_ids, issue_projects
+
+    def _create_comments(self, count, issue_ids, issue_projects, members):
+        if not issue_ids:
+            return
+        positions = list(range(len(issue_ids)))
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            comments = []
+            for position in self._skewed(positions, size):
+                project_id = issue_projects[position]
+                comments.append(Comment(description=LOREM, issue_id=issue_ids[position], project_id=project_id,
+                                        author_id=self.random.choice(members[project_id])))
+            self._insert(Comment, comments)
+            self._progress("Commentaires", offset + size, count)
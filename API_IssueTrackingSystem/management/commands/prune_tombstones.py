@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from API_IssueTrackingSystem.models import Tombstone
+from API_IssueTrackingSystem.sync import SYNC_TOMBSTONE_RETENTION
+
+
+class Command(BaseCommand):
+    help = "Supprime les traces de suppression plus anciennes que SYNC_TOMBSTONE_RETENTION."
+
+    def handle(self, *args, **options):
+        deleted, _ = Tombstone.objects.filter(deleted_time__lt=timezone.now() - SYNC_TOMBSTONE_RETENTION).delete()
+        self.stdout.write(f"{deleted} trace(s) de suppression supprimée(s).")
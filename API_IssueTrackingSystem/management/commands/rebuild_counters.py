@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from API_IssueTrackingSystem import counters
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs des tableaux de bord (tous les projets, ou ceux indiqués)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('projects', nargs='*', type=int, help="Identifiants des projets à recalculer.")
+
+    def handle(self, *args, **options):
+        counters.rebuild(options['projects'] or None)
+        self.stdout.write("Compteurs recalculés.")
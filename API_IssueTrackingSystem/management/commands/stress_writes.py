@@ -0,0 +1,146 @@
+import io
+import json
+import sys
+import threading
+from collections import Counter
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework_simplejwt.tokens import AccessToken
+from API_IssueTrackingSystem.models import Project, Contributor, Issue
+
+PREFIX = 'stress'
+
+
+class Command(BaseCommand):
+    help = ("Lance des écrivains concurrents (un fil et une connexion chacun) sur l'application WSGI : création et "
+            "modification de tâches, commentaires. Échoue si une écriture est refusée parce que la base est "
+            "verrouillée.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16, help="Nombre d'écrivains concurrents.")
+        parser.add_argument('--requests', type=int, default=50, help="Nombre d'écritures par écrivain.")
+        parser.add_argument('--host', default='localhost',
+                            help="En-tête Host envoyé (doit figurer dans ALLOWED_HOSTS).")
+        parser.add_argument('--json', action='store_true', help="Sortie JSON.")
+
+    def handle(self, *args, **options):
+        from config.wsgi import application
+
+        self.application = application
+        self.host = options['host']
+        # Dernière tâche créée par chaque écrivain
+        self.issue_ids = {}
+        project, actors = self._prepare(options['writers'])
+        # Les fils ouvrent leurs propres connexions : la base doit les voir
+        connections.close_all()
+
+        statuses, failures = Counter(), []
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(actors))
+
+        def writer(index, user_id, token):
+            barrier.wait()
+            try:
+                for number in range(options['requests']):
+                    status, body = self._write(project.pk, index, number, user_id, token)
+                    with lock:
+                        statuses[status] += 1
+                        if status >= 500:
+                            failures.append(body[:500])
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer, args=(index, *actor)) for index, actor in enumerate(actors)]
+        start = perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = perf_counter() - start
+
+        total = sum(statuses.values())
+        report = {
+            'writers': len(actors),
+            'requests': total,
+            'wall_time_s': wall_time,
+            'throughput_rps': total / wall_time if wall_time else 0.0,
+            'statuses': dict(sorted(statuses.items())),
+            'lock_errors': sum('is locked' in body for body in failures),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(f"{total} écritures par {len(actors)} écrivains en {wall_time:.2f} s "
+                              f"({report['throughput_rps']:.1f} req/s), statuts : {report['statuses']}")
+        if failures:
+            raise CommandError(f"{len(failures)} écritures en erreur, dont {report['lock_errors']} sur un verrou "
+                               f"de la base. Première erreur : {failures[0]}")
+
+    def _prepare(self, count):
+        """Crée (ou réutilise) les utilisateurs et le projet commun aux écrivains, qui se disputent ses compteurs."""
+        User = get_user_model()
+        author, _ = User.objects.get_or_create(username=f'{PREFIX}_auteur')
+        project, _ = Project.objects.get_or_create(title=f'{PREFIX} projet', defaults={
+            'description': "Projet de test de charge en écriture", 'type': 'back_end', 'author': author})
+        users = [User.objects.get_or_create(username=f'{PREFIX}_{index}')[0] for index in range(count)]
+        Contributor.objects.bulk_create([
+            Contributor(user=user, project=project, role='collaborateur') for user in users
+        ], ignore_conflicts=True)
+        # Repartir d'un projet vide pour que les titres générés restent uniques
+        Issue.objects.filter(project=project).delete()
+        return project, [(user.pk, str(AccessToken.for_user(user))) for user in users]
+
+    def _write(self, project_id, index, number, user_id, token):
+        """Crée une tâche assignée à l'écrivain, puis alterne modifications et commentaires sur celle-ci."""
+        if number % 3 == 0:
+            status, body = self._call('POST', '/issues/', token, {
+                'title': f'{PREFIX} {index}-{number}', 'description': 'charge', 'tag': 'bug',
+                'priority': 'faible', 'status': 'en attente', 'project': project_id, 'assigned_to': user_id,
+            })
+            if status == 201:
+                self.issue_ids[index] = json.loads(body)['id']
+            return status, body
+        issue_id = self.issue_ids.get(index)
+        if issue_id is None:
+            return self._call('GET', '/issues/', token)
+        if number % 3 == 1:
+            return self._call('PATCH', f'/issues/{issue_id}/', token, {'status': 'en cours', 'priority': 'élevé'})
+        return self._call('POST', '/comments/', token, {'issue': issue_id, 'description': 'commentaire de charge'})
+
+    def _call(self, method, path, token, data=None):
+        payload = json.dumps(data).encode() if data is not None else b''
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host,
+            'HTTP_ACCEPT': 'application/json',
+            'HTTP_AUTHORIZATION': f'Bearer {token}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(payload),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status_holder = []
+
+        def start_response(status, headers, exc_info=None):
+            status_holder.append(int(status.split(' ', 1)[0]))
+
+        body = self.application(environ, start_response)
+        try:
+            content = b''.join(body)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return status_holder[0], content.decode(errors='replace')
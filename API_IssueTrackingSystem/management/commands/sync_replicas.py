@@ -0,0 +1,28 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from API_IssueTrackingSystem.replicas import REPLICA_DATABASES
+
+
+class Command(BaseCommand):
+    help = ("Copie la base SQLite principale dans les fichiers des réplicas (doublures locales de vrais réplicas). "
+            "Relancer la commande simule le rattrapage de leur retard.")
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError("Seule une base principale SQLite peut être copiée ; les vrais réplicas se "
+                               "synchronisent d'eux-mêmes.")
+        if not REPLICA_DATABASES:
+            raise CommandError("Aucun réplica n'est configuré (variable SOFTDESK_DB_REPLICAS).")
+        primary.ensure_connection()
+        for alias in REPLICA_DATABASES:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                # Copie cohérente, même pendant des écritures sur la principale
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"{alias} : copie de la base principale terminée.")
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from API_IssueTrackingSystem.caching import shared_cache
+from API_IssueTrackingSystem.models import Contributor
+
+# Alias d'un cache partagé entre les processus (Redis, Memcached, fichiers...) où garder les appartenances d'une
+# requête à l'autre. Sans cache partagé, elles sont relues à chaque requête (une requête indexée) : un cache
+# propre au processus garderait un contributeur retiré dans les autres workers.
+MEMBERSHIP_CACHE = getattr(settings, 'MEMBERSHIP_CACHE', None)
+
+# Durée de vie (en secondes) des appartenances mises en cache entre deux requêtes
+MEMBERSHIP_CACHE_TIMEOUT = getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 300)
+
+# Au-delà de ce nombre de projets, les filtres utilisent une sous-requête plutôt qu'une liste d'identifiants
+MAX_INLINE_PROJECT_IDS = 500
+
+
+def _cache_key(user_id):
+    return f'membership:{user_id}'
+
+
+def _queryset(user_id):
+    # Lu sur la base principale : une copie en retard d'un réplica resterait en cache
+    return Contributor.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).values_list('project_id', 'role')
+
+
+def load_memberships(user_id):
+    """Retourne un dictionnaire {project_id: role} pour l'utilisateur, depuis le cache partagé s'il y en a un."""
+    cache = shared_cache(MEMBERSHIP_CACHE)
+    if cache is None:
+        return dict(_queryset(user_id))
+    key = _cache_key(user_id)
+    memberships = cache.get(key)
+    if memberships is None:
+        memberships = dict(_queryset(user_id))
+        cache.set(key, memberships, MEMBERSHIP_CACHE_TIMEOUT)
+    return memberships
+
+
+async def aload_memberships(user_id):
+    """Version asynchrone de load_memberships(), pour les vues servies par l'application ASGI."""
+    cache = shared_cache(MEMBERSHIP_CACHE)
+    memberships = None if cache is None else await cache.aget(_cache_key(user_id))
+    if memberships is None:
+        memberships = {project_id: role async for project_id, role in _queryset(user_id)}
+        if cache is not None:
+            await cache.aset(_cache_key(user_id), memberships, MEMBERSHIP_CACHE_TIMEOUT)
+    return memberships
+
+
+def invalidate_memberships(user_id):
+    cache = shared_cache(MEMBERSHIP_CACHE)
+    if cache is not None:
+        cache.delete(_cache_key(user_id))
+
+
+def get_memberships(request):
+    """Retourne les appartenances de l'utilisateur de la requête, chargées au plus une fois par requête."""
+    user = request.user
+    if not user.is_authenticated:
+        return {}
+    # La requête DRF enveloppe la HttpRequest : on mémorise sur cette dernière pour la partager
+    http_request = getattr(request, '_request', request)
+    memberships = getattr(http_request, '_memberships', None)
+    if memberships is None or http_request._memberships_user_id != user.pk:
+        memberships = load_memberships(user.pk)
+        http_request._memberships = memberships
+        http_request._memberships_user_id = user.pk
+    return memberships
+
+
+async def aget_memberships(request):
+    """Version asynchrone de get_memberships()."""
+    user = request.user
+    if not user.is_authenticated:
+        return {}
+    http_request = getattr(request, '_request', request)
+    memberships = getattr(http_request, '_memberships', None)
+    if memberships is None or http_request._memberships_user_id != user.pk:
+        memberships = await aload_memberships(user.pk)
+        http_request._memberships = memberships
+        http_request._memberships_user_id = user.pk
+    return memberships
+
+
+def is_member(request, project_id):
+    return project_id in get_memberships(request)
+
+
+def get_project_ids(request):
+    """Identifiants des projets de l'utilisateur, utilisables dans un filtre `__in`."""
+    memberships = get_memberships(request)
+    if len(memberships) > MAX_INLINE_PROJECT_IDS:
+        return Contributor.objects.filter(user_id=request.user.pk).values('project_id')
+    return list(memberships)
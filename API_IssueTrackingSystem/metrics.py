@@ -0,0 +1,218 @@
+"""
+Mesures par requête (requêtes SQL, temps base de données, sérialisation, permissions)
+et histogrammes agrégés par route, partagés entre processus via le cache `REQUEST_METRICS_CACHE`.
+Un processus publie ses histogrammes à sa première requête, puis au plus toutes les REQUEST_METRICS_FLUSH_INTERVAL
+secondes, et une dernière fois à sa sortie.
+"""
+import atexit
+import bisect
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import serializers
+
+REQUEST_METRICS_CACHE = getattr(settings, 'REQUEST_METRICS_CACHE', 'default')
+
+# Intervalle (en secondes) entre deux publications des histogrammes d'un processus dans le cache
+REQUEST_METRICS_FLUSH_INTERVAL = getattr(settings, 'REQUEST_METRICS_FLUSH_INTERVAL', 10)
+
+# Bornes supérieures des intervalles de l'histogramme de latence, en millisecondes
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+CACHE_KEY_PREFIX = 'request_metrics'
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Compteurs d'une requête en cours."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.timings = defaultdict(float)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += perf_counter() - start
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    """Ajoute la durée du bloc au compteur `name` de la requête en cours (sans effet hors requête)."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += perf_counter() - start
+
+
+class TimedSerializerMixin:
+    """Mesure le temps passé dans la validation et la représentation du sérialiseur."""
+
+    @property
+    def data(self):
+        with timed('serializer'):
+            return super().data
+
+    def is_valid(self, *, raise_exception=False):
+        with timed('serializer'):
+            return super().is_valid(raise_exception=raise_exception)
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class TimedPermissionsMixin:
+    """Mesure le temps passé dans les vérifications de permissions d'une vue DRF."""
+
+    def check_permissions(self, request):
+        with timed('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with timed('permissions'):
+            super().check_object_permissions(request, obj)
+
+
+def percentile(buckets, fraction):
+    """Estime un percentile (borne supérieure de l'intervalle) à partir des effectifs d'un histogramme."""
+    total = sum(buckets)
+    if not total:
+        return 0
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(buckets):
+        seen += count
+        if seen >= rank:
+            return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else float('inf')
+    return float('inf')
+
+
+def empty_route():
+    return {
+        'count': 0,
+        'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        'total_ms': 0.0,
+        'queries': 0,
+        'max_queries': 0,
+        'db_ms': 0.0,
+        'serializer_ms': 0.0,
+        'permissions_ms': 0.0,
+    }
+
+
+def merge_routes(target, source):
+    for route, stats in source.items():
+        merged = target.setdefault(route, empty_route())
+        merged['buckets'] = [a + b for a, b in zip(merged['buckets'], stats['buckets'])]
+        merged['max_queries'] = max(merged['max_queries'], stats['max_queries'])
+        for key in ('count', 'total_ms', 'queries', 'db_ms', 'serializer_ms', 'permissions_ms'):
+            merged[key] += stats[key]
+    return target
+
+
+class MetricsRegistry:
+    """Histogrammes cumulés du processus, publiés périodiquement dans le cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        # Aucune publication encore : la première requête est publiée aussitôt
+        self._last_flush = None
+        # Mesures reçues depuis la dernière publication
+        self._dirty = False
+
+    def record(self, route, duration, metrics):
+        duration_ms = duration * 1000
+        with self._lock:
+            stats = self._routes.setdefault(route, empty_route())
+            self._dirty = True
+            stats['count'] += 1
+            stats['buckets'][bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+            stats['total_ms'] += duration_ms
+            stats['queries'] += metrics.queries
+            stats['max_queries'] = max(stats['max_queries'], metrics.queries)
+            stats['db_ms'] += metrics.db_time * 1000
+            stats['serializer_ms'] += metrics.timings['serializer'] * 1000
+            stats['permissions_ms'] += metrics.timings['permissions'] * 1000
+            due = self._last_flush is None or monotonic() - self._last_flush >= REQUEST_METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {route: dict(stats, buckets=list(stats['buckets'])) for route, stats in self._routes.items()}
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = monotonic()
+            self._dirty = False
+        cache = caches[REQUEST_METRICS_CACHE]
+        pid = os.getpid()
+        cache.set(f'{CACHE_KEY_PREFIX}:{pid}', self.snapshot(), timeout=None)
+        pids = cache.get(f'{CACHE_KEY_PREFIX}:pids', [])
+        if pid not in pids:
+            cache.set(f'{CACHE_KEY_PREFIX}:pids', pids + [pid], timeout=None)
+
+    def flush_pending(self):
+        """Publie les mesures reçues depuis la dernière publication, s'il y en a."""
+        if self._dirty:
+            self.flush()
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._last_flush = None
+            self._dirty = False
+
+
+registry = MetricsRegistry()
+
+# Sans quoi les mesures reçues depuis la dernière publication seraient perdues à la sortie du processus
+atexit.register(registry.flush_pending)
+
+
+def collect():
+    """Fusionne les histogrammes publiés par tous les processus."""
+    cache = caches[REQUEST_METRICS_CACHE]
+    pids = cache.get(f'{CACHE_KEY_PREFIX}:pids', [])
+    routes = {}
+    for snapshot in cache.get_many([f'{CACHE_KEY_PREFIX}:{pid}' for pid in pids]).values():
+        merge_routes(routes, snapshot)
+    return routes
+
+
+def clear():
+    cache = caches[REQUEST_METRICS_CACHE]
+    pids = cache.get(f'{CACHE_KEY_PREFIX}:pids', [])
+    cache.delete_many([f'{CACHE_KEY_PREFIX}:{pid}' for pid in pids] + [f'{CACHE_KEY_PREFIX}:pids'])
+    registry.reset()
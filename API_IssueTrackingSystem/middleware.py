@@ -0,0 +1,80 @@
+from contextlib import ExitStack
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from API_IssueTrackingSystem import metrics
+
+
+class RequestMetricsMiddleware:
+    """
+    Compte les requêtes SQL et mesure le temps base de données, sérialisation et permissions de chaque requête.
+    Les mesures sont renvoyées dans l'en-tête Server-Timing et agrégées par route
+    (voir la commande `dump_request_metrics`).
+    Compatible ASGI : sous l'application asynchrone, il ne force pas Django à réserver un fil par requête.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_METRICS_ENABLED', True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        request_metrics, token = metrics.start_request()
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                self._wrap_connections(stack, request_metrics)
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._finish(request, response, request_metrics, start)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        request_metrics, token = metrics.start_request()
+        start = perf_counter()
+        stack = ExitStack()
+        try:
+            # Les connexions sont propres au fil où la requête exécute son SQL (sync_to_async) : s'y installer
+            await sync_to_async(self._wrap_connections)(stack, request_metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            metrics.end_request(token)
+        return self._finish(request, response, request_metrics, start)
+
+    @staticmethod
+    def _wrap_connections(stack, request_metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(request_metrics.execute_wrapper))
+
+    def _finish(self, request, response, request_metrics, start):
+        duration = perf_counter() - start
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={request_metrics.db_time * 1000:.2f};desc="{request_metrics.queries} queries"',
+            f'serializer;dur={request_metrics.timings["serializer"] * 1000:.2f}',
+            f'permissions;dur={request_metrics.timings["permissions"] * 1000:.2f}',
+            f'total;dur={duration * 1000:.2f}',
+        ])
+        metrics.registry.record(self._route(request), duration, request_metrics)
+        return response
+
+    @staticmethod
+    def _route(request):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match is not None else 'non résolue'
+        return f'{request.method} {view_name}'
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_comment_project(apps, schema_editor):
+    Comment = apps.get_model("API_IssueTrackingSystem", "Comment")
+    Issue = apps.get_model("API_IssueTrackingSystem", "Issue")
+    Comment.objects.update(
+        project_id=Subquery(
+            Issue.objects.filter(pk=OuterRef("issue_id")).values("project_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("API_IssueTrackingSystem", "0011_alter_issue_assigned_to_alter_issue_status_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="project",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="API_IssueTrackingSystem.project",
+            ),
+        ),
+        migrations.RunPython(backfill_comment_project, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="comment",
+            name="project",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="API_IssueTrackingSystem.project",
+            ),
+        ),
+    ]
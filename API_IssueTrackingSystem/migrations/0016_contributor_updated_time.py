@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API_IssueTrackingSystem", "0015_sync_watermarks_and_tombstones"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contributor",
+            name="updated_time",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,101 @@
+from django.db import migrations
+
+# Index plein texte SQLite (FTS5) des tâches et commentaires, tenu à jour par des déclencheurs afin de
+# couvrir aussi les écritures qui contournent les signaux (update(), bulk_create(), suppressions directes).
+# rowid = 2 * id pour une tâche, 2 * id + 1 pour un commentaire.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        project_id UNINDEXED,
+        issue_id UNINDEXED,
+        title,
+        body,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_index_issue_insert
+    AFTER INSERT ON "API_IssueTrackingSystem_issue" BEGIN
+        INSERT INTO search_index (rowid, project_id, issue_id, title, body)
+        VALUES (new.id * 2, new.project_id, new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_index_issue_update
+    AFTER UPDATE OF title, description, project_id ON "API_IssueTrackingSystem_issue" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+        INSERT INTO search_index (rowid, project_id, issue_id, title, body)
+        VALUES (new.id * 2, new.project_id, new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_index_issue_delete
+    AFTER DELETE ON "API_IssueTrackingSystem_issue" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_index_comment_insert
+    AFTER INSERT ON "API_IssueTrackingSystem_comment" BEGIN
+        INSERT INTO search_index (rowid, project_id, issue_id, title, body)
+        VALUES (new.id * 2 + 1, new.project_id, new.issue_id, '', new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_index_comment_update
+    AFTER UPDATE OF description, project_id, issue_id ON "API_IssueTrackingSystem_comment" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+        INSERT INTO search_index (rowid, project_id, issue_id, title, body)
+        VALUES (new.id * 2 + 1, new.project_id, new.issue_id, '', new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_index_comment_delete
+    AFTER DELETE ON "API_IssueTrackingSystem_comment" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    """
+    INSERT INTO search_index (rowid, project_id, issue_id, title, body)
+    SELECT id * 2, project_id, id, title, description FROM "API_IssueTrackingSystem_issue"
+    """,
+    """
+    INSERT INTO search_index (rowid, project_id, issue_id, title, body)
+    SELECT id * 2 + 1, project_id, issue_id, '', description FROM "API_IssueTrackingSystem_comment"
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS search_index_issue_insert",
+    "DROP TRIGGER IF EXISTS search_index_issue_update",
+    "DROP TRIGGER IF EXISTS search_index_issue_delete",
+    "DROP TRIGGER IF EXISTS search_index_comment_insert",
+    "DROP TRIGGER IF EXISTS search_index_comment_update",
+    "DROP TRIGGER IF EXISTS search_index_comment_delete",
+    "DROP TABLE IF EXISTS search_index",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Les autres bases utilisent un autre moteur de recherche (voir API_IssueTrackingSystem.search)
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("API_IssueTrackingSystem", "0016_contributor_updated_time"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Issue = apps.get_model("API_IssueTrackingSystem", "Issue")
+    Comment = apps.get_model("API_IssueTrackingSystem", "Comment")
+    ProjectCounter = apps.get_model("API_IssueTrackingSystem", "ProjectCounter")
+    IssueCommentCounter = apps.get_model(
+        "API_IssueTrackingSystem", "IssueCommentCounter"
+    )
+    rows = [
+        ProjectCounter(project_id=project_id, dimension=field, value=value, count=count)
+        for field in ("status", "priority", "tag")
+        for project_id, value, count in Issue.objects.order_by()
+        .values_list("project_id", field)
+        .annotate(count=models.Count("id"))
+    ]
+    comments = {}
+    issue_rows = []
+    for issue_id, project_id, count in (
+        Comment.objects.order_by()
+        .values_list("issue_id", "project_id")
+        .annotate(count=models.Count("id"))
+    ):
+        issue_rows.append(
+            IssueCommentCounter(issue_id=issue_id, project_id=project_id, count=count)
+        )
+        comments[project_id] = comments.get(project_id, 0) + count
+    rows += [
+        ProjectCounter(
+            project_id=project_id, dimension="comments", value="", count=count
+        )
+        for project_id, count in comments.items()
+    ]
+    ProjectCounter.objects.bulk_create(rows, batch_size=500)
+    IssueCommentCounter.objects.bulk_create(issue_rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API_IssueTrackingSystem", "0018_issue_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dimension", models.CharField(max_length=20)),
+                ("value", models.CharField(blank=True, max_length=50)),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="counters",
+                        to="API_IssueTrackingSystem.project",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="IssueCommentCounter",
+            fields=[
+                (
+                    "issue",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="comment_counter",
+                        serialize=False,
+                        to="API_IssueTrackingSystem.issue",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="API_IssueTrackingSystem.project",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="projectcounter",
+            constraint=models.UniqueConstraint(
+                fields=("project", "dimension", "value"), name="project_counter_unique"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issuecommentcounter",
+            index=models.Index(
+                fields=["project", "-count"], name="issue_comment_count_idx"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:39
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+search_index = import_module("API_IssueTrackingSystem.migrations.0017_search_index")
+
+
+def rename_duplicate_titles(apps, schema_editor):
+    # Les doublons (projet, titre) existants gardent leur plus ancienne tâche intacte ;
+    # les autres reçoivent leur identifiant en suffixe avant la création de la contrainte
+    Issue = apps.get_model("API_IssueTrackingSystem", "Issue")
+    max_length = Issue._meta.get_field("title").max_length
+    duplicates = (
+        Issue.objects.order_by()
+        .values_list("project_id", "title")
+        .annotate(count=models.Count("id"), first_id=models.Min("id"))
+        .filter(count__gt=1)
+    )
+    for project_id, title, _, first_id in duplicates:
+        for issue_id in (
+            Issue.objects.filter(project_id=project_id, title=title)
+            .exclude(id=first_id)
+            .values_list("id", flat=True)
+        ):
+            suffix = f" #{issue_id}"
+            Issue.objects.filter(id=issue_id).update(
+                title=title[: max_length - len(suffix)] + suffix
+            )
+
+
+def rebuild_search_index(apps, schema_editor):
+    # SQLite reconstruit la table des tâches pour ajouter ou retirer la contrainte,
+    # ce qui supprime les déclencheurs de l'index plein texte : on le recrée entièrement
+    search_index.drop_search_index(apps, schema_editor)
+    search_index.create_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API_IssueTrackingSystem", "0019_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, rebuild_search_index),
+        migrations.RunPython(rename_duplicate_titles, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="issue",
+            constraint=models.UniqueConstraint(
+                fields=("project", "title"), name="issue_project_title_unique"
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="issue",
+            name="issue_project_title_idx",
+        ),
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
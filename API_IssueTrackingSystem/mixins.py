@@ -0,0 +1,270 @@
+import hashlib
+
+from django.db import transaction
+from django.db.models import Count, Max, QuerySet
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework import exceptions, serializers, status
+from rest_framework.permissions import SAFE_METHODS
+from API_IssueTrackingSystem.membership import get_memberships, is_member
+from API_IssueTrackingSystem import locking, replicas, response_cache, rows
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    Ajoute un ETag fort aux réponses de liste et de détail, et répond 304 sans sérialiser
+    lorsque l'en-tête If-None-Match correspond.
+    Liste : l'ETag dérive de (max(updated_time), nombre de lignes) du queryset filtré, obtenus en une requête
+    (ou, en pagination par curseur, des lignes de la page et de l'existence d'une suivante, pour ne jamais compter).
+    Détail : l'ETag dérive de (id, updated_time) de l'objet, après les vérifications de permissions habituelles.
+    """
+    etag_field = 'updated_time'
+
+    def _make_etag(self, *parts):
+        request = self.request
+        key = repr((self.basename, request.user.pk, request.get_full_path(), request.accepted_renderer.format) + parts)
+        return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+    def _not_modified(self, etag):
+        if_none_match = self.request.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        etags = parse_etags(if_none_match)
+        # Comparaison faible, comme le prévoit la RFC 9110 pour If-None-Match
+        return '*' in etags or etag in etags or 'W/' + etag in etags
+
+    def _conditional_response(self, etag, build_response):
+        if self._not_modified(etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = build_response()
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        is_cursor_request = getattr(self.paginator, 'is_cursor_request', None)
+        if is_cursor_request is not None and is_cursor_request(request):
+            # Pas de COUNT(*) en mode curseur : l'ETag dérive des lignes de la page, lues de toute façon, et de
+            # l'existence d'une page suivante (une dernière page pleine qui en gagne une change de lien `next`)
+            page = self.paginate_queryset(queryset)
+            etag = self._make_etag(self.paginator.has_next,
+                                   *[(obj.pk, getattr(obj, self.etag_field)) for obj in page])
+            return self._conditional_response(
+                etag, lambda: self.get_paginated_response(self.get_serializer(page, many=True).data)
+            )
+        state = queryset.order_by().aggregate(last=Max(self.etag_field), count=Count('pk'))
+        etag = self._make_etag(state['last'], state['count'])
+        return self._conditional_response(
+            etag, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self._make_etag(instance.pk, getattr(instance, self.etag_field))
+
+        def build_response():
+            serializer = self.get_serializer(instance)
+            return Response(serializer.data)
+
+        return self._conditional_response(etag, build_response)
+
+
+class SparseFieldsetMixin:
+    """
+    Option ?fields=id,title,status des requêtes GET : restreint les champs renvoyés par le sérialiseur
+    et, via `.only()`, les colonnes lues en base (une liste sans `description` ne charge jamais ce TextField).
+    Les colonnes de `sparse_required_fields` restent chargées : permissions, pagination et ETag en dépendent.
+    """
+    fields_query_param = 'fields'
+    sparse_required_fields = ('id', 'project', 'created_time', 'updated_time')
+
+    def get_sparse_fields(self):
+        """Retourne les champs demandés (dictionnaire nom → champ du sérialiseur), ou None."""
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+        self._sparse_fields = None
+        value = self.request.query_params.get(self.fields_query_param)
+        if value and self.request.method in ('GET', 'HEAD'):
+            available = self.get_serializer_class()(context=self.get_serializer_context()).fields
+            requested = [name.strip() for name in value.split(',') if name.strip()]
+            unknown = [name for name in requested if name not in available]
+            if unknown:
+                raise exceptions.ValidationError(
+                    {self.fields_query_param: f"Champs inconnus : {', '.join(unknown)}."})
+            self._sparse_fields = {name: available[name] for name in requested}
+        return self._sparse_fields
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        columns = {field.source.split('.')[0] for field in fields.values()} & concrete
+        # Les relations sont rendues par leur clé primaire : la jointure de select_related devient inutile
+        return queryset.select_related(None).only(*columns.union(self.sparse_required_fields))
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            target = serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+            for name in list(target.fields):
+                if name not in fields:
+                    target.fields.pop(name)
+        return serializer
+
+
+class ValuesListMixin:
+    """
+    Listes construites à partir de `.values_list()` plutôt que d'instances (voir rows.py) : ni modèles, ni
+    to_representation() champ par champ. Placé avant SparseFieldsetMixin, dont il reprend les champs retenus.
+    Les lignes sont des tuples nommés qui exposent pk, created_time et updated_time, comme les instances
+    qu'utilisent la pagination par curseur et l'ETag des listes.
+    """
+
+    def _rows_enabled(self):
+        return self.action == 'list' and self.request.method in ('GET', 'HEAD')
+
+    def get_row_plan(self):
+        if not hasattr(self, '_row_plan'):
+            self._row_plan = rows.compile_plan(super().get_serializer()) if self._rows_enabled() else None
+        return self._row_plan
+
+    def _values_list(self, queryset):
+        return queryset.values_list(*self.get_row_plan().columns, named=True)
+
+    def paginate_queryset(self, queryset):
+        if self.get_row_plan() is not None:
+            queryset = self._values_list(queryset)
+        return super().paginate_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        plan = self.get_row_plan()
+        if plan is None or not kwargs.get('many') or not args:
+            return super().get_serializer(*args, **kwargs)
+        instance = args[0]
+        if isinstance(instance, QuerySet):
+            # Liste non paginée
+            instance = self._values_list(instance)
+        return rows.Rows(plan, instance)
+
+
+class ProjectScopedMixin:
+    """
+    Routes imbriquées sous /projects/{project__pk}/ : l'appartenance au projet est vérifiée une seule fois,
+    à l'entrée de la vue, et les querysets sont filtrés directement par project_id.
+    `scoped_fields` associe les champs du sérialiseur aux paramètres de l'URL qui les fixent
+    en création et en remplacement.
+    """
+    scoped_fields = {'project': 'project__pk'}
+
+    def url_id(self, kwarg):
+        try:
+            return int(self.kwargs[kwarg])
+        except (KeyError, ValueError):
+            raise exceptions.NotFound()
+
+    @property
+    def project_id(self):
+        return self.url_id('project__pk')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not is_member(request, self.project_id):
+            raise exceptions.NotFound("Le projet n'existe pas ou vous n'y avez pas accès.")
+
+    def get_serializer(self, *args, **kwargs):
+        if 'data' in kwargs and self.request.method in ('POST', 'PUT'):
+            data = kwargs['data'].copy()
+            for field, kwarg in self.scoped_fields.items():
+                data[field] = self.url_id(kwarg)
+            kwargs['data'] = data
+        return super().get_serializer(*args, **kwargs)
+
+
+class ReplicaReadMixin:
+    """
+    Fait lire les requêtes GET, HEAD et OPTIONS sur un réplica (voir replicas.py), une fois l'utilisateur
+    authentifié sur la base principale. Une écriture réussie fait lire l'utilisateur sur la principale
+    pendant quelques secondes, pour qu'il retrouve aussitôt ce qu'il vient d'écrire.
+    """
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            alias = replicas.choose_replica(request)
+            if alias is not None:
+                self._replica_token = replicas.use_replica(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._replica_token is not None:
+            replicas.reset(self._replica_token)
+            self._replica_token = None
+        elif (request.method not in SAFE_METHODS and response.status_code < 400
+              and getattr(request, 'user', None) is not None and request.user.is_authenticated):
+            replicas.pin(request, response)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class LockRetryMixin:
+    """
+    Exécute chaque écriture du viewset (validation comprise) dans une transaction, rejouée si la base
+    est verrouillée (voir locking.py).
+    """
+
+    def create(self, request, *args, **kwargs):
+        return locking.retry_on_lock(transaction.atomic(super().create), request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return locking.retry_on_lock(transaction.atomic(super().update), request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return locking.retry_on_lock(transaction.atomic(super().destroy), request, *args, **kwargs)
+
+
+class ResponseCacheMixin:
+    """
+    Sert les réponses GET de liste et de détail depuis le cache des réponses (voir response_cache.py), sans
+    toucher à la base. Placé avant ConditionalGetMixin : un If-None-Match égal à l'ETag en cache reçoit un 304.
+    Les permissions de ces vues ne dépendent que de l'appartenance aux projets, qui fait partie de la clé.
+    """
+    _response_cache_key = None
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, super().retrieve, *args, **kwargs)
+
+    def _cached_response(self, request, handler, *args, **kwargs):
+        if not response_cache.RESPONSE_CACHE_ENABLED or request.method != 'GET':
+            return handler(request, *args, **kwargs)
+        key = response_cache.make_key(f'{self.basename}-{self.action}', request, get_memberships(request))
+        if key is None:
+            return handler(request, *args, **kwargs)
+        entry = response_cache.get(key)
+        if entry is not None:
+            etag, content, content_type = entry
+            if etag and self._not_modified(etag):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+            response = HttpResponse(content, content_type=content_type)
+            if etag:
+                response['ETag'] = etag
+            return response
+        # Une entrée sert de nombreuses lectures : la calculer sur la base principale, jamais sur un réplica en retard
+        if getattr(self, '_replica_token', None) is not None:
+            replicas.reset(self._replica_token)
+            self._replica_token = None
+        self._response_cache_key = key
+        return handler(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self._response_cache_key is not None and response.status_code == status.HTTP_200_OK:
+            response.render()
+            response_cache.store(self._response_cache_key, response)
+        return response
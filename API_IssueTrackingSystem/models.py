@@ -43,6 +43,7 @@ class Project(models.Model):
     description = models.TextField()
     type = models.CharField(max_length=50, choices=PROJECT_TYPE_CHOICES)
     author = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    updated_time = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -52,9 +53,14 @@ class Contributor(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     role = models.CharField(max_length=50, choices=CONTRIBUTOR_ROLE_CHOICES)
+    created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('project', 'user')
+        indexes = [
+            models.Index(fields=['user', 'project'], name='contributor_user_project_idx'),
+        ]
 
 class Issue(models.Model):
     """Modèle représentant un problème lié à un projet."""
@@ -68,13 +74,120 @@ class Issue(models.Model):
     created_time = models.DateTimeField(auto_now_add=True)
     updated_time = models.DateTimeField(auto_now=True)
 
+    # Champs dont les valeurs sont comptées par projet (voir ProjectCounter)
+    COUNTED_FIELDS = ('status', 'priority', 'tag')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'status', 'priority'], name='issue_project_status_prio_idx'),
+            models.Index(fields=['created_time', 'id'], name='issue_created_id_idx'),
+            models.Index(fields=['project', 'updated_time'], name='issue_project_updated_idx'),
+            models.Index(fields=['project', 'priority'], name='issue_project_priority_idx'),
+            models.Index(fields=['project', 'tag'], name='issue_project_tag_idx'),
+        ]
+        # Son index unique remplace l'ancien index (project, title)
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'title'], name='issue_project_title_unique'),
+        ]
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Mémoriser le projet chargé pour détecter un déplacement lors de la sauvegarde
+        instance._loaded_project_id = instance.__dict__.get('project_id')
+        # Et les valeurs comptées, pour reporter les modifications sur les compteurs du projet
+        instance._loaded_counted = {name: instance.__dict__.get(name) for name in ('project_id', *cls.COUNTED_FIELDS)}
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded_project_id = getattr(self, '_loaded_project_id', None)
+        moved = loaded_project_id is not None and loaded_project_id != self.project_id
+        if moved and kwargs.get('update_fields') is not None:
+            # La date de modification de la tâche date aussi le déplacement de ses commentaires
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_time'}
+        super().save(*args, **kwargs)
+        if moved:
+            # Garder le projet dénormalisé des commentaires cohérent avec celui de la tâche
+            Comment.objects.filter(issue=self).update(project_id=self.project_id, updated_time=self.updated_time)
+        self._loaded_project_id = self.project_id
+
 class Comment(models.Model):
     """Modèle représentant un commentaire sur un problème."""
     description = models.TextField()
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     issue = models.ForeignKey(Issue, on_delete=models.CASCADE)
+    # Copie dénormalisée de issue.project, pour filtrer les commentaires sans jointure
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, editable=False)
     created_time = models.DateTimeField(auto_now_add=True)
     updated_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue', 'created_time'], name='comment_issue_created_idx'),
+            models.Index(fields=['created_time', 'id'], name='comment_created_id_idx'),
+            models.Index(fields=['project', 'updated_time'], name='comment_project_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Mémoriser la tâche chargée pour reporter un changement de tâche sur les compteurs
+        instance._loaded_issue = (instance.__dict__.get('issue_id'), instance.__dict__.get('project_id'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.project_id = self.issue.project_id
+        super().save(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """
+    Trace de la suppression d'une tâche ou d'un commentaire, conservée pour la synchronisation incrémentale.
+    Les projets supprimés ou quittés sont détectés par le client grâce à la liste des projets renvoyée.
+    """
+    ISSUE, COMMENT = 'issue', 'comment'
+    MODEL_CHOICES = [(ISSUE, ISSUE), (COMMENT, COMMENT)]
+
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    # Simple entier : le projet peut lui-même avoir été supprimé
+    project_id = models.BigIntegerField()
+    deleted_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project_id', 'deleted_time'], name='tombstone_project_deleted_idx'),
+            models.Index(fields=['deleted_time'], name='tombstone_deleted_idx'),
+        ]
+
+
+class ProjectCounter(models.Model):
+    """
+    Compteur matérialisé d'un projet : nombre de tâches par valeur de statut, de priorité ou d'étiquette
+    (`dimension` est le nom du champ), ou nombre total de commentaires (dimension `comments`).
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='counters')
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=50, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'dimension', 'value'], name='project_counter_unique'),
+        ]
+
+
+class IssueCommentCounter(models.Model):
+    """Nombre de commentaires d'une tâche, créé au premier commentaire."""
+    issue = models.OneToOneField(Issue, on_delete=models.CASCADE, primary_key=True, related_name='comment_counter')
+    # Copie du projet de la tâche, pour classer les tâches d'un projet par nombre de commentaires
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', '-count'], name='issue_comment_count_idx'),
+        ]
@@ -0,0 +1,95 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CreatedTimeCursorPagination(LimitOffsetPagination):
+    """
+    Pagination par décalage par défaut, et pagination par curseur sur (created_time, id)
+    lorsque le client passe ?pagination=cursor (ou un ?cursor= reçu précédemment).
+    Le mode curseur n'exécute jamais de COUNT(*) et reste en temps constant quelle que soit la profondeur.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    ordering = ('created_time', 'id')
+    invalid_cursor_message = "Curseur invalide."
+
+    def is_cursor_request(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.is_cursor_request(request)
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.display_page_controls = False
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_time, pk = position
+            # Condition écrite pour permettre un parcours par plage de l'index (created_time, id)
+            queryset = queryset.filter(created_time__gte=created_time).filter(
+                Q(created_time__gt=created_time) | Q(id__gt=pk)
+            )
+
+        # Lire un élément de plus que la page pour savoir s'il existe une page suivante
+        results = list(queryset[:self.limit + 1])
+        self.has_next = len(results) > self.limit
+        results = results[:self.limit]
+        self.next_position = (results[-1].created_time, results[-1].pk) if self.has_next else None
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_previous_link(self):
+        if self.use_cursor:
+            return None
+        return super().get_previous_link()
+
+    def encode_cursor(self, position):
+        created_time, pk = position
+        raw = f'{created_time.isoformat()}|{pk}'.encode()
+        return urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+            created_time, pk = raw.rsplit('|', 1)
+            created_time = parse_datetime(created_time)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_time is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_time, pk
@@ -1,4 +1,5 @@
 from API_IssueTrackingSystem.models import Project, Contributor, Comment, Issue
+from API_IssueTrackingSystem.membership import aget_memberships, is_member
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
 class IsContributor(BasePermission):
@@ -7,13 +8,13 @@ class IsContributor(BasePermission):
     def _get_project_id(self, obj):
         # Obtenir l'identifiant du projet en fonction du type d'objet
         if isinstance(obj, Comment):
-            return obj.issue.project.id
+            return obj.project_id
         elif isinstance(obj, Issue):
-            return obj.project.id
+            return obj.project_id
         elif isinstance(obj, Project):
             return obj.id
         elif isinstance(obj, Contributor):
-            return obj.project.id
+            return obj.project_id
         return None
 
     def has_object_permission(self, request, view, obj):
@@ -26,8 +27,19 @@ class IsContributor(BasePermission):
         if not project_id:
             return False
 
-        # Vérifier si l'utilisateur est un contributeur du projet
-        return Contributor.objects.filter(user=request.user, project_id=project_id).exists()
+        # Vérifier si l'utilisateur est un contributeur du projet (appartenances chargées une fois par requête)
+        return is_member(request, project_id)
+
+class AsyncIsContributor(IsContributor):
+    """IsContributor pour les vues asynchrones (async_views.py), qui ne passent pas par DRF."""
+
+    async def ahas_object_permission(self, request, view, obj):
+        if not request.user.is_authenticated:
+            return False
+        project_id = self._get_project_id(obj)
+        if not project_id:
+            return False
+        return project_id in await aget_memberships(request)
 
 class IsAuthorOrReadOnly(BasePermission):
     # Permission personnalisée pour autoriser uniquement les auteurs d'un projet à le modifier
@@ -36,13 +48,13 @@ class IsAuthorOrReadOnly(BasePermission):
         if request.method in SAFE_METHODS:
             return True
         
-        # Les permissions d'écriture sont déterminées en fonction du type d'objet
+        # Les permissions d'écriture sont déterminées en fonction du type d'objet (comparaison des clés, sans requête)
         if isinstance(obj, Project):
-            return obj.author == request.user
+            return obj.author_id == request.user.pk
         elif isinstance(obj, Issue):
-            return obj.assigned_to == request.user
+            return obj.assigned_to_id == request.user.pk
         elif isinstance(obj, Comment):
-            return obj.author == request.user
+            return obj.author_id == request.user.pk
         elif isinstance(obj, Contributor):
-            return obj.user == request.user
+            return obj.user_id == request.user.pk
         return False  # Cas par défaut si le type d'objet n'est pas géré
@@ -0,0 +1,29 @@
+"""
+Rendu JSON des listes de tâches et de commentaires avec orjson lorsqu'il est installé (dépendance facultative),
+octet pour octet identique à celui de JSONRenderer. Sans orjson, ou pour tout ce qu'il ne sait pas produire à
+l'identique (indentation, ensure_ascii, entiers hors 64 bits, clés non textuelles...), JSONRenderer prend le relais.
+
+Les dates, décimaux et autres types hors JSON passent par l'encodeur de DRF. Les nombres à virgule ne sont pas
+écrits comme par json (1e-06 devient 1e-6) : ce rendu n'est utilisé que par des vues qui n'en renvoient pas.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            # orjson.JSONEncodeError : valeur qu'il refuse, le rendu standard tranche
+            return super().render(data, accepted_media_type, renderer_context)
+        # Comme JSONRenderer : \u2028 et \u2029 toujours échappés
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,97 @@
+"""
+Répartition des lectures entre la base principale et ses réplicas (alias de DATABASES autres que `default`).
+Seules les requêtes GET, HEAD et OPTIONS des viewsets qui utilisent ReplicaReadMixin lisent sur un réplica ;
+les écritures, les commandes et les tâches de fond restent sur la base principale. Après une écriture,
+les lectures de l'utilisateur restent sur la principale pendant REPLICA_STICKY_SECONDS, le temps que les
+réplicas rattrapent leur retard (lecture de ses propres écritures). Cet épinglage est gardé dans un cache partagé
+entre les processus s'il y en a un (REPLICA_PIN_CACHE), sinon dans un cookie signé renvoyé avec la réponse à
+l'écriture : un cache propre au processus ne serait pas vu par les autres workers.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from API_IssueTrackingSystem.caching import shared_cache
+
+# Alias des réplicas en lecture ; par défaut, toutes les bases déclarées autres que la principale
+REPLICA_DATABASES = getattr(settings, 'REPLICA_DATABASES',
+                            [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS])
+
+# Durée (en secondes) pendant laquelle un utilisateur qui vient d'écrire lit sur la base principale
+REPLICA_STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+# Cache partagé entre les processus qui mémorise les utilisateurs ayant écrit récemment ; sans lui, cookie signé
+REPLICA_PIN_CACHE = getattr(settings, 'REPLICA_PIN_CACHE', None)
+
+REPLICA_PIN_COOKIE = 'replica_pin'
+
+_PIN_SALT = 'API_IssueTrackingSystem.replicas'
+
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin(request, response):
+    """Fait lire l'auteur de la requête sur la base principale pendant REPLICA_STICKY_SECONDS."""
+    if not REPLICA_DATABASES:
+        return
+    user_id = request.user.pk
+    cache = shared_cache(REPLICA_PIN_CACHE)
+    if cache is not None:
+        cache.set(_pin_key(user_id), True, REPLICA_STICKY_SECONDS)
+    else:
+        response.set_signed_cookie(REPLICA_PIN_COOKIE, str(user_id), salt=_PIN_SALT, max_age=REPLICA_STICKY_SECONDS,
+                                   secure=request.is_secure(), httponly=True, samesite='Lax')
+
+
+def is_pinned(request):
+    user_id = request.user.pk
+    if user_id is None:
+        return False
+    cache = shared_cache(REPLICA_PIN_CACHE)
+    if cache is not None:
+        return bool(cache.get(_pin_key(user_id)))
+    # La signature date le cookie : sa durée de vie est vérifiée ici, pas seulement par le client
+    value = request.get_signed_cookie(REPLICA_PIN_COOKIE, default=None, salt=_PIN_SALT,
+                                      max_age=REPLICA_STICKY_SECONDS)
+    return value == str(user_id)
+
+
+def choose_replica(request):
+    """Réplica où lire pour l'auteur de la requête, ou None s'il doit lire sur la base principale."""
+    if not REPLICA_DATABASES or is_pinned(request):
+        return None
+    return random.choice(REPLICA_DATABASES)
+
+
+def use_replica(alias):
+    return _read_alias.set(alias)
+
+
+def reset(token):
+    _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Routeur de bases : lectures sur le réplica choisi pour la requête en cours, tout le reste sur la principale."""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        # Dans une transaction, les lectures doivent voir ses écritures
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les réplicas contiennent les mêmes données que la principale
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
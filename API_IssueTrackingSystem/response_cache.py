@@ -0,0 +1,126 @@
+"""
+Cache des réponses de liste et de détail des viewsets (ResponseCacheMixin), activé par `RESPONSE_CACHE_ENABLED`.
+Une entrée est indexée par la vue, l'URL, le format, l'ensemble des projets de l'utilisateur (les utilisateurs
+des mêmes projets la partagent) et le numéro de génération de chacun de ces projets. Toute écriture sur un
+projet, une tâche, un commentaire ou un contributeur incrémente la génération du projet après la validation :
+les entrées antérieures ne sont plus jamais lues et disparaissent par éviction.
+Seules les réponses JSON sont mises en cache : la page HTML de l'API navigable dépend de l'utilisateur (nom,
+jeton CSRF) et ne doit pas être servie à un autre.
+
+La génération est lue avant les données : une réponse calculée pendant une écriture est rangée sous l'ancienne
+génération, que l'écriture invalide en se terminant. Une génération évincée est recréée à partir de l'horloge,
+jamais à une valeur déjà utilisée.
+
+Les entrées vont dans le cache `RESPONSE_CACHE`, qui les évince (LocMemCache : les moins récemment lues
+au-delà de MAX_ENTRIES) ; avec `RESPONSE_CACHE_MAX_ENTRY_SIZE`, la mémoire occupée est bornée. Avec plusieurs
+processus, ce cache doit être partagé (backend fichier, Redis...) pour que les invalidations les atteignent.
+"""
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+# Cache des réponses désactivé par défaut
+RESPONSE_CACHE_ENABLED = getattr(settings, 'RESPONSE_CACHE_ENABLED', False)
+
+# Alias du cache des réponses et des générations
+RESPONSE_CACHE = getattr(settings, 'RESPONSE_CACHE', 'default')
+
+# Durée de vie (en secondes) d'une entrée, filet de sécurité pour les écritures faites hors de l'ORM
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+# Taille maximale (en octets) d'une réponse mise en cache
+RESPONSE_CACHE_MAX_ENTRY_SIZE = getattr(settings, 'RESPONSE_CACHE_MAX_ENTRY_SIZE', 256 * 1024)
+
+# Au-delà de ce nombre de projets, lire les générations coûte plus que la réponse : pas de cache
+RESPONSE_CACHE_MAX_PROJECTS = getattr(settings, 'RESPONSE_CACHE_MAX_PROJECTS', 200)
+
+_pending = ContextVar('response_cache_projects', default=None)
+
+
+def _cache():
+    return caches[RESPONSE_CACHE]
+
+
+def _generation_key(project_id):
+    return f'response-generation:{project_id}'
+
+
+def generations(project_ids):
+    """Retourne les générations des projets, en créant celles qui manquent."""
+    cache = _cache()
+    keys = {_generation_key(project_id): project_id for project_id in project_ids}
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # Valeur tirée de l'horloge : une génération évincée ne revient jamais à une valeur passée
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, None)
+        found.update(cache.get_many(missing))
+    return [found.get(key) for key in keys]
+
+
+def _bump(project_ids):
+    cache = _cache()
+    for project_id in project_ids:
+        try:
+            cache.incr(_generation_key(project_id))
+        except ValueError:
+            # Génération absente : elle sera recréée à une valeur neuve
+            pass
+
+
+def make_key(view_name, request, project_ids):
+    """Clé de la réponse, ou None si elle ne doit pas être mise en cache."""
+    if not isinstance(request.accepted_renderer, JSONRenderer):
+        return None
+    project_ids = sorted(project_ids)
+    if len(project_ids) > RESPONSE_CACHE_MAX_PROJECTS:
+        return None
+    parts = (view_name, request.path, sorted(request.query_params.lists()), request.accepted_renderer.format,
+             project_ids, generations(project_ids))
+    return 'response:' + hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def get(key):
+    """Retourne (etag, contenu, type de contenu) ou None."""
+    return _cache().get(key)
+
+
+def store(key, response):
+    content = response.content
+    if len(content) > RESPONSE_CACHE_MAX_ENTRY_SIZE:
+        return
+    _cache().set(key, (response.get('ETag'), content, response['Content-Type']), RESPONSE_CACHE_TIMEOUT)
+
+
+@contextmanager
+def batch():
+    """Regroupe les invalidations du bloc : une seule par projet, après la validation (opérations en masse)."""
+    if _pending.get() is not None:
+        yield
+        return
+    project_ids = set()
+    token = _pending.set(project_ids)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    if project_ids:
+        transaction.on_commit(lambda: _bump(project_ids))
+
+
+def invalidate(*project_ids):
+    """Invalide les réponses des projets une fois la transaction courante validée."""
+    project_ids = {project_id for project_id in project_ids if project_id is not None}
+    pending = _pending.get()
+    if pending is not None:
+        pending.update(project_ids)
+    elif project_ids:
+        transaction.on_commit(lambda: _bump(project_ids))
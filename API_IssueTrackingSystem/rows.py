@@ -0,0 +1,133 @@
+"""
+Représentation rapide des pages de liste : les lignes sont lues avec `.values_list()` et converties par un plan
+compilé une fois par requête à partir des champs du sérialiseur, sans instancier de modèles ni appeler
+to_representation() champ par champ. Chaque conversion reproduit exactement celle du champ DRF ; un sérialiseur
+dont un champ n'a pas d'équivalent connu n'a pas de plan, et la vue garde le chemin habituel.
+"""
+from datetime import timezone as dt_timezone
+
+from django.db import models
+from rest_framework import fields, relations
+from rest_framework.settings import api_settings, ISO_8601
+from API_IssueTrackingSystem.metrics import timed
+
+# Colonnes toujours lues : la pagination par curseur et l'ETag des listes les utilisent
+ROW_REQUIRED_COLUMNS = ('pk', 'created_time', 'updated_time')
+
+
+class Plan:
+    """Colonnes à lire et conversions à appliquer pour produire les lignes d'un sérialiseur."""
+
+    def __init__(self, columns, names, converters):
+        self.columns = columns
+        # (nom du champ, indice de la colonne)
+        self.names = names
+        # (nom du champ, indice de la colonne, conversion) pour les champs dont la valeur brute ne convient pas
+        self.converters = converters
+
+    def represent(self, rows):
+        names, converters = self.names, self.converters
+        data = []
+        for row in rows:
+            item = {name: row[index] for name, index in names}
+            for name, index, convert in converters:
+                value = row[index]
+                # Comme Serializer.to_representation() : None est rendu tel quel, sans conversion
+                if value is not None:
+                    item[name] = convert(value)
+            data.append(item)
+        return data
+
+
+class Rows:
+    """Remplace le sérialiseur `many=True` de la page : seule sa propriété `data` est utilisée."""
+
+    def __init__(self, plan, rows):
+        self.plan = plan
+        self.rows = rows
+
+    @property
+    def data(self):
+        with timed('serializer'):
+            return self.plan.represent(self.rows)
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return None
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    # Fuseau du champ lu une fois pour toutes : il ne change pas pendant la requête
+    field_is_utc = field_timezone is dt_timezone.utc or getattr(field_timezone, 'key', None) == 'UTC'
+
+    def convert(value):
+        if not value:
+            return None
+        # Les dates lues en base sont déjà en UTC : la conversion vers un champ en UTC ne changerait rien
+        if not (field_is_utc and value.tzinfo is dt_timezone.utc):
+            value = field.enforce_timezone(value)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return convert
+
+
+def _choice_converter(field):
+    choices = field.choice_strings_to_values
+
+    def convert(value):
+        if value == '':
+            return value
+        return choices.get(str(value), value)
+
+    return convert
+
+
+def _column(field, model):
+    """Retourne (colonne, conversion ou None), ou None si le champ n'a pas d'équivalent."""
+    if field.source == '*' or '.' in field.source:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source)
+    except models.FieldDoesNotExist:
+        return None
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        # Rendu par la clé primaire de l'objet lié : la colonne de la clé étrangère suffit
+        if field.pk_field is not None or not model_field.many_to_one:
+            return None
+        return model_field.attname, None
+    if isinstance(field, fields.DateTimeField):
+        convert = _datetime_converter(field)
+        return (model_field.attname, convert) if convert is not None else None
+    if isinstance(field, fields.ChoiceField):
+        return model_field.attname, _choice_converter(field)
+    if type(field) is fields.CharField and isinstance(model_field, (models.CharField, models.TextField)):
+        return model_field.attname, None
+    if (type(field) in (fields.IntegerField, fields.BigIntegerField) and isinstance(model_field, models.IntegerField)
+            and not getattr(field, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING)):
+        return model_field.attname, None
+    return None
+
+
+def compile_plan(serializer):
+    """Plan de représentation des champs lisibles du sérialiseur, ou None si l'un d'eux n'a pas d'équivalent."""
+    model = serializer.Meta.model
+    columns = list(ROW_REQUIRED_COLUMNS)
+    names, converters = [], []
+    for field in serializer._readable_fields:
+        column = _column(field, model)
+        if column is None:
+            return None
+        attname, convert = column
+        if attname == model._meta.pk.attname:
+            attname = 'pk'
+        if attname not in columns:
+            columns.append(attname)
+        index = columns.index(attname)
+        # Chaque champ a sa place dans `names` : les clés gardent l'ordre du sérialiseur, conversions comprises
+        names.append((field.field_name, index))
+        if convert is not None:
+            converters.append((field.field_name, index, convert))
+    return Plan(columns, names, converters)
@@ -0,0 +1,178 @@
+"""
+Recherche plein texte dans les titres et descriptions des tâches et dans les commentaires.
+Le moteur dépend de la base : table FTS5 tenue à jour par des déclencheurs sous SQLite (migration 0017),
+`tsvector` sous PostgreSQL, simple recherche `icontains` ailleurs. `SEARCH_BACKEND` permet d'en imposer un.
+"""
+import re
+from functools import reduce
+from operator import add, or_
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.models import CharField, ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import Substr
+from django.utils.module_loading import import_string
+from API_IssueTrackingSystem.models import Issue, Comment
+
+# Chemin d'import d'une classe de moteur ; par défaut, choisi selon la base utilisée
+SEARCH_BACKEND = getattr(settings, 'SEARCH_BACKEND', None)
+
+# Nombre maximal de mots retenus dans une recherche
+SEARCH_MAX_TERMS = 10
+
+# Longueur des extraits du moteur sans index
+SNIPPET_LENGTH = 200
+
+# Balises entourant les termes trouvés dans les extraits
+HIGHLIGHT_START, HIGHLIGHT_STOP = '[', ']'
+
+ISSUE, COMMENT = 'issue', 'comment'
+
+FIELDS = ('type', 'id', 'project', 'issue', 'title', 'snippet', 'rank')
+
+
+def terms(query):
+    return re.findall(r'\w+', query)[:SEARCH_MAX_TERMS]
+
+
+class QuerySetResults:
+    """Adapte un queryset `values_list()` au format des résultats, sans le charger entièrement."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def count(self):
+        return self.queryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        return [dict(zip(FIELDS, row)) for row in self.queryset[item]]
+
+
+class BaseSearchBackend:
+    """Recherche simple par `icontains`, sans index ni classement, utilisable sur toutes les bases."""
+
+    def match(self, queryset, words, fields):
+        """Filtre le queryset sur les mots recherchés et l'annote avec `rank` et `snippet`."""
+        for word in words:
+            queryset = queryset.filter(reduce(or_, (Q(**{f'{field}__icontains': word}) for field in fields)))
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField()),
+                                 snippet=Substr('description', 1, SNIPPET_LENGTH))
+
+    def search(self, query, project_ids, kind=None):
+        words = terms(query)
+        if not words:
+            return []
+        querysets = []
+        if kind in (None, ISSUE):
+            issues = self.match(Issue.objects.filter(project_id__in=project_ids), words, ('title', 'description'))
+            querysets.append(self._rows(issues, ISSUE, F('id'), F('title')))
+        if kind in (None, COMMENT):
+            comments = self.match(Comment.objects.filter(project_id__in=project_ids), words, ('description',))
+            querysets.append(self._rows(comments, COMMENT, F('issue_id'), Value('')))
+        results = querysets[0].union(*querysets[1:], all=True) if len(querysets) > 1 else querysets[0]
+        return QuerySetResults(results.order_by('-rank', '-created_time', '-id'))
+
+    @staticmethod
+    def _rows(queryset, kind, issue, title):
+        return queryset.annotate(
+            result_type=Value(kind, output_field=CharField()),
+            result_issue=issue,
+            result_title=ExpressionWrapper(title, output_field=CharField()),
+        ).values_list('result_type', 'id', 'project_id', 'result_issue', 'result_title', 'snippet', 'rank',
+                      'created_time')
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Recherche `tsvector` de PostgreSQL, classée par `ts_rank` (le titre pèse plus que la description)."""
+
+    config = 'french'
+
+    def match(self, queryset, words, fields):
+        from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+
+        search_query = SearchQuery(' '.join(words), config=self.config, search_type='plain')
+        vector = reduce(add, (SearchVector(field, weight='A' if field == 'title' else 'B', config=self.config)
+                              for field in fields))
+        return queryset.annotate(document=vector).filter(document=search_query).annotate(
+            rank=SearchRank(F('document'), search_query),
+            snippet=SearchHeadline('description', search_query, config=self.config,
+                                   start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP),
+        )
+
+
+class SQLiteResults:
+    """Résultats FTS5 paresseux : chaque tranche demandée par la pagination exécute un seul SELECT."""
+
+    def __init__(self, where, params):
+        self.where = where
+        self.params = params
+        self._count = None
+
+    def _cursor(self):
+        # Même base que les lectures de l'ORM : le réplica choisi pour la requête, le cas échéant
+        return connections[router.db_for_read(Issue)].cursor()
+
+    def count(self):
+        if self._count is None:
+            with self._cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM search_index WHERE {self.where}', self.params)
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step is not None:
+            raise TypeError("Seules les tranches sans pas sont prises en charge.")
+        start = item.start or 0
+        limit = -1 if item.stop is None else max(item.stop - start, 0)
+        # rowid = 2 * id pour une tâche, 2 * id + 1 pour un commentaire ; le titre pèse plus que le corps
+        sql = (
+            "SELECT CASE rowid %% 2 WHEN 0 THEN 'issue' ELSE 'comment' END, rowid / 2, project_id, issue_id, "
+            "title, snippet(search_index, -1, %s, %s, '…', 12), bm25(search_index, 0, 0, 10.0, 1.0) AS rank "
+            f"FROM search_index WHERE {self.where} ORDER BY rank, rowid DESC LIMIT %s OFFSET %s"
+        )
+        with self._cursor() as cursor:
+            cursor.execute(sql, [HIGHLIGHT_START, HIGHLIGHT_STOP, *self.params, limit, start])
+            rows = cursor.fetchall()
+        # bm25 est d'autant plus petit que le document est pertinent : on renvoie un score croissant
+        return [dict(zip(FIELDS, (*row[:6], -row[6]))) for row in rows]
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """Table virtuelle FTS5 `search_index`, classée par bm25."""
+
+    def search(self, query, project_ids, kind=None):
+        words = terms(query)
+        if not words:
+            return []
+        # Chaque mot est cité pour neutraliser la syntaxe FTS5 ; le dernier est un préfixe (saisie en cours)
+        match = ' '.join(f'"{word}"' for word in words) + '*'
+        where, params = 'search_index MATCH %s', [match]
+        if isinstance(project_ids, (list, tuple)):
+            if not project_ids:
+                return []
+            where += f" AND project_id IN ({', '.join(['%s'] * len(project_ids))})"
+            params += list(project_ids)
+        else:
+            subquery, subquery_params = project_ids.query.sql_with_params()
+            where += f' AND project_id IN ({subquery})'
+            params += list(subquery_params)
+        if kind is not None:
+            where += ' AND rowid %% 2 = %s'
+            params.append(0 if kind == ISSUE else 1)
+        return SQLiteResults(where, params)
+
+
+def get_backend():
+    if SEARCH_BACKEND:
+        return import_string(SEARCH_BACKEND)()
+    if connection.vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return BaseSearchBackend()
@@ -1,70 +1,94 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Exists
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from API_IssueTrackingSystem.models import Project, Contributor, Issue, Comment
 from django.utils import timezone
-from django.contrib.auth import get_user_model
+from API_IssueTrackingSystem.fields import (MembershipRelatedFieldsMixin, AssigneeField, MemberIssueField,
+                                            MemberProjectField, NewContributorField)
+from API_IssueTrackingSystem.metrics import TimedListSerializer, TimedSerializerMixin
 
+PROJECT_NOT_FOUND = "Le projet spécifié n'existe pas ou vous n'y avez pas accès."
+TITLE_TAKEN = "Une tâche avec ce titre existe déjà pour ce projet."
+ASSIGNEE_INVALID = "L'utilisateur assigné doit être un contributeur ou un propriétaire du projet."
 
 
 # Sérialiseur de base pour les tâches (issues)
-class IssueSerializer(serializers.ModelSerializer):
-    
+class IssueSerializer(TimedSerializerMixin, MembershipRelatedFieldsMixin, serializers.ModelSerializer):
+    # Le projet est validé à partir des appartenances de la requête, l'assigné avec le titre (voir fields.py)
+    membership_related_fields = {'project': MemberProjectField, 'assigned_to': AssigneeField}
+
     class Meta:
         model = Issue
         fields = '__all__'
-   
-    def get_fields(self):
-        fields = super().get_fields()
-        fields['project'].queryset = Project.objects.filter(contributor__user=self.context['request'].user)
-        return fields
- 
-    def validate_project(self, value):
-        user = self.context['request'].user
-        if not Contributor.objects.filter(user=user, project=value).exists():
-            raise serializers.ValidationError("Vous n'avez pas accès à ce projet ou il n'existe pas.")
-        return value
-    
+        list_serializer_class = TimedListSerializer
+        # L'unicité (projet, titre) est vérifiée par validate() et garantie par la contrainte de la base
+        validators = []
+
     def validate(self, data):
-        if Issue.objects.filter(title=data['title'], project=data['project']).exists():
-            raise serializers.ValidationError("Une tâche avec ce titre existe déjà pour ce projet.")
-        return data
-    
-    # Valider que l'utilisateur assigné est un contributeur ou un propriétaire du projet et afficher uniquement les contributeurs et les propriétaires
-    def validate_assigned_to(self, value):
-        project = self.context['request'].data.get('project')
-        if project:
-            is_contributor_or_owner = Contributor.objects.filter(user_id=value, project_id=project).exists()
-            if not is_contributor_or_owner:
-                raise serializers.ValidationError("L'utilisateur assigné doit être un contributeur ou un propriétaire du projet.")
+        # État final de la tâche : une modification partielle conserve les valeurs enregistrées
+        instance = self.instance
+        project_id = data['project'].pk if 'project' in data else instance.project_id
+        title = data['title'] if 'title' in data else instance.title
+        if 'assigned_to' in data:
+            assigned_to_id = data['assigned_to'] and data['assigned_to'].pk
         else:
-            raise serializers.ValidationError("Le projet doit être spécifié.")
-        return value
+            assigned_to_id = instance and instance.assigned_to_id
+        self._unique_key = (project_id, title)
+        moved = instance is None or project_id != instance.project_id
+        checks = {}
+        if moved or title != instance.title:
+            same_title = Issue.objects.filter(project_id=project_id, title=title)
+            if instance is not None:
+                same_title = same_title.exclude(pk=instance.pk)
+            checks['title_taken'] = Exists(same_title)
+        if assigned_to_id is not None and (moved or 'assigned_to' in data):
+            checks['assignee_ok'] = Exists(Contributor.objects.filter(project_id=project_id, user_id=assigned_to_id))
+        if not checks:
+            return data
+        # Existence du projet, unicité du titre et appartenance de l'assigné en une seule requête
+        row = Project.objects.filter(pk=project_id).values(**checks).first()
+        if row is None:
+            raise serializers.ValidationError({'project': [PROJECT_NOT_FOUND]})
+        errors = {}
+        if row.get('title_taken'):
+            errors[api_settings.NON_FIELD_ERRORS_KEY] = [TITLE_TAKEN]
+        if row.get('assignee_ok') is False:
+            errors['assigned_to'] = [ASSIGNEE_INVALID]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            # Une écriture concurrente a pris le titre entre la validation et l'enregistrement
+            project_id, title = self._unique_key
+            if not Issue.objects.filter(project_id=project_id, title=title).exists():
+                raise
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [TITLE_TAKEN]})
 
 # Sérialiseur de base pour les commentaires
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, MembershipRelatedFieldsMixin, serializers.ModelSerializer):
+    # Seules les tâches des projets de l'utilisateur sont acceptées
+    membership_related_fields = {'issue': MemberIssueField}
+
     class Meta:
         model = Comment
         fields = '__all__'
+        list_serializer_class = TimedListSerializer
         extra_kwargs = {
             'author': {'read_only': True}
         }
-    
-    # Afficher uniquement les tâches auxquelles l'utilisateur a accès
-    def get_fields(self):
-        fields = super(CommentSerializer, self).get_fields()
-        fields['issue'].queryset = Issue.objects.filter(project__contributor__user=self.context['request'].user)
-        return fields
-
-    def validate_issue(self, value):
-        user = self.context['request'].user
-        if not Issue.objects.filter(id=value.id, project__contributor__user=user).exists():
-            raise serializers.ValidationError("Vous n'avez pas accès à cette tâche ou elle n'existe pas.")
-        return value
 
 # Sérialiseurs pour les projets (version complète et simplifiée)
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = ['id', 'title', 'author']
+        list_serializer_class = TimedListSerializer
         extra_kwargs = {'author': {'read_only': True}}
 
 class ProjectSerializerFull(ProjectSerializer):
@@ -73,19 +97,50 @@ class ProjectSerializerFull(ProjectSerializer):
         extra_kwargs = {'author': {'read_only': True}}
 
 
-class ContributorSerializer(serializers.ModelSerializer):
+class ContributorSerializer(TimedSerializerMixin, MembershipRelatedFieldsMixin, serializers.ModelSerializer):
+    # Afficher uniquement les projets auxquels l'utilisateur a accès et les utilisateurs qui ne sont pas déjà
+    # contributeurs ; la validation s'appuie sur les appartenances de la requête (voir fields.py)
+    membership_related_fields = {'project': MemberProjectField, 'user': NewContributorField}
+
     class Meta:
         model = Contributor
         fields = '__all__'
+        list_serializer_class = TimedListSerializer
         extra_kwargs = {
             'role': {'required': True},
             'user': {'required': True},
             'project': {'required': True}
         }
 
-    # Afficher uniquement les projets auxquels l'utilisateur a accès et les utilisateurs qui ne sont pas déjà contributeurs
-    def get_fields(self):
-        fields = super(ContributorSerializer, self).get_fields()
-        fields['project'].queryset = Project.objects.filter(contributor__user=self.context['request'].user)
-        fields['user'].queryset = get_user_model().objects.exclude(contributor__project__contributor__user=self.context['request'].user)
-        return fields
+
+# Sérialiseurs des opérations en masse : les relations sont de simples identifiants,
+# vérifiées ensuite par lots (voir bulk.py) plutôt qu'élément par élément
+class IssueBulkSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    project = serializers.IntegerField(source='project_id')
+    assigned_to = serializers.IntegerField(source='assigned_to_id', required=False, allow_null=True)
+
+    class Meta:
+        model = Issue
+        fields = ['id', 'title', 'description', 'tag', 'priority', 'project', 'status', 'assigned_to']
+        validators = []
+
+
+# Déplacement d'une tâche (voir bulk.move_issue) : sans `assigned_to`, l'assigné actuel est conservé
+class IssueMoveSerializer(TimedSerializerMixin, serializers.Serializer):
+    project = serializers.IntegerField()
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+
+
+class CommentBulkSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    issue = serializers.IntegerField(source='issue_id')
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'description', 'issue']
+
+    def validate_description(self, value):
+        if not value.strip():
+            raise serializers.ValidationError("Le commentaire ne peut pas être vide.")
+        return value
@@ -0,0 +1,144 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from API_IssueTrackingSystem.models import Project, Contributor, Issue, Comment, Tombstone
+from API_IssueTrackingSystem.membership import invalidate_memberships
+from API_IssueTrackingSystem import counters, events, response_cache, sync
+
+
+# Invalider le cache des appartenances dès qu'un contributeur est ajouté, modifié ou supprimé. L'entrée est aussi
+# retirée à la validation : une requête concurrente a pu remettre en cache les appartenances d'avant l'écriture.
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+def contributor_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    invalidate_memberships(user_id)
+    transaction.on_commit(lambda: invalidate_memberships(user_id))
+
+
+# Pousser les modifications aux flux d'événements des membres (après la validation de la transaction)
+@receiver(post_save, sender=Contributor)
+def contributor_saved_event(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        events.contributor_event(instance, events.CREATED if created else events.UPDATED)
+
+
+@receiver(post_delete, sender=Contributor)
+def contributor_deleted_event(sender, instance, **kwargs):
+    events.contributor_event(instance, events.DELETED)
+
+
+# Enregistré avant les récepteurs des compteurs, qui oublient l'ancien projet d'un commentaire déplacé
+@receiver(post_save, sender=Issue)
+@receiver(post_save, sender=Comment)
+def saved_event(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    action = events.CREATED if created else events.UPDATED
+    if sender is Issue:
+        events.issue_event(instance, action, previous_project_id=getattr(instance, '_loaded_project_id', None))
+    else:
+        loaded = getattr(instance, '_loaded_issue', None) or (None, None)
+        events.comment_event(instance, action, previous_project_id=loaded[1])
+
+
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Comment)
+def deleted_event(sender, instance, origin=None, **kwargs):
+    # Les membres apprennent la suppression d'un projet par celle de leur contribution
+    if isinstance(origin, Project):
+        return
+    if sender is Issue:
+        events.issue_event(instance, events.DELETED)
+    else:
+        events.comment_event(instance, events.DELETED)
+
+
+# Invalider les réponses en cache des projets touchés, anciens projets compris (avant les récepteurs des compteurs)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Contributor)
+@receiver(post_save, sender=Issue)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Contributor)
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Comment)
+def invalidate_responses(sender, instance, origin=None, **kwargs):
+    if sender is Project:
+        response_cache.invalidate(instance.pk)
+    elif isinstance(origin, Project):
+        # Le projet supprimé est invalidé une seule fois, par son propre signal
+        return
+    elif sender is Issue:
+        response_cache.invalidate(instance.project_id, getattr(instance, '_loaded_project_id', None))
+    elif sender is Comment:
+        response_cache.invalidate(instance.project_id, (getattr(instance, '_loaded_issue', None) or (None, None))[1])
+    else:
+        response_cache.invalidate(instance.project_id)
+
+
+# Enregistrer les suppressions pour la synchronisation incrémentale
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Comment)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    # Inutile lorsque le projet entier est supprimé : il disparaît de la liste des projets du client
+    if isinstance(origin, Project):
+        return
+    model = Tombstone.ISSUE if sender is Issue else Tombstone.COMMENT
+    Tombstone.objects.create(model=model, object_id=instance.pk, project_id=instance.project_id)
+
+
+# Une tâche ou un commentaire qui change de projet disparaît aussi de l'ancien, pour la synchronisation. Les
+# commentaires d'une tâche déplacée sont annoncés aux flux d'événements, comme par bulk.move_issue()
+@receiver(post_save, sender=Issue)
+@receiver(post_save, sender=Comment)
+def record_move(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    if sender is Issue:
+        old_project_id = getattr(instance, '_loaded_project_id', None)
+        if old_project_id not in (None, instance.project_id):
+            # Les commentaires suivent la tâche (Issue.save) : ils sont encore rattachés à l'ancien projet
+            comments = list(Comment.objects.filter(issue_id=instance.pk))
+            sync.record_moves(old_project_id, [instance.pk], [comment.pk for comment in comments])
+            for comment in comments:
+                # Valeurs qu'Issue.save() leur donne juste après ce signal
+                comment.project_id, comment.updated_time = instance.project_id, instance.updated_time
+                events.comment_event(comment, events.UPDATED, previous_project_id=old_project_id)
+    else:
+        old_project_id = (getattr(instance, '_loaded_issue', None) or (None, None))[1]
+        if old_project_id not in (None, instance.project_id):
+            sync.record_moves(old_project_id, comment_ids=[instance.pk])
+
+
+# Tenir à jour les compteurs des tableaux de bord
+@receiver(post_save, sender=Issue)
+def issue_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.issue_added(instance)
+    else:
+        counters.issue_changed(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.comment_added(instance)
+    else:
+        counters.comment_changed(instance)
+
+
+@receiver(post_delete, sender=Issue)
+@receiver(post_delete, sender=Comment)
+def update_counters_on_delete(sender, instance, origin=None, **kwargs):
+    # Les compteurs d'un projet supprimé disparaissent avec lui
+    if isinstance(origin, Project):
+        return
+    if sender is Issue:
+        counters.issue_added(instance, sign=-1)
+    else:
+        counters.comment_added(instance, sign=-1)
@@ -0,0 +1,132 @@
+"""
+Flux Server-Sent Events des modifications des projets de l'utilisateur (voir events.py), servi sur
+`EVENT_STREAM_PATH` par l'application ASGI (config/asgi.py). Chaque connexion n'est qu'une coroutine en attente :
+aucun fil n'est occupé, et la déconnexion du client est surveillée pour libérer l'abonnement.
+
+Le jeton JWT est lu dans l'en-tête Authorization ou, pour EventSource qui ne peut pas en envoyer, dans le
+paramètre `access_token`. Un client reconnecté reprend après le dernier événement reçu (Last-Event-ID) ; si des
+événements ont été perdus, il reçoit un événement `reset` et doit se resynchroniser avec /sync/.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from API_IssueTrackingSystem.events import get_broker, reset_frame
+from API_IssueTrackingSystem.membership import load_memberships
+
+# Chemin du flux d'événements
+EVENT_STREAM_PATH = getattr(settings, 'EVENT_STREAM_PATH', '/events/')
+
+# Intervalle (en secondes) des commentaires envoyés sur un flux inactif, pour que les proxys ne le coupent pas
+EVENT_HEARTBEAT_INTERVAL = getattr(settings, 'EVENT_HEARTBEAT_INTERVAL', 15)
+
+# Délai de reconnexion (en millisecondes) conseillé aux clients
+EVENT_RETRY_MS = 3000
+
+NOT_AUTHENTICATED = "Informations d'authentification non fournies."
+INVALID_TOKEN = "Le jeton est invalide ou expiré, ou l'utilisateur est inactif."
+
+
+class AuthenticationFailed(Exception):
+    pass
+
+
+def authenticate(raw_token):
+    """Retourne (identifiant de l'utilisateur, projets dont il est membre) pour un jeton d'accès valide."""
+    try:
+        user_id = AccessToken(raw_token)[jwt_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        raise AuthenticationFailed(INVALID_TOKEN)
+    close_old_connections()
+    try:
+        user = get_user_model().objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).only('id', 'is_active').first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(INVALID_TOKEN)
+        return user.pk, list(load_memberships(user.pk))
+    finally:
+        close_old_connections()
+
+
+class EventStreamApp:
+    """Sert le flux d'événements et confie les autres requêtes à l'application ASGI de Django."""
+
+    def __init__(self, application, path=EVENT_STREAM_PATH):
+        self.application = application
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != self.path:
+            return await self.application(scope, receive, send)
+        if scope['method'] != 'GET':
+            return await self._error(send, 405, "Méthode non autorisée.", [(b'allow', b'GET')])
+        headers = dict(scope['headers'])
+        query = parse_qs(scope.get('query_string', b'').decode())
+        raw_token = _bearer(headers.get(b'authorization')) or query.get('access_token', [None])[0]
+        if not raw_token:
+            return await self._error(send, 401, NOT_AUTHENTICATED, [(b'www-authenticate', b'Bearer realm="api"')])
+        try:
+            # Requêtes courtes hors de la boucle, sans réserver de fil à la connexion
+            user_id, project_ids = await sync_to_async(authenticate, thread_sensitive=False)(raw_token)
+        except AuthenticationFailed as error:
+            return await self._error(send, 401, str(error), [(b'www-authenticate', b'Bearer realm="api"')])
+        last_event_id = _event_id(headers.get(b'last-event-id', b'').decode()
+                                  or query.get('lastEventId', [''])[0])
+
+        broker = get_broker()
+        subscription = broker.subscribe(user_id, project_ids, last_event_id)
+        watcher = asyncio.create_task(self._watch_disconnect(receive, subscription))
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                # Pas de mise en tampon par nginx
+                (b'x-accel-buffering', b'no'),
+            ]})
+            await send({'type': 'http.response.body', 'body': f'retry: {EVENT_RETRY_MS}\n\n'.encode(),
+                        'more_body': True})
+            while not subscription.closed:
+                frames = await subscription.wait(EVENT_HEARTBEAT_INTERVAL)
+                if subscription.closed:
+                    break
+                if subscription.lagging:
+                    await send({'type': 'http.response.body', 'body': reset_frame()})
+                    return
+                await send({'type': 'http.response.body', 'body': b''.join(frames) or b': ping\n\n',
+                            'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            broker.unsubscribe(subscription)
+            watcher.cancel()
+
+    @staticmethod
+    async def _watch_disconnect(receive, subscription):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        subscription.close()
+
+    @staticmethod
+    async def _error(send, status, detail, headers=()):
+        body = json.dumps({'detail': detail}, ensure_ascii=False).encode()
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'), *headers]})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def _bearer(header):
+    if header and header[:7].lower() == b'bearer ':
+        return header[7:].decode().strip()
+    return None
+
+
+def _event_id(value):
+    try:
+        return int(value)
+    except ValueError:
+        return None
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import exceptions, status
+from API_IssueTrackingSystem.models import Project, Contributor, Issue, Comment, Tombstone
+
+# Durée de conservation des traces de suppression ; un jeton plus ancien impose une resynchronisation complète
+SYNC_TOMBSTONE_RETENTION = getattr(settings, 'SYNC_TOMBSTONE_RETENTION', timedelta(days=30))
+
+# Marge retirée du nouveau jeton pour ne pas manquer une écriture validée juste après la lecture
+SYNC_SAFETY_MARGIN = getattr(settings, 'SYNC_SAFETY_MARGIN', timedelta(seconds=2))
+
+# Nombre de traces vérifiées par requête (clause IN)
+SYNC_VISIBLE_BATCH_SIZE = 500
+
+# Nombre maximal de tâches et de commentaires par page de l'état complet
+SYNC_PAGE_SIZE = getattr(settings, 'SYNC_PAGE_SIZE', 1000)
+
+_signer = signing.Signer(salt='API_IssueTrackingSystem.sync')
+_cursor_signer = signing.Signer(salt='API_IssueTrackingSystem.sync.snapshot')
+
+# Sections de l'état complet, parcourues dans cet ordre
+SNAPSHOT_SECTIONS = {'issues': Issue, 'comments': Comment}
+
+
+class SyncExpired(exceptions.APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Le jeton de synchronisation a expiré, une synchronisation complète est nécessaire."
+    default_code = 'sync_expired'
+
+
+def encode_watermark(moment):
+    return _signer.sign(str(int(moment.timestamp() * 1_000_000)))
+
+
+def _decode_moment(microseconds):
+    moment = datetime.fromtimestamp(microseconds / 1_000_000, tz=dt_timezone.utc)
+    if moment < timezone.now() - SYNC_TOMBSTONE_RETENTION:
+        raise SyncExpired()
+    return moment
+
+
+def decode_watermark(token):
+    """Retourne l'instant encodé dans le jeton opaque, ou lève une erreur de validation."""
+    try:
+        microseconds = int(_signer.unsign(token))
+    except (signing.BadSignature, ValueError):
+        raise exceptions.ValidationError({'since': "Jeton de synchronisation invalide."})
+    return _decode_moment(microseconds)
+
+
+def encode_snapshot_cursor(moment, section, last_id):
+    """Curseur de la page suivante de l'état complet : jeton de fin (pris avant la première page) et position."""
+    return _cursor_signer.sign(f'{int(moment.timestamp() * 1_000_000)}.{section}.{last_id}')
+
+
+def decode_snapshot_cursor(token):
+    """Retourne (instant du jeton de fin, section, dernier identifiant lu), ou lève une erreur de validation."""
+    try:
+        microseconds, section, last_id = _cursor_signer.unsign(token).split('.')
+        microseconds, last_id = int(microseconds), int(last_id)
+    except (signing.BadSignature, ValueError):
+        raise exceptions.ValidationError({'cursor': "Curseur de synchronisation invalide."})
+    if section not in SNAPSHOT_SECTIONS:
+        raise exceptions.ValidationError({'cursor': "Curseur de synchronisation invalide."})
+    return _decode_moment(microseconds), section, last_id
+
+
+def get_changes(user_id, project_ids, since):
+    """
+    Retourne les lignes créées ou modifiées depuis `since` et les suppressions enregistrées.
+    Si `since` est None, retourne l'état complet des projets de l'utilisateur.
+    Les projets rejoints depuis `since` sont renvoyés en entier, leurs anciennes lignes étant inconnues du client.
+    """
+    projects = Project.objects.filter(id__in=project_ids)
+    issues = Issue.objects.filter(project_id__in=project_ids)
+    comments = Comment.objects.filter(project_id__in=project_ids)
+    deleted = {Tombstone.ISSUE: [], Tombstone.COMMENT: []}
+
+    if since is not None:
+        joined = list(Contributor.objects.filter(
+            user_id=user_id, project_id__in=project_ids, created_time__gt=since,
+        ).values_list('project_id', flat=True))
+        projects = projects.filter(Q(updated_time__gt=since) | Q(id__in=joined))
+        issues = issues.filter(Q(updated_time__gt=since) | Q(project_id__in=joined))
+        comments = comments.filter(Q(updated_time__gt=since) | Q(project_id__in=joined))
+        tombstones = Tombstone.objects.filter(project_id__in=project_ids, deleted_time__gt=since)
+        for model, object_id in tombstones.values_list('model', 'object_id'):
+            deleted[model].append(object_id)
+        # Une ligne déplacée laisse une trace dans son ancien projet : inutile si l'utilisateur la voit encore
+        for model, queryset in ((Tombstone.ISSUE, Issue.objects), (Tombstone.COMMENT, Comment.objects)):
+            visible = set()
+            for start in range(0, len(deleted[model]), SYNC_VISIBLE_BATCH_SIZE):
+                chunk = deleted[model][start:start + SYNC_VISIBLE_BATCH_SIZE]
+                visible.update(queryset.filter(project_id__in=project_ids, id__in=chunk).values_list('id', flat=True))
+            deleted[model] = [object_id for object_id in deleted[model] if object_id not in visible]
+
+    return projects, issues, comments, deleted
+
+
+def get_snapshot_page(project_ids, section='issues', after_id=0, limit=None):
+    """
+    Page de l'état complet : au plus `limit` tâches puis commentaires des projets, par identifiant croissant,
+    à partir de la position (`section`, `after_id`). Retourne ({section: lignes}, position suivante ou None).
+    Le parcours reprend là où il s'était arrêté, même si les projets ou les lignes changent entre deux pages :
+    la synchronisation incrémentale qui suit, depuis un jeton pris avant la première page, rattrape ces écritures.
+    """
+    limit = limit or SYNC_PAGE_SIZE
+    page = {name: [] for name in SNAPSHOT_SECTIONS}
+    sections = list(SNAPSHOT_SECTIONS)
+    for name in sections[sections.index(section):]:
+        rows = list(SNAPSHOT_SECTIONS[name].objects.filter(project_id__in=project_ids, id__gt=after_id)
+                    .order_by('id')[:limit + 1])
+        if len(rows) > limit:
+            page[name] = rows[:limit]
+            return page, (name, rows[limit - 1].id)
+        page[name] = rows
+        limit -= len(rows)
+        after_id = 0
+        if not limit:
+            # Page pleine en fin de section : la suivante reprend au début de la section d'après
+            following = sections.index(name) + 1
+            if following < len(sections):
+                return page, (sections[following], 0)
+    return page, None
+
+
+def record_moves(project_id, issue_ids=(), comment_ids=()):
+    """Enregistre la sortie de tâches et de commentaires du projet `project_id`, que ses membres doivent oublier."""
+    Tombstone.objects.bulk_create(
+        [Tombstone(model=Tombstone.ISSUE, object_id=object_id, project_id=project_id) for object_id in issue_ids]
+        + [Tombstone(model=Tombstone.COMMENT, object_id=object_id, project_id=project_id)
+           for object_id in comment_ids]
+    )
@@ -1,3 +1,1569 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import tempfile
+import re
+from datetime import timedelta
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from API_IssueTrackingSystem import (bulk, counters, events, locking, membership, metrics, renderers, replicas,
+                                     response_cache, rows, search, sync)
+from API_IssueTrackingSystem.backends.sqlite3 import base as tuned_sqlite
+from API_IssueTrackingSystem.caching import shared_cache
+from API_IssueTrackingSystem.fields import MembershipRelatedField
+from API_IssueTrackingSystem.mixins import ValuesListMixin
+from API_IssueTrackingSystem.models import (Project, Contributor, Issue, Comment, Tombstone, ProjectCounter,
+                                            IssueCommentCounter)
+from API_IssueTrackingSystem.serializers import ASSIGNEE_INVALID, CommentSerializer, IssueSerializer
+from API_IssueTrackingSystem.sse import EventStreamApp
+from API_IssueTrackingSystem.sync import (SYNC_SAFETY_MARGIN, SYNC_TOMBSTONE_RETENTION, decode_watermark,
+                                          encode_watermark, get_changes)
+from users import authentication as users_authentication
+
+# Une ligne "SCAN <table>" du plan SQLite signifie un parcours complet de la table (ou de l'un de ses index)
+FULL_SCAN_RE = re.compile(r'\bSCAN (?:TABLE )?"?(\w+)"?')
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN est spécifique à SQLite")
+class QueryPlanTests(TestCase):
+    """Vérifie qu'aucun point d'accès de liste ou de détail ne retombe sur un parcours complet de table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = User.objects.bulk_create([User(username=f'user{i}') for i in range(5)])
+        cls.user = cls.users[0]
+        projects = Project.objects.bulk_create([
+            Project(title=f'Projet {i}', description='description', type='back_end', author=cls.users[i % 5])
+            for i in range(10)
+        ])
+        Contributor.objects.bulk_create([
+            Contributor(user=user, project=project, role='auteur' if project.author_id == user.id else 'collaborateur')
+            for project in projects for user in cls.users[:3]
+        ])
+        issues = Issue.objects.bulk_create([
+            Issue(title=f'Tâche {i}', description='description', tag='bug', priority='faible', status='en attente',
+                  project=projects[i % 10], assigned_to=cls.user)
+            for i in range(50)
+        ])
+        Comment.objects.bulk_create([
+            Comment(description='commentaire', author=cls.user, issue=issue, project_id=issue.project_id)
+            for issue in issues for _ in range(3)
+        ])
+        cls.project, cls.issue = projects[0], issues[0]
+        cls.comment = Comment.objects.filter(issue=cls.issue).first()
+        cls.contributor = Contributor.objects.filter(project=cls.project).first()
+
+    def setUp(self):
+        cache.clear()
+        users_authentication._local.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _capture_plans(self, url):
+        """Appelle le point d'accès et retourne le plan d'exécution de chaque SELECT émis."""
+        statements = []
+
+        def capture(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for sql, params in statements:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assertNoFullScan(self, url):
+        app_tables = {model._meta.db_table for model in (Project, Contributor, Issue, Comment)}
+        for sql, plan in self._capture_plans(url):
+            for line in plan:
+                match = FULL_SCAN_RE.search(line)
+                if match and match.group(1) in app_tables:
+                    self.fail(f"Parcours complet de {match.group(1)} sur {url} :\n{sql}\n" + '\n'.join(plan))
+
+    def test_project_endpoints(self):
+        self.assertNoFullScan('/projects/')
+        self.assertNoFullScan(f'/projects/{self.project.id}/')
+
+    def test_issue_endpoints(self):
+        self.assertNoFullScan('/issues/')
+        self.assertNoFullScan(f'/issues/{self.issue.id}/')
+
+    def test_contributor_endpoints(self):
+        self.assertNoFullScan('/contributor/')
+        self.assertNoFullScan(f'/contributor/{self.contributor.id}/')
+
+    def test_comment_endpoints(self):
+        self.assertNoFullScan('/comments/')
+        self.assertNoFullScan(f'/comments/{self.comment.id}/')
+
+    def test_filtered_lists(self):
+        self.assertNoFullScan('/issues/?status=en%20attente&priority=faible')
+        self.assertNoFullScan('/issues/?tag=bug&ordering=-priority')
+        self.assertNoFullScan(f'/issues/?assigned_to={self.user.id}&fields=id,title,status')
+        self.assertNoFullScan(f'/comments/?issue={self.issue.id}')
+        self.assertNoFullScan(f'/comments/?author={self.user.id}&fields=id,issue')
+
+    def test_nested_endpoints(self):
+        self.assertNoFullScan(f'/projects/{self.project.id}/issues/')
+        self.assertNoFullScan(f'/projects/{self.project.id}/issues/{self.issue.id}/')
+        self.assertNoFullScan(f'/projects/{self.project.id}/issues/{self.issue.id}/comments/')
+        self.assertNoFullScan(f'/projects/{self.project.id}/issues/{self.issue.id}/comments/{self.comment.id}/')
+
+
+class ProjectAPITestCase(APITestCase):
+    """Jeu de données commun des tests d'API : deux projets de l'auteur, dont le premier a un second membre."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.owner = User.objects.create(username='auteur')
+        cls.member = User.objects.create(username='membre')
+        cls.outsider = User.objects.create(username='externe')
+        cls.project = Project.objects.create(title='Projet', description='description', type='back_end',
+                                             author=cls.owner)
+        cls.other_project = Project.objects.create(title='Autre projet', description='description', type='back_end',
+                                                   author=cls.owner)
+        Contributor.objects.create(user=cls.owner, project=cls.project, role='auteur')
+        Contributor.objects.create(user=cls.owner, project=cls.other_project, role='auteur')
+        cls.membership = Contributor.objects.create(user=cls.member, project=cls.project, role='collaborateur')
+        cls.issue = Issue.objects.create(title='Tâche', description='description', tag='bug', priority='faible',
+                                         status='en attente', project=cls.project, assigned_to=cls.owner)
+        cls.comment = Comment.objects.create(description='commentaire', author=cls.owner, issue=cls.issue)
+
+    def setUp(self):
+        cache.clear()
+        users_authentication._local.clear()
+        self.client.force_authenticate(self.owner)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+
+class MembershipTests(ProjectAPITestCase):
+
+    def test_removed_contributor_loses_access(self):
+        member = self.client_for(self.member)
+        self.assertEqual(member.get(f'/issues/{self.issue.id}/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.membership.delete()
+        self.assertEqual(member.get(f'/issues/{self.issue.id}/').status_code, 404)
+        self.assertEqual(member.get('/issues/').json()['count'], 0)
+
+    @mock.patch.object(membership, 'MEMBERSHIP_CACHE', 'metrics')
+    def test_shared_cache_invalidated_on_commit(self):
+        shared = caches['metrics']
+        key = membership._cache_key(self.member.pk)
+        member = self.client_for(self.member)
+        self.assertEqual(member.get(f'/issues/{self.issue.id}/').status_code, 200)
+        self.assertEqual(shared.get(key), {self.project.id: 'collaborateur'})
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.membership.delete()
+        # Une requête concurrente a remis en cache les appartenances d'avant la suppression
+        shared.set(key, {self.project.id: 'collaborateur'})
+        for callback in callbacks:
+            callback()
+        self.assertEqual(member.get(f'/issues/{self.issue.id}/').status_code, 404)
+        shared.delete(key)
+
+    def test_process_local_cache_is_not_used(self):
+        # Le cache par défaut est propre au processus : une invalidation n'atteindrait pas les autres workers
+        self.assertIsNone(shared_cache('default'))
+        membership.load_memberships(self.member.pk)
+        self.assertIsNone(cache.get(membership._cache_key(self.member.pk)))
+
+
+class CommentProjectTests(ProjectAPITestCase):
+    """Le projet dénormalisé d'un commentaire suit toujours celui de sa tâche."""
+
+    def test_comment_project_set_on_create(self):
+        response = self.client.post('/comments/', {'description': 'nouveau', 'issue': self.issue.id})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['project'], self.project.id)
+        self.assertEqual(Comment.objects.get(pk=response.json()['id']).project_id, self.project.id)
+
+    def test_comment_project_follows_issue_move(self):
+        response = self.client.patch(f'/issues/{self.issue.id}/', {'project': self.other_project.id})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.project_id, self.other_project.id)
+        comments = self.client.get(f'/comments/?project={self.other_project.id}').json()['results']
+        self.assertEqual([comment['id'] for comment in comments], [self.comment.id])
+
+
+class CursorPaginationTests(ProjectAPITestCase):
+
+    def test_pages_are_stable_with_equal_created_time(self):
+        Comment.objects.bulk_create([Comment(description=f'commentaire {i}', author=self.owner, issue=self.issue,
+                                             project=self.project) for i in range(6)])
+        # Même created_time pour tous : l'identifiant départage les lignes
+        Comment.objects.update(created_time=timezone.now())
+        seen, url = [], '/comments/?pagination=cursor&limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertNotIn('count', response.json())
+            seen += [comment['id'] for comment in response.json()['results']]
+            url = response.json()['next']
+        expected = list(Comment.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_tampered_cursor(self):
+        for cursor in ('zzz', 'bm90LWEtZGF0ZXwx', 'MjAyNC0wMS0wMVQwMDowMDowMHxhYmM'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(f'/comments/?cursor={cursor}').status_code, 404)
+
+    def test_offset_pagination_is_the_default(self):
+        data = self.client.get('/comments/?limit=1').json()
+        self.assertEqual(set(data), {'count', 'next', 'previous', 'results'})
+        self.assertEqual(data['count'], 1)
+
+
+class ConditionalGetTests(ProjectAPITestCase):
+
+    def assertNotModified(self, url, etag, if_none_match=None):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=if_none_match or etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_list_and_detail_not_modified(self):
+        for url in ('/projects/', f'/projects/{self.project.id}/', '/issues/', f'/issues/{self.issue.id}/',
+                    '/comments/', f'/comments/{self.comment.id}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotModified(url, response['ETag'])
+                # Comparaison faible et listes d'ETags, comme le prévoit If-None-Match
+                self.assertNotModified(url, response['ETag'], f'"autre", W/{response["ETag"]}')
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"autre"').status_code, 200)
+
+    def test_etag_changes_after_write(self):
+        list_etag = self.client.get('/issues/')['ETag']
+        detail_etag = self.client.get(f'/issues/{self.issue.id}/')['ETag']
+        response = self.client.patch(f'/issues/{self.issue.id}/', {'title': 'Modifiée'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        for url, etag in (('/issues/', list_etag), (f'/issues/{self.issue.id}/', detail_etag)):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+        # Une suppression change le nombre de lignes, même si max(updated_time) ne bouge pas
+        list_etag = self.client.get('/comments/')['ETag']
+        Comment.objects.create(description='Autre', author=self.owner, issue=self.issue, project=self.project)
+        Comment.objects.filter(pk=self.comment.pk).delete()
+        self.assertNotEqual(self.client.get('/comments/')['ETag'], list_etag)
+
+    def test_etag_depends_on_user(self):
+        etag = self.client.get(f'/issues/{self.issue.id}/')['ETag']
+        response = self.client_for(self.member).get(f'/issues/{self.issue.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cursor_mode_etag(self):
+        url = '/issues/?pagination=cursor'
+        with self.assertNumQueries(2):
+            # Appartenances puis page : ni COUNT(*), ni agrégat pour l'ETag
+            response = self.client.get(url)
+        etag = response['ETag']
+        self.assertNotModified(url, etag)
+        Issue.objects.filter(pk=self.issue.pk).update(updated_time=timezone.now() + timedelta(seconds=1))
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+        self.assertNotEqual(self.client.get('/issues/')['ETag'], etag)
+
+    def test_full_tail_page_gaining_a_row(self):
+        Comment.objects.create(description='second', author=self.owner, issue=self.issue)
+        url = f'/comments/?issue={self.issue.id}&pagination=cursor&limit=2'
+        response = self.client.get(url)
+        self.assertIsNone(response.json()['next'])
+        Comment.objects.create(description='troisième', author=self.owner, issue=self.issue)
+        # Les lignes de la page sont inchangées, mais elle a désormais une suite
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.json()['next'])
+
+
+class BulkTests(ProjectAPITestCase):
+
+    def issue_data(self, title, **fields):
+        data = {'title': title, 'description': 'description', 'tag': 'bug', 'priority': 'faible',
+                'status': 'en attente', 'project': self.project.id}
+        data.update(fields)
+        return data
+
+    def send(self, method, url, items, ndjson=False):
+        if ndjson:
+            body = '\n'.join(json.dumps(item) for item in items) + '\n'
+            return self.client.generic(method, url, body, content_type='application/x-ndjson')
+        return self.client.generic(method, url, json.dumps(items), content_type='application/json')
+
+    def test_create_issues(self):
+        for ndjson in (False, True):
+            with self.subTest(ndjson=ndjson):
+                items = [self.issue_data(f'Lot {ndjson} {i}', assigned_to=self.owner.id) for i in range(3)]
+                response = self.send('POST', '/issues/bulk/', items, ndjson)
+                self.assertEqual(response.status_code, 201, response.content)
+                self.assertEqual([issue['title'] for issue in response.json()], [item['title'] for item in items])
+        self.assertEqual(Issue.objects.filter(title__startswith='Lot').count(), 6)
+
+    def test_create_comments(self):
+        for ndjson in (False, True):
+            with self.subTest(ndjson=ndjson):
+                items = [{'description': f'Lot {i}', 'issue': self.issue.id} for i in range(3)]
+                response = self.send('POST', '/comments/bulk/', items, ndjson)
+                self.assertEqual(response.status_code, 201, response.content)
+        comments = Comment.objects.filter(description__startswith='Lot')
+        self.assertEqual(comments.count(), 6)
+        self.assertEqual(set(comments.values_list('project_id', 'author_id')), {(self.project.id, self.owner.id)})
+
+    def test_errors_are_reported_by_index_and_nothing_is_written(self):
+        foreign = Project.objects.create(title='Étranger', description='description', type='back_end',
+                                         author=self.outsider)
+        items = [
+            self.issue_data('Valide'),
+            self.issue_data('Tâche'),
+            self.issue_data('Sans projet', project=foreign.id),
+            self.issue_data('Assignée', assigned_to=self.outsider.id),
+            self.issue_data('Double'),
+            self.issue_data('Double'),
+            {'title': 'Incomplète'},
+        ]
+        for ndjson in (False, True):
+            with self.subTest(ndjson=ndjson):
+                response = self.send('POST', '/issues/bulk/', items, ndjson)
+                self.assertEqual(response.status_code, 400)
+                errors = response.json()['errors']
+                self.assertEqual([error['index'] for error in errors], [1, 2, 3, 5, 6])
+                self.assertEqual(errors[0]['errors'], {'non_field_errors': [bulk.TITLE_TAKEN]})
+                self.assertEqual(errors[1]['errors'], {'project': [bulk.PROJECT_FORBIDDEN]})
+                self.assertEqual(errors[2]['errors'], {'assigned_to': [bulk.ASSIGNEE_INVALID]})
+                self.assertIn('project', errors[4]['errors'])
+        self.assertEqual(list(Issue.objects.values_list('title', flat=True)), ['Tâche'])
+
+    def test_conflicting_write_rolls_back_the_whole_batch(self):
+        # Un titre pris entre la vérification et l'écriture : la contrainte unique annule tout le lot
+        items = [self.issue_data('Valide'), self.issue_data('Tâche')]
+        with mock.patch.object(bulk, '_existing_titles', return_value={}):
+            response = self.send('POST', '/issues/bulk/', items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [bulk.CONFLICT])
+        self.assertFalse(Issue.objects.filter(title='Valide').exists())
+
+    def test_max_items(self):
+        with mock.patch.object(bulk, 'BULK_MAX_ITEMS', 2):
+            response = self.send('POST', '/comments/bulk/', [{'description': 'x', 'issue': self.issue.id}] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Comment.objects.filter(description='x').exists())
+        self.assertEqual(self.send('POST', '/comments/bulk/', {'description': 'x'}).status_code, 400)
+
+    def test_update_issues(self):
+        other = Issue.objects.create(title='Autre', description='description', tag='bug', priority='faible',
+                                     status='en attente', project=self.project, assigned_to=self.member)
+        for ndjson in (False, True):
+            with self.subTest(ndjson=ndjson):
+                response = self.send('PATCH', '/issues/bulk/', [
+                    {'id': self.issue.id, 'status': 'en cours'},
+                    {'id': other.id, 'status': 'en cours'},
+                    {'id': 0, 'status': 'en cours'},
+                    {'status': 'en cours'},
+                ], ndjson)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['errors'], [
+                    {'index': 1, 'errors': {'id': [bulk.FORBIDDEN]}},
+                    {'index': 2, 'errors': {'id': [bulk.NOT_FOUND]}},
+                    {'index': 3, 'errors': {'id': ["Ce champ est obligatoire."]}},
+                ])
+                self.issue.refresh_from_db()
+                self.assertEqual(self.issue.status, 'en attente')
+                response = self.send('PATCH', '/issues/bulk/', [{'id': self.issue.id, 'title': f'Lot {ndjson}'}],
+                                     ndjson)
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertEqual(response.json()[0]['title'], f'Lot {ndjson}')
+
+    def test_update_comments(self):
+        other = Comment.objects.create(description='autre', author=self.member, issue=self.issue)
+        response = self.send('PATCH', '/comments/bulk/', [
+            {'id': self.comment.id, 'description': 'modifié'},
+            {'id': other.id, 'description': 'modifié'},
+        ], ndjson=True)
+        self.assertEqual(response.json()['errors'], [{'index': 1, 'errors': {'id': [bulk.FORBIDDEN]}}])
+        response = self.send('PATCH', '/comments/bulk/', [{'id': self.comment.id, 'description': 'modifié'}])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.description, 'modifié')
+
+    def test_destroy(self):
+        other = Comment.objects.create(description='autre', author=self.member, issue=self.issue)
+        mine = Comment.objects.create(description='mien', author=self.owner, issue=self.issue)
+        for ndjson in (False, True):
+            with self.subTest(ndjson=ndjson):
+                response = self.send('DELETE', '/comments/bulk/', [self.comment.id, {'id': other.id}, 'x'], ndjson)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual([error['index'] for error in response.json()['errors']], [2, 1])
+        self.assertEqual(Comment.objects.count(), 3)
+        response = self.send('DELETE', '/comments/bulk/', [self.comment.id, {'id': mine.id}], ndjson=True)
+        self.assertEqual(response.json(), {'deleted': 2})
+        self.assertEqual(list(Comment.objects.values_list('id', flat=True)), [other.id])
+        response = self.send('DELETE', '/issues/bulk/', [self.issue.id])
+        self.assertEqual(response.json(), {'deleted': 1})
+        self.assertFalse(Issue.objects.exists())
+
+    def test_foreign_project_is_invisible(self):
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.send('DELETE', '/issues/bulk/', [self.issue.id]).json()['errors'],
+                         [{'index': 0, 'errors': {'id': [bulk.NOT_FOUND]}}])
+        self.assertEqual(self.send('POST', '/comments/bulk/', [{'description': 'x', 'issue': self.issue.id}])
+                         .json()['errors'], [{'index': 0, 'errors': {'issue': [bulk.ISSUE_FORBIDDEN]}}])
+        self.assertTrue(Issue.objects.filter(pk=self.issue.pk).exists())
+
+
+class RequestMetricsTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(metrics, 'REQUEST_METRICS_CACHE', 'default')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        metrics.clear()
+        self.addCleanup(metrics.registry.reset)
+
+    @staticmethod
+    def server_timing(response):
+        timings = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            timings[name] = dict(param.split('=', 1) for param in params)
+        return timings
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/issues/{self.issue.id}/')
+        timings = self.server_timing(response)
+        self.assertEqual(set(timings), {'db', 'serializer', 'permissions', 'total'})
+        self.assertEqual(timings['db']['desc'], f'"{len(queries)} queries"')
+        self.assertGreater(float(timings['serializer']['dur']), 0)
+        self.assertGreater(float(timings['permissions']['dur']), 0)
+        self.assertGreaterEqual(float(timings['total']['dur']), float(timings['db']['dur']))
+
+    def test_route_histogram(self):
+        counts = []
+        for _ in range(3):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(f'/issues/{self.issue.id}/')
+            counts.append(len(queries))
+        self.client.get('/issues/')
+        routes = metrics.registry.snapshot()
+        self.assertEqual(set(routes), {'GET issue-detail', 'GET issue-list'})
+        stats = routes['GET issue-detail']
+        self.assertEqual((stats['count'], sum(stats['buckets'])), (3, 3))
+        self.assertEqual((stats['queries'], stats['max_queries']), (sum(counts), max(counts)))
+        self.assertGreaterEqual(stats['total_ms'], stats['db_ms'])
+
+    def test_processes_are_merged(self):
+        self.client.get(f'/issues/{self.issue.id}/')
+        metrics.registry.flush()
+        # Un second processus publie ses propres histogrammes pour la même route
+        other = metrics.empty_route()
+        other.update(count=2, total_ms=30.0, queries=10, max_queries=7)
+        other['buckets'][-1] = 2
+        cache.set(f'{metrics.CACHE_KEY_PREFIX}:0', {'GET issue-detail': other})
+        cache.set(f'{metrics.CACHE_KEY_PREFIX}:pids', cache.get(f'{metrics.CACHE_KEY_PREFIX}:pids') + [0])
+        mine = metrics.registry.snapshot()['GET issue-detail']
+
+        routes = metrics.collect()
+        merged = routes['GET issue-detail']
+        self.assertEqual(merged['count'], 3)
+        self.assertEqual(merged['buckets'], [a + b for a, b in zip(mine['buckets'], other['buckets'])])
+        self.assertEqual(merged['queries'], mine['queries'] + 10)
+        self.assertEqual(merged['max_queries'], 7)
+        self.assertEqual(metrics.percentile(merged['buckets'], 0.99), float('inf'))
+
+        out = io.StringIO()
+        call_command('dump_request_metrics', '--json', stdout=out)
+        self.assertEqual(json.loads(out.getvalue()), json.loads(json.dumps(routes)))
+        out = io.StringIO()
+        call_command('dump_request_metrics', '--reset', stdout=out)
+        self.assertIn('GET issue-detail', out.getvalue())
+        self.assertEqual(metrics.collect(), {})
+        self.assertEqual(metrics.registry.snapshot(), {})
+
+    def test_first_request_is_published(self):
+        self.client.get(f'/issues/{self.issue.id}/')
+        out = io.StringIO()
+        call_command('dump_request_metrics', '--json', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['GET issue-detail']['count'], 1)
+
+    def test_pending_metrics_are_published_at_exit(self):
+        self.client.get(f'/issues/{self.issue.id}/')
+        # Dans l'intervalle de publication : seule la première requête est visible
+        self.client.get(f'/issues/{self.issue.id}/')
+        self.assertEqual(metrics.collect()['GET issue-detail']['count'], 1)
+        metrics.registry.flush_pending()
+        self.assertEqual(metrics.collect()['GET issue-detail']['count'], 2)
+
+    def test_percentile(self):
+        buckets = [0] * (len(metrics.LATENCY_BUCKETS_MS) + 1)
+        self.assertEqual(metrics.percentile(buckets, 0.5), 0)
+        buckets[0], buckets[3] = 90, 10
+        self.assertEqual(metrics.percentile(buckets, 0.5), 1)
+        self.assertEqual(metrics.percentile(buckets, 0.95), 10)
+
+
+class SearchTests(ProjectAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.foreign = Project.objects.create(title='Étranger', description='description', type='back_end',
+                                             author=cls.outsider)
+        Contributor.objects.create(user=cls.outsider, project=cls.foreign, role='auteur')
+        cls.found = Issue.objects.create(title='Panne du serveur', description='Le serveur ne répond plus',
+                                         tag='bug', priority='élevé', status='en attente', project=cls.project)
+        cls.found_comment = Comment.objects.create(description='Redémarrer le serveur', author=cls.owner,
+                                                   issue=cls.issue)
+        cls.hidden = Issue.objects.create(title='Serveur étranger', description='description', tag='bug',
+                                          priority='élevé', status='en attente', project=cls.foreign)
+
+    def results(self, client=None, **params):
+        response = (client or self.client).get('/search/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return {(result['type'], result['id']) for result in response.json()['results']}
+
+    def check_search(self):
+        self.assertEqual(self.results(q='serveur'), {('issue', self.found.id), ('comment', self.found_comment.id)})
+        self.assertEqual(self.results(q='serveur', type='comment'), {('comment', self.found_comment.id)})
+        self.assertEqual(self.results(q='panne serveur'), {('issue', self.found.id)})
+        self.assertEqual(self.results(q='introuvable'), set())
+        # Chacun ne trouve que les lignes de ses projets
+        self.assertEqual(self.results(self.client_for(self.outsider), q='serveur'), {('issue', self.hidden.id)})
+        self.assertEqual(self.results(self.client_for(self.member), q='serveur'),
+                         {('issue', self.found.id), ('comment', self.found_comment.id)})
+
+    def test_search(self):
+        self.check_search()
+
+    def test_icontains_backend(self):
+        with mock.patch.object(search, 'SEARCH_BACKEND', 'API_IssueTrackingSystem.search.BaseSearchBackend'):
+            self.assertIs(type(search.get_backend()), search.BaseSearchBackend)
+            self.check_search()
+            response = self.client.get('/search/', {'q': 'panne'})
+        result = response.json()['results'][0]
+        self.assertEqual(result, {'type': 'issue', 'id': self.found.id, 'project': self.project.id,
+                                  'issue': self.found.id, 'title': 'Panne du serveur',
+                                  'snippet': 'Le serveur ne répond plus', 'rank': 0.0})
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/search/').status_code, 400)
+        self.assertEqual(self.client.get('/search/', {'q': 'serveur', 'type': 'projet'}).status_code, 400)
+
+    @skipUnless(connection.vendor == 'sqlite', "Index FTS5 propre à SQLite")
+    def test_fts_triggers(self):
+        def indexed():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT rowid, project_id, issue_id, title, body FROM search_index ORDER BY rowid')
+                return cursor.fetchall()
+
+        def row(obj):
+            if isinstance(obj, Issue):
+                return (obj.id * 2, obj.project_id, obj.id, obj.title, obj.description)
+            return (obj.id * 2 + 1, obj.project_id, obj.issue_id, '', obj.description)
+
+        def expected():
+            return sorted([row(obj) for obj in Issue.objects.all()] + [row(obj) for obj in Comment.objects.all()])
+
+        self.assertEqual(indexed(), expected())
+        # Écritures qui contournent les signaux : les déclencheurs suivent quand même
+        Issue.objects.filter(pk=self.found.pk).update(title='Panne réseau', project=self.other_project)
+        Comment.objects.filter(pk=self.found_comment.pk).update(description='Relancer le service')
+        self.assertEqual(indexed(), expected())
+        self.assertEqual(self.results(q='serveur'), {('issue', self.found.id)})
+        Comment.objects.bulk_create([Comment(description='Nouveau serveur', author=self.owner, issue=self.found,
+                                             project=self.other_project)])
+        Comment.objects.filter(pk=self.found_comment.pk).delete()
+        Issue.objects.filter(pk=self.hidden.pk).delete()
+        self.assertEqual(indexed(), expected())
+
+
+class CounterTests(ProjectAPITestCase):
+    """Les compteurs tenus à jour à chaque écriture doivent toujours égaler ceux que recalcule rebuild()."""
+
+    def assertCountersConsistent(self):
+        project_ids = list(Project.objects.values_list('id', flat=True))
+        stats = {project_id: counters.project_stats(project_id) for project_id in project_ids}
+        counters.rebuild(project_ids)
+        self.assertEqual(stats, {project_id: counters.project_stats(project_id) for project_id in project_ids})
+        return stats
+
+    def create_issue(self, title, project=None, **fields):
+        data = {'title': title, 'description': 'description', 'tag': 'bug', 'priority': 'faible',
+                'status': 'en attente', 'project': (project or self.project).id, 'assigned_to': self.owner.id}
+        data.update(fields)
+        response = self.client.post('/issues/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def add_comment(self, issue_id):
+        response = self.client.post('/comments/', {'description': 'commentaire', 'issue': issue_id}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def test_single_writes(self):
+        counters.rebuild()
+        issue_id = self.create_issue('Nouvelle', priority='élevé')
+        comment_id = self.add_comment(issue_id)
+        self.add_comment(issue_id)
+        stats = self.assertCountersConsistent()[self.project.id]
+        self.assertEqual((stats['issues']['total'], stats['issues']['priority']['élevé']), (2, 1))
+        self.assertEqual(stats['comments']['top_issues'][0], {'issue': issue_id, 'count': 2})
+
+        response = self.client.patch(f'/issues/{issue_id}/', {'status': 'en cours'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.assertCountersConsistent()[self.project.id]['issues']['status']['en cours'], 1)
+        self.client.delete(f'/comments/{comment_id}/')
+        self.assertCountersConsistent()
+        # La suppression d'une tâche emporte ses commentaires
+        self.client.delete(f'/issues/{issue_id}/')
+        stats = self.assertCountersConsistent()[self.project.id]
+        self.assertEqual((stats['issues']['total'], stats['comments']['total']), (1, 1))
+
+    def test_move(self):
+        counters.rebuild()
+        self.add_comment(self.issue.id)
+        response = self.client.post(f'/issues/{self.issue.id}/move/', {'project': self.other_project.id},
+                                    format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        stats = self.assertCountersConsistent()
+        self.assertEqual(stats[self.project.id]['comments']['total'], 0)
+        self.assertEqual(stats[self.other_project.id]['comments']['total'], 2)
+
+    def test_bulk_writes(self):
+        counters.rebuild()
+
+        def send(method, url, items):
+            response = getattr(self.client, method)(url, items, format='json')
+            self.assertLess(response.status_code, 300, response.content)
+            return response.json()
+
+        items = [{'title': f'Lot {i}', 'description': 'description', 'tag': 'bug', 'priority': 'faible',
+                  'status': 'en attente', 'project': self.project.id, 'assigned_to': self.owner.id}
+                 for i in range(3)]
+        ids = [issue['id'] for issue in send('post', '/issues/bulk/', items)]
+        comments = send('post', '/comments/bulk/', [{'description': 'x', 'issue': issue_id} for issue_id in ids])
+        self.assertCountersConsistent()
+        send('patch', '/issues/bulk/', [{'id': ids[0], 'status': 'terminé', 'project': self.other_project.id},
+                                        {'id': ids[1], 'priority': 'élevé'}])
+        send('patch', '/comments/bulk/', [{'id': comments[2]['id'], 'issue': ids[0]}])
+        self.assertCountersConsistent()
+        send('delete', '/comments/bulk/', [comments[0]['id']])
+        send('delete', '/issues/bulk/', ids[1:])
+        stats = self.assertCountersConsistent()
+        # Reste dans l'autre projet la tâche déplacée, avec le commentaire qui l'y a suivie
+        self.assertEqual(stats[self.other_project.id]['issues']['total'], 1)
+        self.assertEqual(stats[self.other_project.id]['comments']['total'], 1)
+        self.assertEqual(stats[self.project.id]['issues']['total'], 1)
+
+    def test_project_deletion(self):
+        counters.rebuild()
+        self.add_comment(self.issue.id)
+        response = self.client.delete(f'/projects/{self.project.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertCountersConsistent()
+        self.assertFalse(ProjectCounter.objects.filter(project_id=self.project.id).exists())
+        self.assertFalse(IssueCommentCounter.objects.exists())
+
+
+class MembershipRelatedFieldTests(ProjectAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.foreign = Project.objects.create(title='Étranger', description='description', type='back_end',
+                                             author=cls.outsider)
+        Contributor.objects.create(user=cls.outsider, project=cls.foreign, role='auteur')
+        cls.foreign_issue = Issue.objects.create(title='Tâche étrangère', description='description', tag='bug',
+                                                 priority='faible', status='en attente', project=cls.foreign)
+
+    def issue_data(self, **fields):
+        data = {'title': 'Nouvelle', 'description': 'description', 'tag': 'bug', 'priority': 'faible',
+                'status': 'en attente', 'project': self.project.id, 'assigned_to': self.owner.id}
+        data.update(fields)
+        return data
+
+    def test_is_abstract(self):
+        with self.assertRaises(TypeError):
+            MembershipRelatedField(read_only=True)
+
+    def test_foreign_project(self):
+        for project_id in (self.foreign.id, 0):
+            with self.subTest(project=project_id):
+                response = self.client.post('/issues/', self.issue_data(project=project_id), format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(list(response.json()), ['project'])
+        response = self.client.post('/issues/', self.issue_data(project='x'), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Issue.objects.filter(title='Nouvelle').exists())
+
+    def test_foreign_issue(self):
+        for issue_id in (self.foreign_issue.id, 0):
+            with self.subTest(issue=issue_id):
+                response = self.client.post('/comments/', {'description': 'x', 'issue': issue_id}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(list(response.json()), ['issue'])
+        response = self.client.patch(f'/comments/{self.comment.id}/', {'issue': self.foreign_issue.id},
+                                     format='json')
+        self.assertEqual(response.status_code, 400)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.issue_id, self.issue.id)
+
+    def test_non_contributor_assignee(self):
+        for user_id in (self.outsider.id, 0):
+            with self.subTest(assigned_to=user_id):
+                response = self.client.post('/issues/', self.issue_data(assigned_to=user_id), format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'assigned_to': [ASSIGNEE_INVALID]})
+        response = self.client.post('/issues/', self.issue_data(assigned_to=self.member.id), format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        response = self.client.patch(f'/issues/{self.issue.id}/', {'assigned_to': self.outsider.id}, format='json')
+        self.assertEqual(response.json(), {'assigned_to': [ASSIGNEE_INVALID]})
+
+    def test_new_contributor(self):
+        response = self.client.post('/contributor/', {'user': self.member.id, 'project': self.other_project.id,
+                                                      'role': 'collaborateur'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()), ['user'])
+        response = self.client.post('/contributor/', {'user': self.outsider.id, 'project': self.foreign.id,
+                                                      'role': 'collaborateur'}, format='json')
+        self.assertEqual(list(response.json()), ['project'])
+
+
+class ReplicaTests(ProjectAPITestCase):
+    """Le réplica est simulé par l'alias de la base principale : seul le choix de la base est vérifié."""
+
+    def setUp(self):
+        super().setUp()
+        for name, value in (('REPLICA_DATABASES', [connection.alias]), ('REPLICA_PIN_CACHE', None)):
+            patcher = mock.patch.object(replicas, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def reads_on_replica(self, client=None, url='/issues/'):
+        with mock.patch.object(replicas, 'use_replica', wraps=replicas.use_replica) as use_replica:
+            response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200)
+        return use_replica.called
+
+    def write(self, client=None, title='Modifiée'):
+        return (client or self.client).patch(f'/issues/{self.issue.id}/', {'title': title}, format='json')
+
+    def test_write_pins_with_signed_cookie(self):
+        self.assertTrue(self.reads_on_replica())
+        response = self.write()
+        cookie = response.cookies[replicas.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], replicas.REPLICA_STICKY_SECONDS)
+        self.assertTrue(cookie['httponly'])
+        self.assertFalse(self.reads_on_replica())
+        self.assertFalse(self.reads_on_replica(url=f'/issues/{self.issue.id}/'))
+        # Le cookie n'épingle que son utilisateur, et seulement pendant REPLICA_STICKY_SECONDS
+        member = self.client_for(self.member)
+        member.cookies[replicas.REPLICA_PIN_COOKIE] = cookie.value
+        self.assertTrue(self.reads_on_replica(member))
+        with mock.patch.object(replicas, 'REPLICA_STICKY_SECONDS', -1):
+            self.assertTrue(self.reads_on_replica())
+        self.client.cookies[replicas.REPLICA_PIN_COOKIE] = str(self.owner.id)
+        self.assertTrue(self.reads_on_replica())
+
+    def test_write_pins_in_shared_cache(self):
+        with mock.patch.object(replicas, 'REPLICA_PIN_CACHE', 'metrics'):
+            self.addCleanup(caches['metrics'].delete, f'replica-pin:{self.owner.id}')
+            response = self.write()
+            self.assertNotIn(replicas.REPLICA_PIN_COOKIE, response.cookies)
+            self.assertFalse(self.reads_on_replica())
+            # Un autre client du même utilisateur, sans cookie, lit aussi sur la principale
+            self.assertFalse(self.reads_on_replica(self.client_for(self.owner)))
+            self.assertTrue(self.reads_on_replica(self.client_for(self.member)))
+
+    def test_failed_write_does_not_pin(self):
+        Issue.objects.create(title='Prise', description='description', tag='bug', priority='faible',
+                             status='en attente', project=self.project)
+        response = self.write(title='Prise')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(replicas.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_without_replicas(self):
+        with mock.patch.object(replicas, 'REPLICA_DATABASES', []):
+            self.assertFalse(self.reads_on_replica())
+            self.assertNotIn(replicas.REPLICA_PIN_COOKIE, self.write().cookies)
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    """Hors de la transaction de TestCase : le routeur tient compte des blocs atomiques en cours."""
+
+    def test_router(self):
+        router = replicas.ReplicaRouter()
+        self.assertEqual(router.db_for_read(Issue), 'default')
+        token = replicas.use_replica('replica1')
+        try:
+            self.assertEqual(router.db_for_read(Issue), 'replica1')
+            self.assertEqual(router.db_for_write(Issue), 'default')
+            # Une transaction lit ses propres écritures sur la principale
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Issue), 'default')
+            self.assertEqual(router.db_for_read(Issue), 'replica1')
+        finally:
+            replicas.reset(token)
+        self.assertEqual(router.db_for_read(Issue), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'API_IssueTrackingSystem'))
+        self.assertTrue(router.allow_migrate('default', 'API_IssueTrackingSystem'))
+
+
+@mock.patch.object(response_cache, 'RESPONSE_CACHE_ENABLED', True)
+class ResponseCacheTests(ProjectAPITestCase):
+    """Les réponses en cache sont partagées par les utilisateurs membres des mêmes projets."""
+
+    def setUp(self):
+        super().setUp()
+        caches[response_cache.RESPONSE_CACHE].clear()
+        Contributor.objects.create(user=self.member, project=self.other_project, role='collaborateur')
+
+    def test_shared_between_members_of_the_same_projects(self):
+        url = f'/issues/?project={self.project.id}'
+        expected = self.client.get(url)
+        # Servie sans autre requête que la lecture des appartenances (sans cache partagé, voir membership.py)
+        member = self.client_for(self.member)
+        with self.assertNumQueries(1):
+            response = member.get(url)
+        self.assertEqual(response.content, expected.content)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=expected['ETag'])
+        self.assertEqual(response.status_code, 304)
+        # Un utilisateur d'autres projets ne lit pas l'entrée
+        self.assertEqual(self.client_for(self.outsider).get(url).json()['count'], 0)
+
+    def test_write_invalidates_project_responses(self):
+        url = f'/issues/?project={self.project.id}'
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/issues/{self.issue.id}/', {'status': 'terminé'})
+        self.assertEqual(response.status_code, 200, response.content)
+        statuses = {issue['id']: issue['status'] for issue in self.client.get(url).json()['results']}
+        self.assertEqual(statuses[self.issue.id], 'terminé')
+
+    def test_browsable_api_is_not_shared(self):
+        # La page HTML contient le nom de l'utilisateur et son jeton CSRF : jamais servie depuis le cache
+        url = f'/issues/?project={self.project.id}'
+        navbar_user = re.compile(r'data-toggle="dropdown">\s*(\S+)')
+        owner_page = self.client.get(url, HTTP_ACCEPT='text/html')
+        self.assertEqual(owner_page.status_code, 200)
+        self.assertEqual(navbar_user.search(owner_page.content.decode()).group(1), self.owner.username)
+        member_page = self.client_for(self.member).get(url, HTTP_ACCEPT='text/html')
+        self.assertEqual(member_page.status_code, 200)
+        self.assertEqual(navbar_user.search(member_page.content.decode()).group(1), self.member.username)
+
+
+class ValuesListRenderingTests(ProjectAPITestCase):
+    """Les listes rendues depuis .values_list() sont identiques, à l'octet près, à celles du chemin habituel."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        issues = Issue.objects.bulk_create([
+            Issue(title=f'Tâche {i}', description='description', tag='bug', priority='moyenne', status='en cours',
+                  project=(cls.project, cls.other_project)[i % 2], assigned_to=cls.owner if i % 3 else None)
+            for i in range(12)
+        ])
+        Comment.objects.bulk_create([
+            Comment(description=f'commentaire {i}', author=cls.owner, issue=issue, project_id=issue.project_id)
+            for issue in issues for i in range(2)
+        ])
+
+    def test_values_list_rendering(self):
+        # Les deux sérialiseurs ont un plan : les listes ne retombent pas sur le chemin habituel
+        self.assertIsNotNone(rows.compile_plan(IssueSerializer()))
+        self.assertIsNotNone(rows.compile_plan(CommentSerializer()))
+        tricky = 'Ligne\n\t"guillemets" \\ \x00\x1f    é à ü 😀 </script>'
+        Issue.objects.filter(pk=self.issue.pk).update(description=tricky, assigned_to=None)
+        Comment.objects.filter(pk=self.comment.pk).update(description=tricky)
+        urls = [f'/issues/?project={self.project.id}', f'/issues/?project={self.project.id}&pagination=cursor',
+                '/issues/?fields=id,status,assigned_to,created_time&limit=7',
+                f'/comments/?issue={self.issue.id}', '/comments/?pagination=cursor&limit=20',
+                f'/projects/{self.project.id}/issues/{self.issue.id}/comments/?fields=description,project']
+        for url in urls:
+            with self.subTest(url=url):
+                fast = self.client.get(url)
+                self.assertEqual(fast.status_code, 200, fast.content)
+                # Chemin habituel : instances, sérialiseur et json de la bibliothèque standard
+                with mock.patch.object(ValuesListMixin, 'get_row_plan', return_value=None), \
+                        mock.patch.object(renderers, 'orjson', None):
+                    expected = self.client.get(url)
+                self.assertEqual(fast.content, expected.content)
+                self.assertEqual(fast['ETag'], expected['ETag'])
+
+
+class MoveIssueTests(ProjectAPITestCase):
+    """Le déplacement d'une tâche emporte ses commentaires, compteurs, traces de synchronisation et événements."""
+
+    def published(self, method, url, data):
+        """Envoie la requête et retourne les événements publiés : (nom, projets, projet des données)."""
+        with mock.patch.object(events, '_publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted((message.name, sorted(message.project_ids), message.build()['project'])
+                      for call in publish.call_args_list for message in call.args[0])
+
+    def test_moved_comments_are_announced(self):
+        # Par PATCH, par l'action move et par lot : les membres du projet cible apprennent l'arrivée des commentaires
+        projects = sorted((self.project.id, self.other_project.id))
+        for method, url, data, target in (
+                ('patch', f'/issues/{self.issue.id}/', {'project': self.other_project.id}, self.other_project),
+                ('post', f'/issues/{self.issue.id}/move/', {'project': self.project.id}, self.project),
+                ('patch', '/issues/bulk/', [{'id': self.issue.id, 'project': self.other_project.id}],
+                 self.other_project)):
+            with self.subTest(url=url, method=method):
+                self.assertEqual(self.published(method, url, data), [
+                    ('comment.updated', projects, target.id), ('issue.updated', projects, target.id)])
+                comment = Comment.objects.get(pk=self.comment.pk)
+                self.assertEqual(comment.project_id, target.id)
+                self.assertEqual(comment.updated_time, Issue.objects.get(pk=self.issue.pk).updated_time)
+
+    def test_move_issue(self):
+        Comment.objects.create(description='second commentaire', author=self.member, issue=self.issue)
+        counters.rebuild()
+        comment_ids = sorted(Comment.objects.filter(issue=self.issue).values_list('id', flat=True))
+        since = timezone.now() - timedelta(seconds=1)
+        url = f'/issues/{self.issue.id}/move/'
+
+        # Projet sans accès, puis assigné qui n'est pas contributeur du projet cible : rien n'est écrit
+        foreign = Project.objects.create(title='Étranger', description='description', type='back_end',
+                                         author=self.outsider)
+        response = self.client.post(url, {'project': foreign.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('project', response.json())
+        response = self.client.post(url, {'project': self.other_project.id, 'assigned_to': self.member.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('assigned_to', response.json())
+        self.assertEqual(Issue.objects.get(pk=self.issue.pk).project_id, self.project.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'project': self.other_project.id})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['project'], self.other_project.id)
+        self.assertEqual(set(Comment.objects.filter(id__in=comment_ids).values_list('project_id', flat=True)),
+                         {self.other_project.id})
+        # Les compteurs tenus à jour sont ceux qu'un recalcul complet donnerait
+        project_ids = (self.project.id, self.other_project.id)
+        stats = [counters.project_stats(project_id) for project_id in project_ids]
+        counters.rebuild()
+        self.assertEqual(stats, [counters.project_stats(project_id) for project_id in project_ids])
+        # Un membre du seul ancien projet oublie la tâche et ses commentaires ; un membre des deux la garde
+        _, _, _, deleted = get_changes(self.member.pk, [self.project.id], since)
+        self.assertEqual((deleted['issue'], sorted(deleted['comment'])), ([self.issue.id], comment_ids))
+        _, issues, _, deleted = get_changes(self.owner.pk, list(project_ids), since)
+        self.assertEqual(deleted, {'issue': [], 'comment': []})
+        self.assertIn(self.issue.id, [issue.id for issue in issues])
+
+
+class IssueValidationTests(ProjectAPITestCase):
+    """Unicité du titre dans le projet et assignation à un contributeur, vérifiées en une seule requête."""
+
+    def test_issue_create_validation(self):
+        data = {'title': 'Nouvelle tâche', 'description': 'description', 'tag': 'bug', 'priority': 'faible',
+                'status': 'en attente', 'project': self.project.id, 'assigned_to': self.owner.id}
+        selects = []
+
+        def capture(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                selects.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = self.client.post('/issues/', data)
+        self.assertEqual(response.status_code, 201, response.content)
+        # Appartenances de l'utilisateur, puis titre et assignation vérifiés ensemble
+        self.assertEqual(len(selects), 2, '\n'.join(selects))
+
+        response = self.client.post('/issues/', data)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.json())
+        response = self.client.patch(f'/issues/{self.issue.id}/', {'title': 'Nouvelle tâche'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(f'/issues/{self.issue.id}/', {'status': 'en cours'})
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.put(f'/issues/{self.issue.id}/', {**data, 'title': self.issue.title})
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.post('/issues/', {**data, 'title': 'Autre tâche', 'assigned_to': self.outsider.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('assigned_to', response.json())
+
+
+class FilterTests(ProjectAPITestCase):
+    """Filtres ?champ=valeur, tri ?ordering= et champs ?fields= des listes de tâches et de commentaires."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.started = Issue.objects.create(title='Commencée', description='description', tag='amélioration',
+                                           priority='élevé', status='en cours', project=cls.project,
+                                           assigned_to=cls.member)
+        cls.done = Issue.objects.create(title='Achevée', description='description', tag='tâche', priority='moyenne',
+                                        status='terminé', project=cls.other_project, assigned_to=cls.owner)
+        cls.reply = Comment.objects.create(description='réponse', author=cls.member, issue=cls.started)
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [obj['id'] for obj in response.json()['results']]
+
+    def test_filters_restrict_rows(self):
+        self.assertEqual(self.ids('/issues/?status=en%20cours'), [self.started.id])
+        self.assertCountEqual(self.ids('/issues/?status=en%20cours,terminé'), [self.started.id, self.done.id])
+        self.assertEqual(self.ids(f'/issues/?assigned_to={self.member.id}'), [self.started.id])
+        self.assertEqual(self.ids(f'/issues/?project={self.other_project.id}'), [self.done.id])
+        self.assertEqual(self.ids('/issues/?tag=bug&priority=faible'), [self.issue.id])
+        self.assertEqual(self.ids(f'/comments/?author={self.member.id}'), [self.reply.id])
+        self.assertEqual(self.ids(f'/comments/?issue={self.issue.id}'), [self.comment.id])
+
+    def test_ordering(self):
+        by_title = [self.done.id, self.started.id, self.issue.id]
+        self.assertEqual(self.ids('/issues/?ordering=title'), by_title)
+        self.assertEqual(self.ids('/issues/?ordering=-title'), by_title[::-1])
+        # La pagination par curseur impose son ordre : un tri explicite est refusé
+        response = self.client.get('/issues/?ordering=title&pagination=cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/issues/?fields=id,title')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual({tuple(issue) for issue in response.json()['results']}, {('id', 'title')})
+        issue_table = Issue._meta.db_table
+        selects = [query['sql'] for query in queries if f'FROM "{issue_table}"' in query['sql']]
+        self.assertTrue(selects)
+        # .only() : la description n'est jamais lue
+        for sql in selects:
+            self.assertNotIn('"description"', sql)
+
+    def test_invalid_values(self):
+        for url, param in (('/issues/?status=inconnu', 'status'), ('/issues/?assigned_to=abc', 'assigned_to'),
+                           ('/comments/?issue=abc', 'issue'), ('/issues/?ordering=inconnu', 'ordering'),
+                           ('/issues/?ordering=title,-description', 'ordering'),
+                           ('/issues/?fields=id,inconnu', 'fields')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(param, response.json())
+
+
+class NestedRouteTests(ProjectAPITestCase):
+    """Routes /projects/{id}/issues/ et /projects/{id}/issues/{id}/comments/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.foreign_issue = Issue.objects.create(title='Tâche voisine', description='description', tag='bug',
+                                                 priority='faible', status='en attente', project=cls.other_project,
+                                                 assigned_to=cls.owner)
+
+    def comments_url(self, issue, project=None):
+        return f'/projects/{(project or self.project).id}/issues/{issue.id}/comments/'
+
+    def test_project_of_another_user(self):
+        member = self.client_for(self.member)
+        for url in (f'/projects/{self.other_project.id}/issues/',
+                    f'/projects/{self.other_project.id}/issues/{self.foreign_issue.id}/',
+                    self.comments_url(self.foreign_issue, self.other_project),
+                    '/projects/0/issues/'):
+            with self.subTest(url=url):
+                self.assertEqual(member.get(url).status_code, 404)
+        self.assertEqual(member.get(f'/projects/{self.project.id}/issues/').json()['count'], 1)
+
+    def test_create_takes_project_and_issue_from_the_url(self):
+        data = {'title': 'Imbriquée', 'description': 'description', 'tag': 'bug', 'priority': 'faible',
+                'status': 'en attente', 'assigned_to': self.owner.id, 'project': self.other_project.id}
+        response = self.client.post(f'/projects/{self.project.id}/issues/', data)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Issue.objects.get(pk=response.json()['id']).project_id, self.project.id)
+
+        response = self.client.post(self.comments_url(self.issue), {'description': 'imbriqué',
+                                                                    'issue': self.foreign_issue.id})
+        self.assertEqual(response.status_code, 201, response.content)
+        comment = Comment.objects.get(pk=response.json()['id'])
+        self.assertEqual((comment.issue_id, comment.project_id), (self.issue.id, self.project.id))
+
+    def test_issue_of_another_project(self):
+        # La tâche existe et l'utilisateur y a accès, mais pas dans le projet de l'URL
+        url = self.comments_url(self.foreign_issue)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.post(url, {'description': 'égaré'}).status_code, 404)
+        self.assertFalse(Comment.objects.filter(description='égaré').exists())
+        response = self.client.patch(f'{self.comments_url(self.issue)}{self.comment.id}/',
+                                     {'issue': self.foreign_issue.id})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Comment.objects.get(pk=self.comment.pk).issue_id, self.issue.id)
+        self.assertEqual(self.client.get(self.comments_url(self.issue)).json()['count'], 1)
+
+
+class AsyncViewTests(ProjectAPITestCase):
+    """Les vues asynchrones (async_views.py) renvoient les mêmes données et les mêmes refus que les viewsets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.foreign_issue = Issue.objects.create(title='Tâche voisine', description='description', tag='bug',
+                                                 priority='faible', status='en attente', project=cls.other_project,
+                                                 assigned_to=cls.owner)
+        cls.foreign_comment = Comment.objects.create(description='voisin', author=cls.owner, issue=cls.foreign_issue)
+
+    def async_get(self, url, user):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'} if user is not None else {}
+        return async_to_sync(self.async_client.get)(url, headers=headers)
+
+    def test_same_data_as_viewsets(self):
+        for url in (f'/projects/{self.project.id}/', f'/issues/{self.issue.id}/', f'/comments/{self.comment.id}/',
+                    '/issues/0/'):
+            expected = self.client.get(url)
+            response = self.async_get(f'/async{url}', self.owner)
+            self.assertEqual(response.status_code, expected.status_code, url)
+            self.assertEqual(response.json(), expected.json(), url)
+        for url in (f'/issues/?project={self.project.id}', f'/comments/?issue={self.issue.id}'):
+            expected = self.client.get(url).json()
+            response = self.async_get(f'/async{url}', self.owner)
+            self.assertEqual(response.json()['count'], expected['count'], url)
+            self.assertEqual(sorted(obj['id'] for obj in response.json()['results']),
+                             sorted(obj['id'] for obj in expected['results']), url)
+
+    def test_denied(self):
+        self.assertEqual(self.async_get('/async/issues/', None).status_code, 401)
+        # Le membre n'appartient pas au second projet : ni ses tâches, ni ses commentaires, ni le projet lui-même
+        for url in (f'/projects/{self.other_project.id}/', f'/issues/{self.foreign_issue.id}/',
+                    f'/comments/{self.foreign_comment.id}/'):
+            with self.subTest(url=url):
+                expected = self.client_for(self.member).get(url)
+                response = self.async_get(f'/async{url}', self.member)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), expected.json())
+        response = self.async_get(f'/async/issues/?project={self.other_project.id}', self.member)
+        self.assertEqual(response.json()['count'], 0)
+
+
+class SyncTests(ProjectAPITestCase):
+
+    def test_full_sync(self):
+        data = self.client.get('/sync/').json()
+        self.assertEqual(data['project_ids'], sorted([self.project.id, self.other_project.id]))
+        self.assertEqual([issue['id'] for issue in data['issues']], [self.issue.id])
+        self.assertEqual([comment['id'] for comment in data['comments']], [self.comment.id])
+        self.assertEqual(data['deleted'], {'issues': [], 'comments': []})
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['watermark'])
+
+    def test_full_sync_is_paged(self):
+        issues = [self.issue, *Issue.objects.bulk_create(
+            Issue(title=f'Tâche {index}', description='description', tag='bug', priority='faible', status='en cours',
+                  project=self.other_project, assigned_to=self.owner)
+            for index in range(2)
+        )]
+        comments = [self.comment, Comment.objects.create(description='Autre', issue=issues[1], author=self.owner)]
+        pages, url = [], '/sync/'
+        with mock.patch.object(sync, 'SYNC_PAGE_SIZE', 2):
+            while url:
+                data = self.client.get(url).json()
+                pages.append(data)
+                url = data['next']
+        self.assertEqual([len(page['issues']) + len(page['comments']) for page in pages], [2, 2, 1])
+        self.assertEqual([issue['id'] for page in pages for issue in page['issues']], [i.id for i in issues])
+        self.assertEqual([comment['id'] for page in pages for comment in page['comments']],
+                         [c.id for c in comments])
+        # Projets sur la première page, jeton de la synchronisation suivante sur la dernière
+        self.assertEqual(len(pages[0]['projects']), 2)
+        self.assertEqual([page['projects'] for page in pages[1:]], [[], []])
+        self.assertEqual([page['watermark'] is None for page in pages], [True, True, False])
+        # Le jeton est pris avant la première page : une écriture pendant le parcours sera renvoyée ensuite
+        self.assertLessEqual(decode_watermark(pages[-1]['watermark']), timezone.now() - SYNC_SAFETY_MARGIN)
+
+    def test_invalid_snapshot_cursor(self):
+        with mock.patch.object(sync, 'SYNC_PAGE_SIZE', 1):
+            cursor = parse_qs(urlparse(self.client.get('/sync/').json()['next']).query)['cursor'][0]
+        self.assertEqual(self.client.get('/sync/', {'cursor': cursor[:-1]}).status_code, 400)
+        expired = sync.encode_snapshot_cursor(timezone.now() - SYNC_TOMBSTONE_RETENTION - timedelta(minutes=1),
+                                              'issues', 0)
+        self.assertEqual(self.client.get('/sync/', {'cursor': expired}).status_code, 410)
+
+    def test_watermark_round_trip_and_tampering(self):
+        moment = timezone.now().replace(microsecond=0)
+        self.assertEqual(decode_watermark(encode_watermark(moment)), moment)
+        token = encode_watermark(moment)
+        tampered = str(int(token.split(':')[0]) + 1) + token[token.index(':'):]
+        for since in (tampered, 'pas-un-jeton', token[:-1]):
+            with self.subTest(since=since):
+                self.assertEqual(self.client.get('/sync/', {'since': since}).status_code, 400)
+
+    def test_expired_watermark(self):
+        since = encode_watermark(timezone.now() - SYNC_TOMBSTONE_RETENTION - timedelta(minutes=1))
+        response = self.client.get('/sync/', {'since': since})
+        self.assertEqual(response.status_code, 410)
+
+    def test_changes_and_tombstones_since_watermark(self):
+        watermark = encode_watermark(timezone.now() - timedelta(seconds=1))
+        response = self.client.delete(f'/comments/{self.comment.id}/')
+        self.assertEqual(response.status_code, 204)
+        data = self.client.get('/sync/', {'since': watermark}).json()
+        self.assertEqual(data['deleted'], {'issues': [], 'comments': [self.comment.id]})
+        self.assertEqual(data['comments'], [])
+        # Un autre utilisateur ne voit pas les traces des projets dont il n'est pas membre
+        data = self.client_for(self.outsider).get('/sync/', {'since': watermark}).json()
+        self.assertEqual(data['deleted'], {'issues': [], 'comments': []})
+
+    def test_safety_margin(self):
+        # Le jeton est antérieur à la lecture de SYNC_SAFETY_MARGIN : une écriture validée juste avant la
+        # lecture (et donc peut-être invisible pour elle) est renvoyée par la synchronisation suivante
+        watermark = self.client.get('/sync/').json()['watermark']
+        self.assertLessEqual(decode_watermark(watermark), timezone.now() - SYNC_SAFETY_MARGIN)
+        Issue.objects.filter(pk=self.issue.pk).update(updated_time=timezone.now() - SYNC_SAFETY_MARGIN / 2)
+        data = self.client.get('/sync/', {'since': watermark}).json()
+        self.assertEqual([issue['id'] for issue in data['issues']], [self.issue.id])
+
+    def test_prune_tombstones(self):
+        old = Tombstone.objects.create(model=Tombstone.ISSUE, object_id=1, project_id=self.project.id)
+        Tombstone.objects.filter(pk=old.pk).update(
+            deleted_time=timezone.now() - SYNC_TOMBSTONE_RETENTION - timedelta(days=1))
+        recent = Tombstone.objects.create(model=Tombstone.ISSUE, object_id=2, project_id=self.project.id)
+        call_command('prune_tombstones', stdout=io.StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list('pk', flat=True)), [recent.pk])
+
+
+class LockRetryTests(TransactionTestCase):
+    """Hors de la transaction de TestCase : retry_on_lock ne rejoue jamais dans une transaction englobante."""
+
+    def setUp(self):
+        patcher = mock.patch.object(locking.time, 'sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def failing(*errors):
+        return mock.Mock(side_effect=[*errors, 'écrit'])
+
+    def test_retries_while_locked(self):
+        func = self.failing(OperationalError('database is locked'), OperationalError('database table is locked'))
+        self.assertEqual(locking.retry_on_lock(func, 1, key='valeur'), 'écrit')
+        self.assertEqual(func.call_args_list, [mock.call(1, key='valeur')] * 3)
+        # Attente exponentielle, à ±50 % près
+        (first,), (second,) = [call.args for call in self.sleep.call_args_list]
+        self.assertTrue(0.5 <= first / locking.LOCK_RETRY_BASE_DELAY <= 1.5)
+        self.assertTrue(1 <= second / locking.LOCK_RETRY_BASE_DELAY <= 3)
+
+    def test_gives_up(self):
+        func = mock.Mock(side_effect=OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            locking.retry_on_lock(func)
+        self.assertEqual(func.call_count, locking.LOCK_RETRY_ATTEMPTS)
+
+    def test_other_errors_are_not_retried(self):
+        func = self.failing(OperationalError('no such table: x'))
+        with self.assertRaises(OperationalError):
+            locking.retry_on_lock(func)
+        self.assertEqual(func.call_count, 1)
+
+    def test_no_retry_inside_transaction(self):
+        func = self.failing(OperationalError('database is locked'))
+        with self.assertRaises(OperationalError), transaction.atomic():
+            locking.retry_on_lock(func)
+        self.assertEqual(func.call_count, 1)
+
+    def test_viewset_write_is_retried(self):
+        User = get_user_model()
+        user = User.objects.create(username='auteur')
+        project = Project.objects.create(title='Projet', description='description', type='back_end', author=user)
+        Contributor.objects.create(user=user, project=project, role='auteur')
+        issue = Issue.objects.create(title='Tâche', description='description', tag='bug', priority='faible',
+                                     status='en attente', project=project, assigned_to=user)
+        client = APIClient()
+        client.force_authenticate(user)
+        save, calls = Issue.save, []
+
+        def locked_once(instance, *args, **kwargs):
+            calls.append(instance.pk)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return save(instance, *args, **kwargs)
+
+        with mock.patch.object(Issue, 'save', locked_once):
+            response = client.patch(f'/issues/{issue.id}/', {'title': 'Modifiée'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(calls, [issue.id, issue.id])
+        issue.refresh_from_db()
+        self.assertEqual(issue.title, 'Modifiée')
+
+
+@skipUnless(connection.vendor == 'sqlite', "Moteur propre à SQLite")
+class TunedSQLiteBackendTests(TransactionTestCase):
+    """Réglages du moteur API_IssueTrackingSystem.backends.sqlite3, sur une base temporaire."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.name = os.path.join(directory.name, 'db.sqlite3')
+
+    def connect(self):
+        wrapper = tuned_sqlite.DatabaseWrapper(
+            {**connection.settings_dict, 'ENGINE': 'API_IssueTrackingSystem.backends.sqlite3', 'NAME': self.name},
+            alias='tuned')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    @staticmethod
+    def pragma(wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), tuned_sqlite.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), tuned_sqlite.SQLITE_PRAGMAS['cache_size'])
+
+    def test_transactions_take_the_write_lock_at_begin(self):
+        with mock.patch.dict(tuned_sqlite.SQLITE_PRAGMAS, busy_timeout=0):
+            first, second = self.connect(), self.connect()
+            with first.cursor() as cursor:
+                cursor.execute('CREATE TABLE t (x INTEGER)')
+            # Transaction ouverte sans rien écrire : BEGIN IMMEDIATE a déjà pris le verrou d'écriture
+            first.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            self.assertTrue(first.connection.in_transaction)
+            with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                second.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            first.rollback()
+
+    def test_test_database_is_tuned(self):
+        # `connection` n'est qu'un intermédiaire : isinstance() doit viser la connexion elle-même
+        if not isinstance(connections[connection.alias], tuned_sqlite.DatabaseWrapper):
+            self.skipTest("SOFTDESK_SQLITE_TUNING n'est pas activé")
+        self.assertEqual(self.pragma(connection, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), tuned_sqlite.SQLITE_PRAGMAS['busy_timeout'])
+
+
+class SQLiteWriteStressTests(TransactionTestCase):
+    """Des écrivains concurrents ne doivent jamais voir la base verrouillée."""
+
+    def setUp(self):
+        # La base de test n'est connue qu'une fois créée : une base en mémoire ne voit pas d'autres connexions
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            self.skipTest("Nécessite une base SQLite sur disque (SOFTDESK_SQLITE_TUNING=1)")
+
+    def test_concurrent_writers(self):
+        # La commande échoue si une écriture répond 500
+        call_command('stress_writes', writers=8, requests=15, host='testserver', stdout=io.StringIO())
+
+
+class CommandTests(TransactionTestCase):
+    """Commandes de mesure et de génération, sur de tout petits volumes (pas de transaction englobante : les
+    commandes servent les requêtes depuis d'autres fils)."""
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.owner = User.objects.create(username='auteur')
+        self.project = Project.objects.create(title='Projet', description='description', type='back_end',
+                                              author=self.owner)
+        Contributor.objects.create(user=self.owner, project=self.project, role='auteur')
+        issue = Issue.objects.create(title='Tâche', description='description', tag='bug', priority='faible',
+                                     status='en attente', project=self.project, assigned_to=self.owner)
+        Comment.objects.create(description='commentaire', author=self.owner, issue=issue)
+
+    def test_benchmark_concurrency(self):
+        out = io.StringIO()
+        call_command('benchmark_concurrency', clients='1,4', requests=12, threads=2, users=1, host='testserver',
+                     json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual([level['clients'] for level in report['levels']], [1, 4])
+        for level in report['levels']:
+            for mode in ('wsgi', 'asgi'):
+                self.assertEqual(level[mode]['requests'], 12, level)
+                self.assertEqual(level[mode]['errors'], 0, level)
+
+    def test_generate_dataset(self):
+        existing = {model: model.objects.count() for model in (get_user_model(), Project, Issue, Comment)}
+        call_command('generate_dataset', users=6, projects=4, issues=20, comments=50, max_contributors=2,
+                     batch_size=7, prefix='gen', stdout=io.StringIO())
+        created = {model: model.objects.count() - count for model, count in existing.items()}
+        self.assertEqual(created, {get_user_model(): 6, Project: 4, Issue: 20, Comment: 50})
+        self.assertFalse(Comment.objects.exclude(project_id=F('issue__project_id')).exists())
+        # Les compteurs sont ceux qu'un recalcul complet donnerait
+        project_ids = list(Project.objects.exclude(pk=self.project.pk).values_list('id', flat=True))
+        stats = [counters.project_stats(project_id) for project_id in project_ids]
+        self.assertEqual(sum(project['issues']['total'] for project in stats), 20)
+        self.assertEqual(sum(project['comments']['total'] for project in stats), 50)
+        counters.rebuild(project_ids)
+        self.assertEqual(stats, [counters.project_stats(project_id) for project_id in project_ids])
+
+    def test_benchmark_api(self):
+        out = io.StringIO()
+        call_command('benchmark_api', requests=30, warmup=2, users=1, host='testserver', json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report), {'requests', 'wall_time_s', 'throughput_rps', 'routes'})
+        self.assertEqual(report['requests'], 30)
+        self.assertEqual(sum(route['requests'] for route in report['routes'].values()), 30)
+        for name, route in report['routes'].items():
+            self.assertEqual(set(route), {'requests', 'errors', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms',
+                                          'queries_per_request', 'throughput_rps'}, name)
+            self.assertEqual(route['errors'], 0, name)
+            self.assertLessEqual(route['p50_ms'], route['p99_ms'])
+
+    def test_benchmark_serializers(self):
+        out = io.StringIO()
+        call_command('benchmark_serializers', rows=5, rounds=2, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['orjson'], renderers.orjson is not None)
+        self.assertTrue(report['targets'])
+        for name, target in report['targets'].items():
+            self.assertEqual(set(target), {'before', 'after', 'speedup'}, name)
+            for path in ('before', 'after'):
+                self.assertEqual(set(target[path]), {'fetch_ms', 'represent_ms', 'render_ms', 'rows_per_s'})
+
+
+class EventStreamTests(TransactionTestCase):
+    """Le flux d'événements pousse les écritures validées aux membres du projet, et à eux seuls."""
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.member = User.objects.create(username='membre')
+        self.outsider = User.objects.create(username='externe')
+        self.project = Project.objects.create(title='Projet', description='description', type='back_end',
+                                              author=self.member)
+        Contributor.objects.create(user=self.member, project=self.project, role='auteur')
+
+    async def _open(self, user):
+        """Ouvre un flux sur l'application ASGI et retourne (file des messages envoyés, fin de la connexion)."""
+        messages, disconnected = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/events/', 'query_string': b'',
+                 'headers': [(b'authorization', f'Bearer {AccessToken.for_user(user)}'.encode())]}
+        task = asyncio.create_task(EventStreamApp(None)(scope, receive, messages.put))
+        start = await asyncio.wait_for(messages.get(), 5)
+        self.assertEqual(start['status'], 200)
+        await messages.get()  # retry:
+        return messages, disconnected, task
+
+    async def _next_event(self, messages):
+        while True:
+            body = (await asyncio.wait_for(messages.get(), 5))['body']
+            if body.startswith(b'id:'):
+                return body.decode()
+
+    def test_event_stream(self):
+        client = APIClient()
+        client.force_authenticate(self.member)
+        data = {'title': 'Nouvelle tâche', 'description': 'description', 'tag': 'bug', 'priority': 'faible',
+                'status': 'en attente', 'project': self.project.id, 'assigned_to': self.member.id}
+
+        async def scenario():
+            member, member_closed, member_task = await self._open(self.member)
+            outsider, outsider_closed, outsider_task = await self._open(self.outsider)
+            response = await sync_to_async(client.post)('/issues/', data)
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertIn('event: issue.created', await self._next_event(member))
+            self.assertTrue(outsider.empty())
+
+            # Un nouveau membre reçoit son ajout, puis les événements du projet
+            await sync_to_async(Contributor.objects.create)(user=self.outsider, project=self.project,
+                                                            role='collaborateur')
+            self.assertIn('event: contributor.created', await self._next_event(outsider))
+            comment = {'issue': response.json()['id'], 'description': 'commentaire'}
+            response = await sync_to_async(client.post)('/comments/', comment)
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertIn('event: comment.created', await self._next_event(outsider))
+
+            for closed, task in ((member_closed, member_task), (outsider_closed, outsider_task)):
+                closed.set()
+                await asyncio.wait_for(task, 5)
+
+        async_to_sync(scenario)()
+
+
+class EventBrokerTests(SimpleTestCase):
+    """Le courtier ne sérialise que les événements attendus par un abonné, et ne garde rien sans abonné."""
+
+    def message(self, project_id, name='issue.updated'):
+        return events.Message(name, mock.Mock(return_value={'project': project_id}), [project_id])
+
+    def test_broker_is_abstract(self):
+        with self.assertRaises(TypeError):
+            events.BaseBroker()
+
+    def test_no_subscriber(self):
+        broker = events.LocalBroker()
+        message = self.message(1)
+        broker.publish([message, self.message(2)])
+        message.build.assert_not_called()
+        self.assertEqual(len(broker._history), 0)
+
+        async def scenario():
+            # Les événements publiés sans abonné ne peuvent pas être rejoués : le client se resynchronise
+            subscription = broker.subscribe(1, [1], last_event_id=0)
+            self.assertTrue(subscription.lagging)
+            broker.unsubscribe(subscription)
+
+        async_to_sync(scenario)()
+
+    def test_only_delivered_events_are_serialized(self):
+        broker = events.LocalBroker()
+        delivered, other = self.message(1), self.message(2)
+
+        async def scenario():
+            subscription = broker.subscribe(1, [1])
+            broker.publish([delivered, other])
+            delivered.build.assert_called_once_with()
+            other.build.assert_not_called()
+            self.assertEqual(await subscription.wait(1),
+                             [b'id: 1\nevent: issue.updated\ndata: {"project":1}\n\n'])
+            # Une reprise sérialise l'événement resté sans destinataire, une seule fois
+            late = broker.subscribe(2, [2], last_event_id=0)
+            self.assertEqual(await late.wait(1), [b'id: 2\nevent: issue.updated\ndata: {"project":2}\n\n'])
+            other.build.assert_called_once_with()
+            broker.unsubscribe(subscription)
+            broker.unsubscribe(late)
+
+        async_to_sync(scenario)()
+
+    def test_reset_stops_the_stream(self):
+        broker = events.LocalBroker()
+
+        async def scenario():
+            subscription = broker.subscribe(1, [1])
+            other = broker.subscribe(2, [2])
+            broker.publish([events.Message(events.RESET, dict, [1])])
+            await asyncio.sleep(0)
+            self.assertTrue(subscription.lagging)
+            self.assertFalse(other.lagging)
+            broker.unsubscribe(subscription)
+            broker.unsubscribe(other)
+
+        async_to_sync(scenario)()
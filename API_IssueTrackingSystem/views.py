@@ -1,16 +1,39 @@
-from rest_framework import exceptions, viewsets
+from django.utils import timezone
+from rest_framework import exceptions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
-from .models import Project, Contributor, Issue, Comment
-from .serializers import ProjectSerializer, ContributorSerializer, IssueSerializer, CommentSerializer
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .models import Project, Contributor, Issue, Comment, Tombstone
+from .serializers import (ProjectSerializer, ProjectSerializerFull, ContributorSerializer, IssueSerializer,
+                          IssueMoveSerializer, CommentSerializer)
 from .permissions import IsContributor, IsAuthorOrReadOnly
+from .mixins import (ConditionalGetMixin, LockRetryMixin, ProjectScopedMixin, ReplicaReadMixin,
+                     ResponseCacheMixin, SparseFieldsetMixin, ValuesListMixin)
+from .filters import FieldFilter, StableOrderingFilter
+from .metrics import TimedPermissionsMixin
+from .membership import get_memberships, get_project_ids
+from .pagination import CreatedTimeCursorPagination
+from .parsers import NDJSONParser
+from .renderers import FastJSONRenderer
+from . import bulk as bulk_operations
+from .counters import project_stats
+from .locking import retry_on_lock
+from .search import COMMENT, ISSUE, get_backend as get_search_backend
+from .sync import (SYNC_SAFETY_MARGIN, decode_snapshot_cursor, decode_watermark, encode_snapshot_cursor,
+                   encode_watermark, get_changes, get_snapshot_page)
 
 # VueSet pour les opérations CRUD sur le modèle Project
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(TimedPermissionsMixin, ReplicaReadMixin, LockRetryMixin, ResponseCacheMixin,
+                     ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Project.objects.filter(contributor__user=self.request.user).distinct()
+        return Project.objects.filter(id__in=get_project_ids(self.request))
 
     def perform_create(self, serializer):
         if Project.objects.filter(title=serializer.validated_data['title']).exists():
@@ -18,13 +41,21 @@ class ProjectViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
         Contributor.objects.create(user=self.request.user, project=serializer.instance, role='auteur')
 
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        """Nombre de tâches par statut, priorité et étiquette, et commentaires du projet (compteurs matérialisés)."""
+        project = self.get_object()
+        return Response(project_stats(project.pk))
+
 # VueSet pour les contributeurs
-class ContributorViewSet(viewsets.ModelViewSet):
+class ContributorViewSet(TimedPermissionsMixin, ReplicaReadMixin, LockRetryMixin, ResponseCacheMixin,
+                         ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ContributorSerializer
     permission_classes = [IsAuthenticated, IsContributor, IsAuthorOrReadOnly]
 
     def get_queryset(self):
-        return Contributor.objects.select_related('project', 'user').filter(project__contributor__user=self.request.user)
+        return Contributor.objects.select_related('project', 'user').filter(
+            project_id__in=get_project_ids(self.request))
 
     def perform_create(self, serializer):
         user = serializer.validated_data['user']
@@ -36,65 +67,197 @@ class ContributorViewSet(viewsets.ModelViewSet):
             raise exceptions.ValidationError("Cet utilisateur est déjà un contributeur du projet.")
         serializer.save()
 
+def bulk_response(request, create, update, destroy, serializer_class, context):
+    """Applique l'opération en masse correspondant à la méthode HTTP et construit la réponse."""
+    items = bulk_operations.check_items(request.data)
+    if request.method == 'DELETE':
+        deleted, errors = retry_on_lock(destroy, request, items)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'deleted': deleted})
+    if request.method == 'POST':
+        objects, errors = retry_on_lock(create, request, items)
+        success_status = status.HTTP_201_CREATED
+    else:
+        objects, errors = retry_on_lock(update, request, items)
+        success_status = status.HTTP_200_OK
+    if errors:
+        errors = sorted(errors, key=lambda error: error['index'])
+        return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(serializer_class(objects, many=True, context=context).data, status=success_status)
+
 # VueSet pour les tâches (issues)
-class IssueViewSet(viewsets.ModelViewSet):
+class IssueViewSet(TimedPermissionsMixin, ReplicaReadMixin, LockRetryMixin, ResponseCacheMixin, ValuesListMixin,
+                   SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = IssueSerializer
     permission_classes = [IsAuthenticated, IsContributor, IsAuthorOrReadOnly]
+    pagination_class = CreatedTimeCursorPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    filter_backends = [FieldFilter, StableOrderingFilter]
+    filter_fields = ('project', 'status', 'priority', 'tag', 'assigned_to')
+    ordering_fields = ('created_time', 'updated_time', 'priority', 'status', 'title')
 
     def get_queryset(self):
-        return Issue.objects.select_related('project', 'assigned_to').filter(project__contributor__user=self.request.user)
+        return Issue.objects.select_related('project', 'assigned_to').filter(
+            project_id__in=get_project_ids(self.request))
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'].user = self.request.user
         return context
 
-    def validate_project(self, value):
-        user = self.request.user
-        if not Contributor.objects.filter(user=user, project=value).exists():
-            raise exceptions.ValidationError("Le projet spécifié n'existe pas ou vous n'y avez pas accès.")
-        return value
-
-    def get_fields(self):
-        fields = super().get_fields()
-        fields['project'].queryset = Project.objects.filter(contributor__user=self.request.user)
-        fields['assigned_to'].queryset = Contributor.objects.filter(project__contributor__user=self.request.user)
-        return fields
-
-    def validate_assigned_to(self, value):
-        project = self.request.data.get('project')
-        if project:
-            is_contributor_or_owner = Contributor.objects.filter(user_id=value, project_id=project).exists()
-            if not is_contributor_or_owner:
-                raise exceptions.ValidationError("L'utilisateur assigné doit être un contributeur ou un propriétaire du projet.")
-        else:
-            raise exceptions.ValidationError("Le projet doit être spécifié.")
-        return value
+    @action(detail=False, methods=['post', 'patch', 'delete'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """Créer (POST), modifier (PATCH) ou supprimer (DELETE) un lot de tâches, en JSON ou en NDJSON."""
+        return bulk_response(request, bulk_operations.create_issues, bulk_operations.update_issues,
+                             bulk_operations.destroy_issues, IssueSerializer, self.get_serializer_context())
 
-    def perform_create(self, serializer):
-        project_id = self.request.data.get('project')
-        if not Project.objects.filter(id=project_id, contributor__user=self.request.user).exists():
-            raise exceptions.ValidationError("Le projet spécifié n'existe pas ou vous n'y avez pas accès.")
-        issue_title = serializer.validated_data['title']
-        if Issue.objects.filter(title=issue_title, project_id=project_id).exists():
-            raise exceptions.ValidationError("Un problème avec ce titre existe déjà pour le projet spécifié.")
-        assigned_to = self.request.data.get('assigned_to')
-        if assigned_to:
-            is_contributor_or_owner = Contributor.objects.filter(user_id=assigned_to, project_id=project_id).exists()
-            if not is_contributor_or_owner:
-                raise exceptions.ValidationError("L'utilisateur assigné doit être un contributeur ou un propriétaire du projet.")
-        serializer.save()
+    @action(detail=True, methods=['post'])
+    def move(self, request, *args, **kwargs):
+        """Déplacer la tâche et ses commentaires vers le projet `project`, en changeant éventuellement d'assigné."""
+        issue = self.get_object()
+        serializer = IssueMoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        issue, errors = retry_on_lock(bulk_operations.move_issue, request, issue, data['project'],
+                                      data.get('assigned_to', issue.assigned_to_id))
+        if errors:
+            return Response(errors[0]['errors'], status=status.HTTP_400_BAD_REQUEST)
+        return Response(IssueSerializer(issue, context=self.get_serializer_context()).data)
 
 # VueSet pour les commentaires
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(TimedPermissionsMixin, ReplicaReadMixin, LockRetryMixin, ResponseCacheMixin, ValuesListMixin,
+                     SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = CommentSerializer
+    pagination_class = CreatedTimeCursorPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    filter_backends = [FieldFilter, StableOrderingFilter]
+    filter_fields = ('project', 'issue', 'author')
+    ordering_fields = ('created_time', 'updated_time')
 
     def get_queryset(self):
-        return Comment.objects.select_related('issue').filter(issue__project__contributor__user=self.request.user)
+        return Comment.objects.filter(project_id__in=get_project_ids(self.request))
 
     def perform_create(self, serializer):
         comment = serializer.validated_data.get('description', '').strip()
         if not comment:
             raise exceptions.ValidationError("Le commentaire ne peut pas être vide.")
         serializer.save(author=self.request.user)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """Créer (POST), modifier (PATCH) ou supprimer (DELETE) un lot de commentaires, en JSON ou en NDJSON."""
+        return bulk_response(request, bulk_operations.create_comments, bulk_operations.update_comments,
+                             bulk_operations.destroy_comments, CommentSerializer, self.get_serializer_context())
+
+# VueSets des routes imbriquées /projects/{id}/issues/ et /projects/{id}/issues/{id}/comments/
+class ProjectIssueViewSet(ProjectScopedMixin, IssueViewSet):
+    # Les opérations en masse restent sur /issues/bulk/
+    bulk = None
+
+    def get_queryset(self):
+        return Issue.objects.filter(project_id=self.project_id)
+
+
+class IssueCommentViewSet(ProjectScopedMixin, CommentViewSet):
+    scoped_fields = {'issue': 'issue__pk'}
+    bulk = None
+
+    def get_queryset(self):
+        return Comment.objects.filter(project_id=self.project_id, issue_id=self.url_id('issue__pk'))
+
+    def _check_issue(self, issue_project_id):
+        if issue_project_id != self.project_id:
+            raise exceptions.NotFound("La tâche n'existe pas dans ce projet.")
+
+    def list(self, request, *args, **kwargs):
+        # Une tâche d'un autre projet donne une 404, comme les autres routes imbriquées, pas une liste vide
+        self._check_issue(Issue.objects.filter(pk=self.url_id('issue__pk')).values_list('project_id', flat=True)
+                          .first())
+        return super().list(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        self._check_issue(serializer.validated_data['issue'].project_id)
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        if 'issue' in serializer.validated_data:
+            self._check_issue(serializer.validated_data['issue'].project_id)
+        super().perform_update(serializer)
+
+# VueSet pour la synchronisation incrémentale des clients
+# Toujours lu sur la base principale : le retard d'un réplica ferait manquer des écritures au jeton renvoyé
+class SyncViewSet(TimedPermissionsMixin, viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """
+        Retourne les projets, tâches et commentaires modifiés depuis le jeton `since`, les identifiants
+        des tâches et commentaires supprimés, la liste des projets accessibles et un nouveau jeton.
+        Sans `since`, retourne l'état complet par pages de SYNC_PAGE_SIZE tâches et commentaires : `next`
+        donne l'adresse de la page suivante, les projets figurent sur la première et le jeton sur la dernière.
+        """
+        cursor = request.query_params.get('cursor')
+        since = request.query_params.get('since')
+        if cursor:
+            return self._snapshot(request, *decode_snapshot_cursor(cursor))
+        if not since:
+            # Le jeton de fin est calculé avant la première page pour ne manquer aucune écriture concurrente
+            return self._snapshot(request, timezone.now() - SYNC_SAFETY_MARGIN)
+        since = decode_watermark(since)
+        # Le jeton est calculé avant la lecture pour ne manquer aucune écriture concurrente
+        watermark = encode_watermark(timezone.now() - SYNC_SAFETY_MARGIN)
+        projects, issues, comments, deleted = get_changes(request.user.pk, get_project_ids(request), since)
+        return self._response(request, watermark, projects, issues, comments, deleted)
+
+    def _snapshot(self, request, moment, section='issues', after_id=0):
+        project_ids = get_project_ids(request)
+        page, position = get_snapshot_page(project_ids, section, after_id)
+        projects = Project.objects.filter(pk__in=project_ids) if (section, after_id) == ('issues', 0) else []
+        next_url = None
+        if position:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor',
+                                           encode_snapshot_cursor(moment, *position))
+        watermark = None if position else encode_watermark(moment)
+        deleted = {Tombstone.ISSUE: [], Tombstone.COMMENT: []}
+        return self._response(request, watermark, projects, page['issues'], page['comments'], deleted, next_url)
+
+    def _response(self, request, watermark, projects, issues, comments, deleted, next_url=None):
+        context = self.get_serializer_context()
+        return Response({
+            'watermark': watermark,
+            'next': next_url,
+            'project_ids': sorted(get_memberships(request)),
+            'projects': ProjectSerializerFull(projects, many=True, context=context).data,
+            'issues': IssueSerializer(issues, many=True, context=context).data,
+            'comments': CommentSerializer(comments, many=True, context=context).data,
+            'deleted': {
+                'issues': deleted[Tombstone.ISSUE],
+                'comments': deleted[Tombstone.COMMENT],
+            },
+        })
+
+    def get_serializer_context(self):
+        return {'request': self.request, 'format': self.format_kwarg, 'view': self}
+
+
+class SearchViewSet(TimedPermissionsMixin, ReplicaReadMixin, viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+    pagination_class = LimitOffsetPagination
+
+    def list(self, request):
+        """
+        Recherche `q` dans les titres et descriptions des tâches et dans les commentaires des projets
+        de l'utilisateur, résultats classés par pertinence. `type` (issue ou comment) restreint la recherche.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise exceptions.ValidationError({'q': "Ce paramètre est obligatoire."})
+        kind = request.query_params.get('type') or None
+        if kind not in (None, ISSUE, COMMENT):
+            raise exceptions.ValidationError({'type': f"Valeurs possibles : {ISSUE}, {COMMENT}."})
+        results = get_search_backend().search(query, get_project_ids(request), kind)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(results, request, view=self)
+        return paginator.get_paginated_response(page)
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importé après la configuration de Django : le flux d'événements (/events/) est servi hors des vues
+from API_IssueTrackingSystem.sse import EventStreamApp  # noqa: E402
+
+application = EventStreamApp(django_application)
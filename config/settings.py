@@ -9,6 +9,8 @@ https://docs.djangoproject.com/en/4.0/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
+import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -44,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'API_IssueTrackingSystem.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,9 +84,64 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Connexions persistantes, vérifiées avant d'être réutilisées par une nouvelle requête
+        'CONN_MAX_AGE': int(os.environ.get('SOFTDESK_DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Mode SQLite de production (WAL, pragmas, BEGIN IMMEDIATE), voir API_IssueTrackingSystem/backends/sqlite3
+if os.environ.get('SOFTDESK_SQLITE_TUNING'):
+    DATABASES['default']['ENGINE'] = 'API_IssueTrackingSystem.backends.sqlite3'
+    # Base de test sur disque : le test de charge en écriture a besoin de vraies connexions concurrentes
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
+
+# Réplicas en lecture (voir API_IssueTrackingSystem/replicas.py) : fichiers SQLite séparés par des virgules
+# dans SOFTDESK_DB_REPLICAS, tenus à jour en local par `manage.py sync_replicas`. En production, on remplace
+# leurs paramètres de connexion par ceux des vrais réplicas.
+for index, path in enumerate(filter(None, os.environ.get('SOFTDESK_DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'NAME': path.strip(),
+        # Les tests lisent la base de test principale au travers de l'alias du réplica
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['API_IssueTrackingSystem.replicas.ReplicaRouter']
+
+# Durée (en secondes) pendant laquelle un utilisateur qui vient d'écrire lit sur la base principale
+REPLICA_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Réponses mises en cache (voir API_IssueTrackingSystem/response_cache.py) : les moins récemment lues sont
+    # évincées au-delà de MAX_ENTRIES, chacune faisant au plus RESPONSE_CACHE_MAX_ENTRY_SIZE octets. Avec
+    # plusieurs processus, le remplacer par un cache partagé (FileBasedCache par exemple).
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    # Partagé entre processus pour que `manage.py dump_request_metrics` voie les mesures de tous les workers
+    'metrics': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(tempfile.gettempdir()) / 'softdesk_request_metrics',
+    },
+}
+
+REQUEST_METRICS_CACHE = 'metrics'
+
+# Cache des réponses de liste et de détail, activé par SOFTDESK_RESPONSE_CACHE=1
+RESPONSE_CACHE_ENABLED = bool(os.environ.get('SOFTDESK_RESPONSE_CACHE'))
+RESPONSE_CACHE = 'responses'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -132,7 +190,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 100,
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',
+    # Utilisateur lu dans un cache plutôt qu'en base à chaque requête (voir users/authentication.py)
+    'DEFAULT_AUTHENTICATION_CLASSES': ('users.authentication.CachedJWTAuthentication',
                                        'rest_framework.authentication.SessionAuthentication')
 
 }
@@ -2,16 +2,27 @@
 
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework import routers
+from rest_framework_nested import routers
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from API_IssueTrackingSystem.views import ProjectViewSet, ContributorViewSet, IssueViewSet, CommentViewSet
-from users.views import UserViewSet, UserDataViewSet
+from API_IssueTrackingSystem.views import (ProjectViewSet, ContributorViewSet, IssueViewSet, CommentViewSet,
+                                           SyncViewSet, SearchViewSet, ProjectIssueViewSet,
+                                           IssueCommentViewSet)
+from API_IssueTrackingSystem.async_views import AsyncProjectView, AsyncIssueView, AsyncCommentView
+from users.views import UserViewSet, UserDataViewSet, DeletionJobView
 
 router = routers.DefaultRouter()
 router.register('projects', ProjectViewSet, basename='project')
 router.register('issues', IssueViewSet, basename='issue')
 router.register('contributor', ContributorViewSet, basename='contributor')
 router.register('comments', CommentViewSet, basename='comment')
+router.register('sync', SyncViewSet, basename='sync')
+router.register('search', SearchViewSet, basename='search')
+
+# Routes imbriquées par projet : /projects/{project__pk}/issues/{issue__pk}/comments/
+project_router = routers.NestedSimpleRouter(router, 'projects', lookup='project')
+project_router.register('issues', ProjectIssueViewSet, basename='project-issue')
+issue_router = routers.NestedSimpleRouter(project_router, 'issues', lookup='issue')
+issue_router.register('comments', IssueCommentViewSet, basename='issue-comment')
 
 
 urlpatterns = [
@@ -21,9 +32,17 @@ urlpatterns = [
     path('login/', TokenObtainPairView.as_view(), name='obtain_tokens'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='refresh_tokens'),
     path('', include(router.urls)),
+    # Lectures asynchrones, pour un déploiement ASGI (voir API_IssueTrackingSystem/async_views.py)
+    path('async/projects/', AsyncProjectView.as_view(), name='async-project-list'),
+    path('async/projects/<int:pk>/', AsyncProjectView.as_view(), name='async-project-detail'),
+    path('async/issues/', AsyncIssueView.as_view(), name='async-issue-list'),
+    path('async/issues/<int:pk>/', AsyncIssueView.as_view(), name='async-issue-detail'),
+    path('async/comments/', AsyncCommentView.as_view(), name='async-comment-list'),
+    path('async/comments/<int:pk>/', AsyncCommentView.as_view(), name='async-comment-detail'),
     path('user_data/', UserDataViewSet.as_view({'get': 'retrieve'}), name='user_data'),
     path('user_data/export_data/', UserDataViewSet.as_view({'get': 'export_data'}), name='export_data'),
-    path('user_data/forget_me/', UserDataViewSet.as_view({'delete': 'forget_me'}), name='forget_me')
+    path('user_data/forget_me/', UserDataViewSet.as_view({'delete': 'forget_me'}), name='forget_me'),
+    path('user_data/forget_me/<uuid:job_id>/', DeletionJobView.as_view(), name='forget_me_status')
     
 
     
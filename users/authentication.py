@@ -0,0 +1,157 @@
+"""
+Authentification JWT sans requête par appel : l'utilisateur désigné par le jeton est lu dans un LRU borné propre
+au processus puis, si USER_CACHE désigne un cache partagé entre les processus (voir caching.py), dans ce cache ;
+il n'est chargé depuis la base qu'en cas d'absence. Les entrées sont indexées par identifiant d'utilisateur (tous
+les jetons d'un utilisateur désignent la même ligne) et invalidées à chaque sauvegarde ou suppression de
+l'utilisateur (signals.py) : changement de mot de passe, désactivation par forget_me...
+L'invalidation n'atteint que le LRU du processus qui sauvegarde : les autres processus gardent leur copie au plus
+USER_CACHE_LOCAL_TIMEOUT secondes, puis relisent le cache partagé, déjà invalidé, ou la base. Un UPDATE direct
+sur la table n'invalide rien : le cache partagé le masque jusqu'à USER_CACHE_TIMEOUT secondes.
+Seuls les champs de USER_CACHE_FIELDS sont mis en cache, jamais le hash du mot de passe : CHECK_REVOKE_TOKEN
+compare le jeton à son empreinte MD5, calculée au chargement. Les autres champs sont lus en base au premier accès.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from API_IssueTrackingSystem.caching import shared_cache
+
+# Alias du cache partagé entre les processus ; ignoré s'il est propre au processus (LocMemCache, DummyCache)
+USER_CACHE = getattr(settings, 'USER_CACHE', None)
+
+# Durée de conservation (en secondes) dans le cache partagé
+USER_CACHE_TIMEOUT = getattr(settings, 'USER_CACHE_TIMEOUT', 300)
+
+# Nombre d'utilisateurs gardés en mémoire par processus
+USER_CACHE_LRU_SIZE = getattr(settings, 'USER_CACHE_LRU_SIZE', 1024)
+
+# Durée (en secondes) pendant laquelle un processus se fie à sa copie locale sans relire le cache partagé ni la
+# base
+USER_CACHE_LOCAL_TIMEOUT = getattr(settings, 'USER_CACHE_LOCAL_TIMEOUT', 5)
+
+# Champs mis en cache : ceux de l'authentification et des permissions
+USER_CACHE_FIELDS = getattr(settings, 'USER_CACHE_FIELDS', ('username', 'is_active', 'is_staff', 'is_superuser'))
+
+
+class LocalLRU:
+    """Petit cache LRU à expiration, partagé par les fils du processus."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = LocalLRU(USER_CACHE_LRU_SIZE, USER_CACHE_LOCAL_TIMEOUT)
+
+
+def _cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def _fields():
+    # Dans l'ordre des colonnes du modèle, qu'attend from_db() pour une instance aux champs différés
+    return [field.attname for field in get_user_model()._meta.concrete_fields
+            if field.primary_key or field.attname in USER_CACHE_FIELDS]
+
+
+def _load(user_id):
+    """Lit en base les champs mis en cache et l'empreinte du mot de passe ; None si l'utilisateur n'existe pas."""
+    User = get_user_model()
+    row = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).values_list(*_fields(), 'password').first()
+    if row is None:
+        return None
+    *values, password = row
+    return tuple(values), get_md5_hash_password(password) if api_settings.CHECK_REVOKE_TOKEN else None
+
+
+def get_cached_user(user_id):
+    """
+    Retourne (utilisateur, empreinte MD5 de son mot de passe si CHECK_REVOKE_TOKEN), ou None si l'utilisateur
+    n'existe pas, depuis le cache si possible.
+    """
+    key = _cache_key(user_id)
+    entry = _local.get(key)
+    if entry is None:
+        cache = shared_cache(USER_CACHE)
+        entry = cache.get(key) if cache is not None else None
+        if entry is None:
+            entry = _load(user_id)
+            if entry is None:
+                return None
+            if cache is not None:
+                cache.set(key, entry, USER_CACHE_TIMEOUT)
+        _local.set(key, entry)
+    values, password_hash = entry
+    # Instance neuve à chaque requête : les vues peuvent la modifier sans toucher au cache
+    return get_user_model().from_db(DEFAULT_DB_ALIAS, _fields(), values), password_hash
+
+
+def invalidate_user(user_id):
+    _local.delete(_cache_key(user_id))
+    cache = shared_cache(USER_CACHE)
+    if cache is not None:
+        cache.delete(_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication dont get_user() lit l'utilisateur dans le cache, avec les mêmes vérifications."""
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_FIELD != get_user_model()._meta.pk.name:
+            # Le cache est indexé par clé primaire : les autres champs d'identification passent par la base
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        cached = get_cached_user(user_id)
+        if cached is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        user, password_hash = cached
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,175 @@
+"""
+Exécution en arrière-plan du droit à l'oubli.
+Les données sont supprimées par lots, chacun dans une transaction courte, avec des DELETE directs
+(sans le collecteur de cascade de Django) pour ne jamais verrouiller la base longtemps.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Q
+from API_IssueTrackingSystem.models import (Project, Contributor, Issue, Comment, Tombstone, ProjectCounter,
+                                            IssueCommentCounter)
+from API_IssueTrackingSystem.membership import invalidate_memberships
+from API_IssueTrackingSystem import counters, events, response_cache
+from API_IssueTrackingSystem.locking import retry_on_lock
+from .models import DeletionJob
+
+logger = logging.getLogger(__name__)
+
+# Nombre de lignes supprimées par transaction
+FORGET_ME_BATCH_SIZE = getattr(settings, 'FORGET_ME_BATCH_SIZE', 1000)
+
+# Message enregistré et renvoyé par l'API en cas d'échec ; le détail de l'exception ne figure que dans les journaux
+DELETION_FAILED_MESSAGE = "La suppression a échoué et sera reprise à la prochaine exécution."
+
+# Un seul fil d'exécution : les suppressions sont sérialisées et ne se disputent pas le verrou d'écriture
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='forget-me')
+
+
+def schedule(job):
+    """Lance la tâche une fois la transaction courante validée."""
+    transaction.on_commit(lambda: _executor.submit(run_job, job.pk))
+
+
+def _delete_in_batches(job, queryset, tombstone=None):
+    """Supprime les lignes du queryset par lots, en enregistrant si besoin leurs traces de suppression."""
+    model = queryset.model
+
+    @transaction.atomic
+    def delete_batch():
+        if tombstone is None:
+            ids = list(queryset.values_list('pk', flat=True)[:FORGET_ME_BATCH_SIZE])
+        else:
+            rows = list(queryset.values_list('id', 'project_id')[:FORGET_ME_BATCH_SIZE])
+            ids = [row_id for row_id, _ in rows]
+            Tombstone.objects.bulk_create([
+                Tombstone(model=tombstone, object_id=row_id, project_id=project_id)
+                for row_id, project_id in rows
+            ])
+        return model.objects.filter(pk__in=ids)._raw_delete(queryset.db) if ids else None
+
+    while True:
+        # Chaque lot est rejoué s'il trouve la base verrouillée par les écritures de l'API
+        deleted = retry_on_lock(delete_batch)
+        if deleted is None:
+            return
+        job.deleted_rows += deleted
+        DeletionJob.objects.filter(pk=job.pk).update(deleted_rows=job.deleted_rows)
+
+
+def _set_step(job, step):
+    job.step = step
+    job.save(update_fields=['step', 'updated_time'])
+
+
+def _scope(user_id):
+    """Relève les projets et utilisateurs concernés, tant que les lignes qui permettent de les retrouver existent."""
+    owned = set(Project.objects.filter(author_id=user_id).values_list('id', flat=True))
+    # Projets d'autres utilisateurs dont des tâches ou commentaires vont disparaître : compteurs à recalculer
+    affected_projects = (
+        set(Comment.objects.filter(Q(author_id=user_id) | Q(issue__assigned_to_id=user_id))
+            .values_list('project_id', flat=True).distinct())
+        | set(Issue.objects.filter(assigned_to_id=user_id).values_list('project_id', flat=True).distinct())
+    ) - owned
+    contributors = Contributor.objects.filter(Q(project_id__in=owned) | Q(user_id=user_id))
+    # Les suppressions directes n'émettent pas de signaux : réponses en cache de tous ces projets à invalider
+    touched_projects = affected_projects | owned | set(contributors.values_list('project_id', flat=True))
+    return {
+        'affected_projects': sorted(affected_projects),
+        'touched_projects': sorted(touched_projects),
+        'affected_users': sorted(set(contributors.values_list('user_id', flat=True))),
+    }
+
+
+def _owned(job):
+    return Project.objects.filter(author_id=job.user_id).values('id')
+
+
+def _delete_contributors(job):
+    # En premier : plus personne n'écrit dans les projets de l'utilisateur ni ne peut lui assigner de tâche
+    _delete_in_batches(job, Contributor.objects.filter(Q(project_id__in=_owned(job)) | Q(user_id=job.user_id)))
+    for affected_user_id in job.scope['affected_users']:
+        invalidate_memberships(affected_user_id)
+
+
+def _delete_comments(job):
+    # Les projets de l'utilisateur disparaissent entièrement : pas de trace de suppression pour leur contenu
+    _delete_in_batches(job, Comment.objects.filter(project_id__in=_owned(job)))
+    _delete_in_batches(job, Comment.objects.filter(Q(author_id=job.user_id) | Q(issue__assigned_to_id=job.user_id)),
+                       tombstone=Tombstone.COMMENT)
+
+
+def _delete_issues(job):
+    # Un membre a pu commenter une tâche assignée depuis l'étape précédente : ses commentaires partent avec elle
+    _delete_in_batches(job, Comment.objects.filter(issue__assigned_to_id=job.user_id), tombstone=Tombstone.COMMENT)
+    # Les suppressions directes ne cascadent pas : retirer d'abord les compteurs qui référencent les tâches
+    _delete_in_batches(job, IssueCommentCounter.objects.filter(
+        Q(project_id__in=_owned(job)) | Q(issue__assigned_to_id=job.user_id)))
+    _delete_in_batches(job, Issue.objects.filter(project_id__in=_owned(job)))
+    _delete_in_batches(job, Issue.objects.filter(assigned_to_id=job.user_id), tombstone=Tombstone.ISSUE)
+
+
+def _delete_projects(job):
+    _delete_in_batches(job, ProjectCounter.objects.filter(project_id__in=_owned(job)))
+    _delete_in_batches(job, Project.objects.filter(author_id=job.user_id))
+
+
+def _rebuild_counters(job):
+    retry_on_lock(counters.rebuild, job.scope['affected_projects'])
+    response_cache.invalidate(*job.scope['touched_projects'])
+    # Les DELETE directs n'ont émis aucun événement : les flux ouverts sur ces projets se resynchronisent
+    events.reset_event(job.scope['touched_projects'])
+
+
+def _delete_user(job):
+    # Il ne reste que quelques lignes liées (groupes, journal d'administration) : la cascade classique suffit
+    get_user_model().objects.filter(pk=job.user_id).delete()
+
+
+# Étapes dans l'ordre d'exécution. Chacune peut être rejouée sans effet de bord : une tâche interrompue
+# reprend à l'étape enregistrée dans `step`
+STEPS = [
+    ('contributors', _delete_contributors),
+    ('comments', _delete_comments),
+    ('issues', _delete_issues),
+    ('projects', _delete_projects),
+    ('counters', _rebuild_counters),
+    ('user', _delete_user),
+]
+
+
+def delete_user_data(job):
+    if not job.scope:
+        job.scope = _scope(job.user_id)
+        job.save(update_fields=['scope', 'updated_time'])
+    names = [name for name, _ in STEPS]
+    start = names.index(job.step) if job.step in names else 0
+    for name, run_step in STEPS[start:]:
+        _set_step(job, name)
+        run_step(job)
+
+
+def run_job(job_id):
+    close_old_connections()
+    try:
+        job = DeletionJob.objects.get(pk=job_id)
+        if job.status == DeletionJob.DONE:
+            return
+        job.status, job.error = DeletionJob.RUNNING, ''
+        job.save(update_fields=['status', 'error', 'updated_time'])
+        try:
+            delete_user_data(job)
+        except Exception:
+            logger.exception("Échec de la suppression %s des données de l'utilisateur %s (étape %s)",
+                             job.pk, job.user_id, job.step)
+            job.status, job.error = DeletionJob.FAILED, DELETION_FAILED_MESSAGE
+            job.save(update_fields=['status', 'error', 'updated_time'])
+            return
+        job.status, job.step = DeletionJob.DONE, ''
+        job.save(update_fields=['status', 'step', 'updated_time'])
+    finally:
+        # Ce fil n'est pas géré par le cycle requête/réponse : fermer explicitement ses connexions
+        connections.close_all()
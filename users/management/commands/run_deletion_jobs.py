@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from users.deletion import run_job
+from users.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = ("Exécute les suppressions de compte en attente, et reprend à leur dernière étape celles qui ont échoué "
+            "ou ont été interrompues (par exemple par un redémarrage).")
+
+    def handle(self, *args, **options):
+        jobs = DeletionJob.objects.exclude(status=DeletionJob.DONE).order_by('created_time')
+        for job_id in jobs.values_list('id', flat=True):
+            run_job(job_id)
+            job = DeletionJob.objects.get(pk=job_id)
+            self.stdout.write(f"{job.id} : {job.status} ({job.deleted_rows} ligne(s) supprimée(s))")
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_deletionjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="deletionjob",
+            name="scope",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
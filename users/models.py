@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
@@ -8,10 +10,19 @@ class User(AbstractUser):
     birth_date = models.DateField(null=True, blank=True)
 
 
-
-
-
-
-
-
-
+class DeletionJob(models.Model):
+    """Suppression différée d'un compte (droit à l'oubli), exécutée par lots en arrière-plan."""
+    PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(PENDING, PENDING), (RUNNING, RUNNING), (DONE, DONE), (FAILED, FAILED)]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Simple entier : l'utilisateur n'existe plus une fois la tâche terminée
+    user_id = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    step = models.CharField(max_length=50, blank=True)
+    deleted_rows = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # Projets et utilisateurs concernés, relevés avant la première suppression : une reprise ne les retrouverait plus
+    scope = models.JSONField(default=dict, blank=True)
+    created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
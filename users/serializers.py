@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from .models import DeletionJob
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -42,3 +43,9 @@ class UserSerializer(serializers.ModelSerializer):
         user.set_password(password)
         user.save()
         return user
+
+
+class DeletionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeletionJob
+        fields = ('id', 'status', 'step', 'deleted_rows', 'error', 'created_time', 'updated_time')
@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_user
+
+
+# Oublier l'utilisateur mis en cache par l'authentification dès qu'il est modifié ou supprimé. L'entrée est aussi
+# retirée à la validation : une requête concurrente a pu remettre en cache l'ancienne ligne entre-temps.
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    user_id = instance.pk
+    invalidate_user(user_id)
+    transaction.on_commit(lambda: invalidate_user(user_id))
@@ -1,3 +1,275 @@
-from django.test import TestCase
+import io
+import json
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from API_IssueTrackingSystem import counters, events
+from API_IssueTrackingSystem.models import Project, Contributor, Issue, Comment, Tombstone
+from . import authentication, deletion
+from .models import DeletionJob
+
+
+class UserDataTestCase(APITestCase):
+    """Deux utilisateurs, chacun avec son projet ; seul le premier est membre du projet partagé."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create(username='auteur')
+        cls.other = User.objects.create(username='autre')
+        cls.project = Project.objects.create(title='Projet', description='description', type='back_end',
+                                             author=cls.user)
+        cls.other_project = Project.objects.create(title='Projet étranger', description='description',
+                                                   type='back_end', author=cls.other)
+        Contributor.objects.create(user=cls.user, project=cls.project, role='auteur')
+        Contributor.objects.create(user=cls.other, project=cls.other_project, role='auteur')
+        cls.issue = Issue.objects.create(title='Tâche', description='description', tag='bug', priority='faible',
+                                         status='en attente', project=cls.project, assigned_to=cls.user)
+        cls.comment = Comment.objects.create(description='commentaire', author=cls.user, issue=cls.issue)
+        other_issue = Issue.objects.create(title='Tâche étrangère', description='description', tag='bug',
+                                           priority='faible', status='en attente', project=cls.other_project)
+        Comment.objects.create(description='commentaire étranger', author=cls.other, issue=other_issue)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+
+class ExportDataTests(UserDataTestCase):
+
+    @staticmethod
+    def parse(lines):
+        return [json.loads(line) for line in lines.decode().splitlines() if line]
+
+    def test_ndjson_export(self):
+        response = self.client.get('/user_data/export_data/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="export_auteur.ndjson"')
+        rows = self.parse(b''.join(response.streaming_content))
+        self.assertEqual([(row['section'], row['id']) for row in rows], [
+            ('projects', self.project.id),
+            ('issues', self.issue.id),
+            ('comments', self.comment.id),
+            ('contributors', Contributor.objects.get(user=self.user).id),
+        ])
+        self.assertEqual(rows[1]['title'], 'Tâche')
+
+    def test_zip_export(self):
+        response = self.client.get('/user_data/export_data/', {'output': 'zip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(),
+                             ['projects.ndjson', 'issues.ndjson', 'comments.ndjson', 'contributors.ndjson'])
+            comments = self.parse(archive.read('comments.ndjson'))
+        self.assertEqual([comment['description'] for comment in comments], ['commentaire'])
+        self.assertNotIn('section', comments[0])
+
+    def test_unknown_output(self):
+        self.assertEqual(self.client.get('/user_data/export_data/', {'output': 'xml'}).status_code, 400)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/user_data/export_data/').status_code, 401)
+
+
+class CachedAuthenticationTests(UserDataTestCase):
+    """L'utilisateur d'un jeton est lu dans le cache ; sa sauvegarde l'invalide."""
+
+    def setUp(self):
+        cache.clear()
+        authentication._local.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def user_lookups(self, url):
+        """Appelle `url` et retourne (réponse, nombre de SELECT sur la table des utilisateurs)."""
+        user_table = get_user_model()._meta.db_table
+        selects = []
+
+        def capture(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT') and f'FROM "{user_table}"' in sql:
+                selects.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = self.client.get(url)
+        return response, len(selects)
+
+    def test_cached_jwt_authentication(self):
+        url = f'/projects/{self.project.id}/'
+        self.assertEqual(self.user_lookups(url)[1], 1)
+        response, lookups = self.user_lookups(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(lookups, 0)
+        # Une sauvegarde de l'utilisateur (ici sa désactivation) invalide le cache
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        response, lookups = self.user_lookups(url)
+        self.assertEqual((response.status_code, lookups), (401, 1))
+
+    def test_process_local_cache_is_not_shared(self):
+        # Le cache par défaut est propre au processus : passé le délai du LRU local, l'utilisateur est relu en base
+        url = f'/projects/{self.project.id}/'
+        self.user_lookups(url)
+        authentication._local.clear()
+        self.assertEqual(self.user_lookups(url)[1], 1)
+
+    @mock.patch.object(authentication, 'USER_CACHE', 'metrics')
+    def test_shared_cache(self):
+        shared = caches['metrics']
+        key = authentication._cache_key(self.user.pk)
+        self.addCleanup(shared.delete, key)
+        url = f'/projects/{self.project.id}/'
+        self.user_lookups(url)
+        authentication._local.clear()
+        response, lookups = self.user_lookups(url)
+        self.assertEqual((response.status_code, lookups), (200, 0))
+        # Seuls les champs de l'authentification sont en cache, pas le hash du mot de passe
+        values, password_hash = shared.get(key)
+        self.assertEqual(dict(zip(authentication._fields(), values)), {
+            'id': self.user.pk, 'username': 'auteur', 'is_active': True, 'is_staff': False, 'is_superuser': False})
+        self.assertIsNone(password_hash)
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertIsNone(shared.get(key))
+
+    def test_deferred_fields_are_loaded_on_access(self):
+        user, _ = authentication.get_cached_user(self.user.pk)
+        self.assertIn('password', user.get_deferred_fields())
+        self.assertTrue(user.get_deferred_fields().isdisjoint(authentication.USER_CACHE_FIELDS))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
+
+    @mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True)
+    def test_revoked_token(self):
+        self.user.set_password('ancien mot de passe')
+        self.user.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        url = f'/projects/{self.project.id}/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.user_lookups(url)[1], 0)
+        self.user.set_password('nouveau mot de passe')
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'password_changed')
+
+
+class DeletionJobTests(TransactionTestCase):
+    """Les suppressions s'exécutent en plusieurs transactions : pas de transaction englobante."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create(username='partant')
+        self.other = User.objects.create(username='restant')
+        owned = Project.objects.create(title='Projet', description='description', type='back_end', author=self.user)
+        self.shared = Project.objects.create(title='Partagé', description='description', type='back_end',
+                                             author=self.other)
+        Contributor.objects.create(user=self.user, project=owned, role='auteur')
+        Contributor.objects.create(user=self.other, project=owned, role='collaborateur')
+        Contributor.objects.create(user=self.other, project=self.shared, role='auteur')
+        Contributor.objects.create(user=self.user, project=self.shared, role='collaborateur')
+        owned_issue = Issue.objects.create(title='Tâche', description='description', tag='bug', priority='faible',
+                                           status='en attente', project=owned, assigned_to=self.other)
+        Comment.objects.create(description='commentaire', author=self.other, issue=owned_issue)
+        self.assigned = Issue.objects.create(title='Assignée', description='description', tag='bug',
+                                             priority='faible', status='en attente', project=self.shared,
+                                             assigned_to=self.user)
+        self.kept = Issue.objects.create(title='Conservée', description='description', tag='tâche',
+                                         priority='élevé', status='en cours', project=self.shared,
+                                         assigned_to=self.other)
+        self.on_assigned = Comment.objects.create(description='sur la tâche assignée', author=self.other,
+                                                  issue=self.assigned)
+        self.written = Comment.objects.create(description='écrit', author=self.user, issue=self.kept)
+        self.remaining = Comment.objects.create(description='restant', author=self.other, issue=self.kept)
+        self.job = DeletionJob.objects.create(user_id=self.user.pk)
+
+    def assertUserDataDeleted(self):
+        job = DeletionJob.objects.get(pk=self.job.pk)
+        self.assertEqual((job.status, job.step, job.error), (DeletionJob.DONE, '', ''))
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(list(Project.objects.all()), [self.shared])
+        self.assertEqual(list(Issue.objects.all()), [self.kept])
+        self.assertEqual(list(Comment.objects.all()), [self.remaining])
+        self.assertEqual(list(Contributor.objects.values_list('user_id', 'project_id')),
+                         [(self.other.pk, self.shared.pk)])
+        # Traces pour les membres du projet partagé uniquement ; le projet supprimé n'en a pas besoin
+        self.assertEqual(sorted(Tombstone.objects.values_list('model', 'object_id', 'project_id')), [
+            (Tombstone.COMMENT, self.on_assigned.pk, self.shared.pk),
+            (Tombstone.COMMENT, self.written.pk, self.shared.pk),
+            (Tombstone.ISSUE, self.assigned.pk, self.shared.pk),
+        ])
+        stats = counters.project_stats(self.shared.pk)
+        counters.rebuild([self.shared.pk])
+        self.assertEqual(stats, counters.project_stats(self.shared.pk))
+        self.assertEqual((stats['issues']['total'], stats['comments']['total']), (1, 1))
+
+    def test_forget_me_schedules_job(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch.object(deletion, '_executor') as executor:
+            response = client.delete('/user_data/forget_me/')
+        self.assertEqual(response.status_code, 202)
+        job = DeletionJob.objects.exclude(pk=self.job.pk).get()
+        self.assertEqual(response['Location'], f'http://testserver/user_data/forget_me/{job.pk}/')
+        self.assertEqual(response.json()['status'], DeletionJob.PENDING)
+        executor.submit.assert_called_once_with(deletion.run_job, job.pk)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+    def test_run_job(self):
+        with mock.patch.object(deletion, 'FORGET_ME_BATCH_SIZE', 1), mock.patch.object(events, '_publish') as publish:
+            deletion.run_job(self.job.pk)
+        self.assertUserDataDeleted()
+        # Les suppressions directes n'émettent pas d'événement : les flux des projets touchés se resynchronisent
+        published = [message for call in publish.call_args_list for message in call.args[0]]
+        self.assertEqual([(message.name, set(message.project_ids)) for message in published],
+                         [(events.RESET, set(DeletionJob.objects.get(pk=self.job.pk).scope['touched_projects']))])
+        self.assertIn(self.shared.pk, published[0].project_ids)
+        # Une tâche terminée n'est pas rejouée
+        deletion.run_job(self.job.pk)
+        self.assertEqual(DeletionJob.objects.get(pk=self.job.pk).status, DeletionJob.DONE)
+
+    def test_failed_job_resumes_from_its_step(self):
+        with mock.patch.object(counters, 'rebuild', side_effect=RuntimeError('base indisponible')), \
+                self.assertLogs(deletion.logger, 'ERROR') as logs:
+            deletion.run_job(self.job.pk)
+        job = DeletionJob.objects.get(pk=self.job.pk)
+        self.assertEqual((job.status, job.step, job.error),
+                         (DeletionJob.FAILED, 'counters', deletion.DELETION_FAILED_MESSAGE))
+        # Le détail de l'exception reste dans les journaux, la vue publique ne renvoie que le message générique
+        self.assertIn('base indisponible', logs.output[0])
+        response = APIClient().get(f'/user_data/forget_me/{self.job.pk}/')
+        self.assertEqual(response.json()['error'], deletion.DELETION_FAILED_MESSAGE)
+        self.assertEqual(job.scope['affected_projects'], [self.shared.pk])
+        # Les lignes qui désignaient les projets concernés ont disparu : la reprise s'appuie sur `scope`
+        self.assertFalse(Comment.objects.filter(author_id=self.user.pk).exists())
+        with mock.patch.object(deletion, '_delete_in_batches') as delete_in_batches:
+            call_command('run_deletion_jobs', stdout=io.StringIO())
+        # Les étapes terminées ne sont pas rejouées
+        delete_in_batches.assert_not_called()
+        self.assertUserDataDeleted()
+
+    def test_steps_can_be_replayed(self):
+        deletion.run_job(self.job.pk)
+        DeletionJob.objects.filter(pk=self.job.pk).update(status=DeletionJob.FAILED, step='contributors')
+        call_command('run_deletion_jobs', stdout=io.StringIO())
+        self.assertUserDataDeleted()
+
+    def test_status_view(self):
+        client = APIClient()
+        response = client.get(f'/user_data/forget_me/{self.job.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], DeletionJob.PENDING)
+        self.assertNotIn('scope', response.json())
+        DeletionJob.objects.filter(pk=self.job.pk).delete()
+        self.assertEqual(client.get(f'/user_data/forget_me/{self.job.pk}/').status_code, 404)
@@ -1,11 +1,45 @@
-from rest_framework import generics, viewsets, status
-from rest_framework.permissions import IsAuthenticated
+import json
+import zipfile
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import exceptions, generics, viewsets, status
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from API_IssueTrackingSystem.models import Project, Contributor, Issue, Comment
-from API_IssueTrackingSystem.serializers import ProjectSerializer, ContributorSerializer, IssueSerializer, CommentSerializer
-from .serializers import UserSerializer
+from API_IssueTrackingSystem.membership import get_project_ids
+from API_IssueTrackingSystem.metrics import TimedPermissionsMixin
+from API_IssueTrackingSystem.locking import retry_on_lock
+from .models import DeletionJob
+from .serializers import DeletionJobSerializer, UserSerializer
+from . import deletion
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.urls import reverse
+
+# Nombre de lignes lues par aller-retour avec la base lors d'un export
+EXPORT_CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+class _StreamBuffer:
+    """Tampon en écriture seule, vidé à chaque morceau envoyé ; zipfile le traite comme un flux non positionnable."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
 
 
 # VueSet pour la création d'utilisateurs
@@ -14,23 +48,100 @@ class UserViewSet(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 # VueSet pour les droits RGPD de l'utilisateur
-class UserDataViewSet(viewsets.ViewSet):
+class UserDataViewSet(TimedPermissionsMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def retrieve(self, request):
         """Récupérer les données de l'utilisateur."""
+        project_ids = get_project_ids(request)
         user_data = {
             "username": request.user.username,
             "email": request.user.email,
-            "projets": [project.title for project in Project.objects.filter(contributor__user=request.user)],
-            "problèmes": [issue.title for issue in Issue.objects.filter(project__contributor__user=request.user)],
-            "commentaires": [comment.description for comment in Comment.objects.filter(issue__project__contributor__user=request.user)],
-            "contributeurs": [contributor.user.username for contributor in Contributor.objects.filter(project__contributor__user=request.user)]
+            "projets": list(Project.objects.filter(id__in=project_ids).values_list('title', flat=True)),
+            "problèmes": list(Issue.objects.filter(project_id__in=project_ids).values_list('title', flat=True)),
+            "commentaires": list(Comment.objects.filter(project_id__in=project_ids)
+                                 .values_list('description', flat=True)),
+            "contributeurs": list(Contributor.objects.filter(project_id__in=project_ids)
+                                  .values_list('user__username', flat=True))
         }
         return Response(user_data)
 
+    def _export_sections(self, request):
+        """Retourne les sections de l'export sous forme de (nom, lignes lues par paquets)."""
+        project_ids = get_project_ids(request)
+        return [
+            ('projects', Project.objects.filter(id__in=project_ids)
+             .values('id', 'title', 'description', 'type', 'author_id', 'updated_time')),
+            ('issues', Issue.objects.filter(project_id__in=project_ids)
+             .values('id', 'title', 'description', 'tag', 'priority', 'status', 'project_id', 'assigned_to_id',
+                     'created_time', 'updated_time')),
+            ('comments', Comment.objects.filter(project_id__in=project_ids)
+             .values('id', 'description', 'author_id', 'issue_id', 'project_id', 'created_time', 'updated_time')),
+            ('contributors', Contributor.objects.filter(project_id__in=project_ids)
+             .values('id', 'project_id', 'user_id', 'user__username', 'role', 'created_time')),
+        ]
+
+    @staticmethod
+    def _lines(queryset, **extra):
+        for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            row.update(extra)
+            yield (json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode()
+
+    def _stream_ndjson(self, sections):
+        for name, queryset in sections:
+            yield from self._lines(queryset, section=name)
+
+    def _stream_zip(self, sections):
+        buffer = _StreamBuffer()
+        with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, queryset in sections:
+                with archive.open(f'{name}.ndjson', mode='w', force_zip64=True) as member:
+                    for line in self._lines(queryset):
+                        member.write(line)
+                        data = buffer.pop()
+                        if data:
+                            yield data
+                yield buffer.pop()
+        yield buffer.pop()
+
+    @action(detail=False, methods=['GET'])
+    def export_data(self, request):
+        """Exporter en flux les données de l'utilisateur, en NDJSON (par défaut) ou en archive zip (?output=zip)."""
+        output = request.query_params.get('output', 'ndjson')
+        sections = self._export_sections(request)
+        if output == 'ndjson':
+            response = StreamingHttpResponse(self._stream_ndjson(sections), content_type='application/x-ndjson')
+        elif output == 'zip':
+            response = StreamingHttpResponse(self._stream_zip(sections), content_type='application/zip')
+        else:
+            raise exceptions.ValidationError({'output': "Format d'export inconnu, utilisez 'ndjson' ou 'zip'."})
+        response['Content-Disposition'] = f'attachment; filename="export_{request.user.username}.{output}"'
+        return response
+
     @action(detail=False, methods=['DELETE'])
     def forget_me(self, request):
-        """Supprimer l'utilisateur et toutes les données associées."""
-        request.user.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        """Programmer la suppression de l'utilisateur et de toutes les données associées."""
+        @transaction.atomic
+        def schedule_deletion():
+            # Le compte est désactivé immédiatement ; la suppression elle-même s'exécute en arrière-plan
+            request.user.is_active = False
+            request.user.save(update_fields=['is_active'])
+            job = DeletionJob.objects.create(user_id=request.user.pk)
+            deletion.schedule(job)
+            return job
+
+        job = retry_on_lock(schedule_deletion)
+        status_url = request.build_absolute_uri(reverse('forget_me_status', args=[job.pk]))
+        data = DeletionJobSerializer(job).data
+        data['status_url'] = status_url
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': status_url})
+
+
+# Vue pour suivre l'avancement d'une suppression de compte
+class DeletionJobView(generics.RetrieveAPIView):
+    # L'utilisateur n'existe plus à la fin de la suppression : l'identifiant aléatoire de la tâche fait office de jeton
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    queryset = DeletionJob.objects.all()
+    serializer_class = DeletionJobSerializer
+    lookup_url_kwarg = 'job_id'